@@ -0,0 +1,272 @@
+# run.py
+"""
+Benchmark harness.
+
+Builds a synthetic universe (benchmarks/synthetic.py), times the hot paths
+and writes one JSON document per run for regression tracking:
+
+    python -m benchmarks.run --symbols 100 --years 20 --out data/bench/latest.json
+    python -m benchmarks.run --only backtest --compare data/bench/baseline.json
+
+Each benchmark runs `--repeat` times after one untimed warm-up; the JSON
+holds min / median / mean / max seconds per benchmark plus counters (rows,
+entries, sheet API calls) so a speed change can be checked against the
+work actually done.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from benchmarks.synthetic import make_option_chain, symbol_names, write_dataset
+from engine.backtest_engine import BacktestEngine, load_pp_levels
+from engine.pivots import build_pivot_table
+from upload.fake_sheets import FakeWorksheet
+from upload.gdrive_sync import DeltaSheetWriter
+
+BENCH_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'bench')
+ENGINE_CONFIG = {"ALLOCATION_PER_ZONE": 25000, "PROTOCOL_R": "N"}
+
+
+@contextlib.contextmanager
+def patched(module, **attrs):
+    """Temporarily replace module attributes (network / Sheets stubs)."""
+    saved = {name: getattr(module, name) for name in attrs}
+    for name, value in attrs.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(module, name, value)
+
+
+@contextlib.contextmanager
+def quiet():
+    """Discard stdout and pandas date-parsing warnings while timing."""
+    with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        yield
+
+
+def timed(fn, repeat=3, warmup=1):
+    """(seconds per run, last result) of `fn()`; output is discarded."""
+    times, result = [], None
+    with quiet():
+        for n in range(warmup + repeat):
+            t0 = time.perf_counter()
+            result = fn()
+            if n >= warmup:
+                times.append(time.perf_counter() - t0)
+    return times, result
+
+
+def stats(times):
+    return {
+        'runs': len(times),
+        'min': round(min(times), 6),
+        'median': round(statistics.median(times), 6),
+        'mean': round(statistics.fmean(times), 6),
+        'max': round(max(times), 6),
+    }
+
+
+# --- Benchmarks: each returns (fn, counters(result) -> dict) ---
+
+def bench_pivots(ctx):
+    return (lambda: build_pivot_table(ctx['price_df'], include_current_year=True),
+            lambda table: {'rows': len(table)})
+
+
+def bench_load_pp_levels(ctx):
+    return (lambda: load_pp_levels(ctx['paths']['pp_csv']),
+            lambda pp_map: {'years': len(pp_map)})
+
+
+def bench_engine_init(ctx):
+    paths = ctx['paths']
+    return (lambda: BacktestEngine(ctx['price_df'], paths['pp_csv'], paths['nifty_csv'], dict(ENGINE_CONFIG)),
+            lambda engine: {'dates': len(engine.panel.dates), 'symbols': len(engine.panel.symbols)})
+
+
+def _backtest(mode):
+    def bench(ctx):
+        engine = ctx['engine'].with_config({**ENGINE_CONFIG, "ENGINE_MODE": mode})
+
+        def run():
+            engine._reset_state()
+            return engine.run_backtest()
+        return run, lambda exits: {'entries': len(engine.entry_log), 'exit_rows': len(exits)}
+    return bench
+
+
+def bench_is_member(ctx):
+    mgr = ctx['engine'].nifty_mgr
+    rng = np.random.default_rng(1)
+    dates = ctx['engine'].panel.dates
+    symbols = ctx['engine'].panel.symbols
+    queries = [(symbols[rng.integers(len(symbols))], pd.Timestamp(dates[rng.integers(len(dates))]))
+               for _ in range(ctx['lookups'])]
+    return (lambda: sum(mgr.is_member(s, d) for s, d in queries),
+            lambda hits: {'lookups': len(queries), 'members': int(hits)})
+
+
+def bench_ic_scan(ctx):
+    import engine.ic_scanner as ic
+
+    path = make_option_chain(os.path.join(ctx['tmp'], 'BANKNIFTY-28-Aug-2025.csv'),
+                             spot=ctx['spot'], n_strikes=ctx['strikes'])
+    config = {"min_wing_width": "500", "min_net_credit": "0", "min_spot_diff": "300", "top_n_strategies": "3"}
+
+    async def no_alert(message):
+        return None
+
+    def run():
+        with patched(ic, get_config_dict=lambda *a, **k: config,
+                     get_banknifty_spot=lambda: ctx['spot'], send_telegram_alert=no_alert):
+            return asyncio.run(ic.find_adaptive_ic_from_csv(path))
+    return run, lambda ic_list: {'strikes': ctx['strikes'], 'ics': len(ic_list)}
+
+
+def _zone_frame(symbols, seed):
+    rng = np.random.default_rng(seed)
+    levels = np.round(rng.uniform(100, 5000, (len(symbols), 7)), 2)
+    df = pd.DataFrame(levels, columns=['PP', 'S1', 'S2', 'S3', 'R1', 'R2', 'R3'])
+    df.insert(0, 'Symbol', symbols)
+    df.insert(1, 'Year', 2025)
+    return df
+
+
+def bench_sheets_upsert(ctx):
+    symbols = symbol_names(ctx['sheet_rows'])
+    first = _zone_frame(symbols, 0)
+    changed = first.copy()
+    changed.loc[changed.sample(frac=0.1, random_state=1).index, 'PP'] += 1
+
+    def run():
+        ws = FakeWorksheet("trading_zones")
+        writer = DeltaSheetWriter(ws)
+        writer.upsert(first)
+        return ws, writer.upsert(changed)
+    return run, lambda res: {'rows': len(first), **res[1], **{f"api_{k}": v for k, v in res[0].calls.items()}}
+
+
+def bench_sheets_append(ctx):
+    records = _zone_frame(symbol_names(ctx['sheet_rows']), 2).to_dict('records')
+
+    def run():
+        ws = FakeWorksheet("ic_trades")
+        DeltaSheetWriter(ws).append(records)
+        return ws
+    return run, lambda ws: {'rows': len(records), **{f"api_{k}": v for k, v in ws.calls.items()}}
+
+
+BENCHMARKS = {
+    'pivots_build': bench_pivots,
+    'load_pp_levels': bench_load_pp_levels,
+    'engine_init': bench_engine_init,
+    'backtest_daily': _backtest("daily"),
+    'backtest_events': _backtest("events"),
+    'backtest_streaming': _backtest("streaming"),
+    'nifty_is_member': bench_is_member,
+    'ic_scan': bench_ic_scan,
+    'sheets_upsert': bench_sheets_upsert,
+    'sheets_append': bench_sheets_append,
+}
+
+
+def git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmarks(symbols=50, years=10, strikes=120, repeat=3, seed=0, only=None,
+                   lookups=10_000, sheet_rows=500):
+    """Run the selected benchmarks on a fresh synthetic dataset; returns the report dict."""
+    names = [n for n in BENCHMARKS if not only or any(o in n for o in only)]
+    params = {'symbols': symbols, 'years': years, 'strikes': strikes, 'repeat': repeat, 'seed': seed,
+              'lookups': lookups, 'sheet_rows': sheet_rows}
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'started': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'params': params,
+        'results': {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix='arc_bench_') as tmp:
+        price_df, paths = write_dataset(tmp, symbols, years, seed=seed)
+        ctx = {**params, 'tmp': tmp, 'price_df': price_df, 'paths': paths, 'spot': 52000.37}
+        with quiet():
+            ctx['engine'] = BacktestEngine(price_df, paths['pp_csv'], paths['nifty_csv'], dict(ENGINE_CONFIG))
+        report['params']['price_rows'] = len(price_df)
+
+        for name in names:
+            fn, counters = BENCHMARKS[name](ctx)
+            times, result = timed(fn, repeat)
+            report['results'][name] = {**stats(times), 'counters': counters(result)}
+            print(f"[Bench] ⏱️ {name:<18} median {report['results'][name]['median']:.4f}s")
+    return report
+
+
+def compare(report, baseline):
+    """Print median ratios (current / baseline) of benchmarks present in both."""
+    for name, res in report['results'].items():
+        base = baseline.get('results', {}).get(name)
+        if not base or not base['median']:
+            continue
+        ratio = res['median'] / base['median']
+        flag = "⚠️" if ratio > 1.1 else "✅"
+        print(f"[Bench] {flag} {name:<18} {base['median']:.4f}s -> {res['median']:.4f}s (x{ratio:.2f})")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Arc Reactor benchmarks on synthetic data")
+    ap.add_argument('--symbols', type=int, default=50)
+    ap.add_argument('--years', type=int, default=10)
+    ap.add_argument('--strikes', type=int, default=120, help="strikes per synthetic option chain")
+    ap.add_argument('--repeat', type=int, default=3)
+    ap.add_argument('--seed', type=int, default=0)
+    ap.add_argument('--only', action='append', help="run benchmarks whose name contains this (repeatable)")
+    ap.add_argument('--out', default=os.path.join(BENCH_DIR, 'latest.json'))
+    ap.add_argument('--compare', help="baseline JSON to compare medians against")
+    args = ap.parse_args(argv)
+
+    report = run_benchmarks(args.symbols, args.years, args.strikes, args.repeat, args.seed, args.only)
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=1)
+    print(f"[Bench] ✅ Results in {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+# synthetic.py
+"""
+Deterministic synthetic inputs for the benchmarks.
+
+Every generator takes a seed, so the same arguments always give the same
+data:
+    make_ohlc()          N symbols x M years of daily OHLCV (long frame)
+    make_intraday()      intraday bars consistent with a daily frame (same O/H/L/C per day)
+    make_membership()    Nifty-style membership CSV with churn (Symbol, from_date, to_date)
+    make_option_chain()  NSE option-chain CSV (the layout load_ic_chain_csv reads)
+    write_dataset()      all of the above plus the pivot CSV, in one directory
+"""
+
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+from engine.pivots import CSV_COLUMNS, build_pivot_table
+
+CHAIN_HEADER = (",OI,CHNG IN OI,VOLUME,IV,LTP,CHNG,BID QTY,BID,ASK,ASK QTY,STRIKE,"
+                "BID QTY,BID,ASK,ASK QTY,CHNG,LTP,IV,VOLUME,CHNG IN OI,OI,")
+
+
+def symbol_names(n_symbols):
+    return [f"SYM{i:03d}" for i in range(n_symbols)]
+
+
+def make_ohlc(n_symbols=50, years=10, start_year=2010, seed=0, gaps=0.02, vol=0.02):
+    """
+    Long OHLCV frame (symbol, date, open, high, low, close, volume) over
+    business days of `years` calendar years; `gaps` is the share of missing
+    rows per symbol. Rows are ordered by date, then symbol.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(f"{start_year}-01-01", f"{start_year + years - 1}-12-31")
+    T, S = len(dates), n_symbols
+
+    close = 100 * np.exp(np.cumsum(rng.normal(0, vol, (T, S)), axis=0)) * rng.uniform(0.5, 20, S)
+    open_ = close * (1 + rng.normal(0, vol / 4, (T, S)))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, vol / 2, (T, S))))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, vol / 2, (T, S))))
+    volume = rng.integers(10_000, 5_000_000, (T, S))
+    keep = rng.random((T, S)) >= gaps
+
+    t, s = np.nonzero(keep)
+    names = np.array(symbol_names(S), dtype=object)
+    return pd.DataFrame({
+        'symbol': names[s],
+        'date': dates[t],
+        'open': np.round(open_[t, s], 2),
+        'high': np.round(high[t, s], 2),
+        'low': np.round(low[t, s], 2),
+        'close': np.round(close[t, s], 2),
+        'volume': volume[t, s],
+    })
+
+
+def make_intraday(price_df, bars=75, minutes=5, seed=0):
+    """
+    Long frame of `bars` bars of `minutes` each per daily row, from 09:15.
+    Each day's path runs open -> one extreme -> the other -> close (which
+    extreme comes first is random) with noise inside [low, high], so the
+    bars aggregate back to the daily open, high, low and close.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(price_df)
+    o, h, l, c = (price_df[k].to_numpy(dtype=np.float64) for k in ('open', 'high', 'low', 'close'))
+    low_first = rng.random(n) < 0.5
+    e1, e2 = np.where(low_first, l, h), np.where(low_first, h, l)
+    k1 = rng.integers(1, bars - 1, n)
+    k2 = rng.integers(k1 + 1, bars)
+
+    x = np.arange(bars + 1)[None, :]
+    k1c, k2c = k1[:, None], k2[:, None]
+    path = np.where(x <= k1c, o[:, None] + (e1 - o)[:, None] * x / k1c,
+                    np.where(x <= k2c, e1[:, None] + (e2 - e1)[:, None] * (x - k1c) / (k2c - k1c),
+                             e2[:, None] + (c - e2)[:, None] * (x - k2c) / (bars - k2c)))
+    noise = rng.normal(0, 0.1, path.shape) * (h - l)[:, None]
+    noise[:, [0, -1]] = 0
+    path = np.clip(path + noise, l[:, None], h[:, None])
+    rows = np.arange(n)
+    path[rows, k1], path[rows, k2] = e1, e2
+
+    start = pd.to_datetime(price_df['date']).to_numpy() + np.timedelta64(9 * 60 + 15, 'm')
+    stamps = start[:, None] + (np.arange(bars) * minutes).astype('timedelta64[m]')[None, :]
+    return pd.DataFrame({
+        'symbol': np.repeat(price_df['symbol'].to_numpy(), bars),
+        'date': stamps.ravel(),
+        'open': np.round(path[:, :-1], 2).ravel(),
+        'high': np.round(np.maximum(path[:, :-1], path[:, 1:]), 2).ravel(),
+        'low': np.round(np.minimum(path[:, :-1], path[:, 1:]), 2).ravel(),
+        'close': np.round(path[:, 1:], 2).ravel(),
+        'volume': np.repeat(price_df['volume'].to_numpy() // bars, bars),
+    })
+
+
+def make_membership(symbols, start, end, seed=0, churn=0.4, rejoin=0.3):
+    """
+    Membership table in the nifty50_membership.csv format (dd-Mon-yy dates,
+    blank to_date = still a member). A `churn` share of symbols leaves at a
+    random date; a `rejoin` share of those comes back later.
+    """
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range(start, end)
+    rows = []
+    for sym in symbols:
+        joined = days[rng.integers(0, max(1, len(days) // 3))]
+        left = days[rng.integers(len(days) // 2, len(days))] if rng.random() < churn else None
+        rows.append((sym, joined, left))
+        if left is not None and rng.random() < rejoin:
+            rows.append((sym, left + pd.Timedelta(days=int(rng.integers(30, 400))), None))
+
+    fmt = lambda d: '' if d is None else d.strftime('%d-%b-%y')
+    return pd.DataFrame([(s, fmt(a), fmt(b)) for s, a, b in rows], columns=['Symbol', 'from_date', 'to_date'])
+
+
+def _norm_cdf(x):
+    return 0.5 * (1 + math.erf(x / math.sqrt(2)))
+
+
+def _chain_cell(x):
+    if x is None:
+        return "-"
+    text = f"{x:,.2f}"
+    return f'"{text}"' if "," in text else text
+
+
+def make_option_chain(path, spot=52000.0, n_strikes=120, step=100, seed=0, vol=0.15,
+                      days_to_expiry=7, holes=0.05, zeros=0.02):
+    """
+    Write an NSE-style option-chain CSV (CALLS | STRIKE | PUTS, thousands
+    separators, '-' for no quote) with Black-Scholes LTPs around `spot`.
+    `holes` / `zeros` are the shares of missing and zero LTPs per side.
+    """
+    rng = np.random.default_rng(seed)
+    T = days_to_expiry / 365
+    k0 = round(spot / step) * step - (n_strikes // 2) * step
+    lines = ["CALLS,,PUTS", CHAIN_HEADER]
+    for i in range(n_strikes):
+        K = k0 + i * step
+        d1 = (math.log(spot / K) + 0.5 * vol * vol * T) / (vol * math.sqrt(T))
+        d2 = d1 - vol * math.sqrt(T)
+        call = spot * _norm_cdf(d1) - K * _norm_cdf(d2)
+        put = call - spot + K
+        ce = round(max(round(call * 20) / 20, 0.05) * (1 + rng.normal(0, 0.01)), 2)
+        pe = round(max(round(put * 20) / 20, 0.05) * (1 + rng.normal(0, 0.01)), 2)
+        if rng.random() < holes:
+            ce = None
+        if rng.random() < holes:
+            pe = None
+        if rng.random() < zeros:
+            ce = 0.0
+        cols = ["", _chain_cell(rng.integers(0, 200000)), "0", _chain_cell(1234), "15.2", _chain_cell(ce), "1.0",
+                "100", _chain_cell(ce), _chain_cell(ce), "200", _chain_cell(K), "100", _chain_cell(pe),
+                _chain_cell(pe), "200", "1.0", _chain_cell(pe), "14.1", _chain_cell(5678), "0",
+                _chain_cell(rng.integers(0, 200000)), ""]
+        lines.append(",".join(cols))
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return path
+
+
+def write_dataset(out_dir, n_symbols=50, years=10, start_year=2010, seed=0):
+    """
+    Write ohlc.csv, hist_pp_levels.csv and nifty50_membership.csv for one
+    synthetic universe; returns (price_df, {name: path}).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    price_df = make_ohlc(n_symbols, years, start_year, seed)
+    paths = {
+        'ohlc_csv': os.path.join(out_dir, 'ohlc.csv'),
+        'pp_csv': os.path.join(out_dir, 'hist_pp_levels.csv'),
+        'nifty_csv': os.path.join(out_dir, 'nifty50_membership.csv'),
+    }
+    price_df.to_csv(paths['ohlc_csv'], index=False)
+    pivots = build_pivot_table(price_df, include_current_year=True)
+    pivots[CSV_COLUMNS].to_csv(paths['pp_csv'], index=False)
+    membership = make_membership(symbol_names(n_symbols), price_df['date'].min(), price_df['date'].max(), seed)
+    membership.to_csv(paths['nifty_csv'], index=False)
+    return price_df, paths
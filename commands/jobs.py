@@ -0,0 +1,206 @@
+# commands/jobs.py
+"""
+Job executor for bot commands.
+
+Blocking work never runs on the asyncio loop: I/O-bound jobs (Sheets,
+yfinance) go to a thread pool and CPU-bound scans to a process pool. Each
+command has a concurrency limit; jobs over the limit wait queued. Every job
+gets a short ID so /jobs and /cancel can refer to it.
+
+I/O jobs started with pass_job=True receive the Job as `job=`. They can call
+job.report("...") for progress and job.check() at safe points, which raises
+JobCancelled once /cancel was requested. CPU jobs can only be cancelled while
+still queued; a running one finishes in its process and its result is dropped.
+
+Jobs report queue time and run time per command to utils/metrics.py; a
+command armed with PROFILER.arm() (/profile) runs its next job under cProfile.
+"""
+
+import asyncio
+import functools
+import itertools
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from utils.metrics import PROFILER, inc, observe, profile_call
+
+IO_WORKERS = 8
+CPU_WORKERS = 2
+# max jobs of a command running at once; the rest queue
+COMMAND_LIMITS = {"refresh_zone": 1, "ic_scan": 2}
+DEFAULT_LIMIT = 4
+HISTORY = 50
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, job_id, command, kind):
+        self.id = job_id
+        self.command = command
+        self.kind = kind                  # "io" | "cpu"
+        self.status = QUEUED
+        self.progress = ""
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.task = None                  # asyncio.Task driving the job
+        self._future = None               # process-pool future of a CPU job
+        self._cancel = threading.Event()
+
+    @property
+    def active(self):
+        return self.status in (QUEUED, RUNNING)
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    def report(self, message):
+        self.progress = str(message)
+
+    def check(self):
+        """Raise JobCancelled if cancellation was requested."""
+        if self._cancel.is_set():
+            raise JobCancelled(f"job {self.id} cancelled")
+
+    def elapsed(self):
+        start = self.started or self.created
+        return (self.finished or time.time()) - start
+
+    def describe(self):
+        line = f"#{self.id} {self.command} — {self.status} ({self.elapsed():.0f}s)"
+        if self.progress and self.active:
+            line += f" · {self.progress}"
+        if self.error is not None and self.status == FAILED:
+            line += f" · {self.error}"
+        return line
+
+    async def wait(self):
+        """Result of the job; raises its error or JobCancelled."""
+        return await asyncio.shield(self.task)
+
+
+class JobManager:
+    def __init__(self, io_workers=IO_WORKERS, cpu_workers=CPU_WORKERS, limits=None, history=HISTORY):
+        self.limits = dict(COMMAND_LIMITS if limits is None else limits)
+        self.history = history
+        self.cpu_workers = cpu_workers
+        self.jobs = OrderedDict()          # id -> Job, oldest first
+        self._io_pool = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="job-io")
+        self._cpu_pool = None
+        self._semaphores = {}
+        self._ids = itertools.count(1)
+
+    # --- pools / limits ---
+    def _cpu(self):
+        if self._cpu_pool is None:
+            # spawn: the bot process has live threads, forking it is unsafe
+            self._cpu_pool = ProcessPoolExecutor(max_workers=self.cpu_workers,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        return self._cpu_pool
+
+    def _semaphore(self, command):
+        sem = self._semaphores.get(command)
+        if sem is None:
+            sem = self._semaphores[command] = asyncio.Semaphore(self.limits.get(command, DEFAULT_LIMIT))
+        return sem
+
+    def _remember(self, job):
+        self.jobs[job.id] = job
+        while len(self.jobs) > self.history:
+            oldest = next(iter(self.jobs.values()))
+            if oldest.active:
+                break
+            self.jobs.popitem(last=False)
+
+    # --- API ---
+    def submit(self, command, fn, *args, kind="io", pass_job=False, **kwargs):
+        """Start `fn(*args, **kwargs)` as a job (must be called on the running loop)."""
+        job = Job(str(next(self._ids)), command, kind)
+        self._remember(job)
+        job.task = asyncio.get_running_loop().create_task(self._run(job, fn, args, kwargs, pass_job))
+        # errors are delivered through job.wait(); don't warn when nobody awaits
+        job.task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return job
+
+    async def run(self, command, fn, *args, kind="io", pass_job=False, **kwargs):
+        """submit() and wait for the result."""
+        return await self.submit(command, fn, *args, kind=kind, pass_job=pass_job, **kwargs).wait()
+
+    async def _run(self, job, fn, args, kwargs, pass_job):
+        try:
+            async with self._semaphore(job.command):
+                job.check()
+                job.status = RUNNING
+                job.started = time.time()
+                observe("job_wait_seconds", job.started - job.created, command=job.command)
+                if PROFILER.take(job.command):
+                    fn, args = profile_call, (job.command, fn) + tuple(args)
+                if job.kind == "cpu":
+                    job._future = self._cpu().submit(fn, *args, **kwargs)
+                    try:
+                        result = await asyncio.wrap_future(job._future)
+                    except BrokenProcessPool:
+                        self._cpu_pool = None
+                        raise
+                else:
+                    if pass_job:
+                        kwargs = {**kwargs, "job": job}
+                    loop = asyncio.get_running_loop()
+                    result = await loop.run_in_executor(self._io_pool, functools.partial(fn, *args, **kwargs))
+                job.check()
+            job.result = result
+            job.status = DONE
+            return result
+        except (JobCancelled, asyncio.CancelledError):
+            job.status = CANCELLED
+            raise JobCancelled(f"job {job.id} cancelled")
+        except Exception as e:
+            job.error = e
+            job.status = FAILED
+            raise
+        finally:
+            job.finished = time.time()
+            inc("jobs_total", command=job.command, status=job.status)
+            if job.started is not None:
+                observe("job_seconds", job.finished - job.started, command=job.command, status=job.status)
+
+    def get(self, job_id):
+        return self.jobs.get(str(job_id).lstrip("#"))
+
+    def cancel(self, job_id):
+        """Request cancellation; returns the Job or None if unknown."""
+        job = self.get(job_id)
+        if job is None or not job.active:
+            return job
+        job._cancel.set()
+        if job.status == QUEUED:
+            job.task.cancel()
+        elif job._future is not None:
+            job._future.cancel()
+        return job
+
+    def active(self, command=None):
+        return [j for j in self.jobs.values() if j.active and (command is None or j.command == command)]
+
+    def recent(self, n=10):
+        return list(self.jobs.values())[-n:]
+
+    def shutdown(self):
+        self._io_pool.shutdown(wait=False, cancel_futures=True)
+        if self._cpu_pool is not None:
+            self._cpu_pool.shutdown(wait=False, cancel_futures=True)
+
+
+JOBS = JobManager()
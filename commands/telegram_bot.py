@@ -4,13 +4,15 @@ from telegram.ext import (
     MessageHandler
 )
 from telegram.ext.filters import MessageFilter
-from config.config_loader import CONFIG
+from commands.jobs import JOBS, JobCancelled
 from engine.ic_scanner import find_adaptive_ic_from_csv, log_and_alert_ic_candidates
-from upload.gdrive_sync import read_sheet
+from upload.journal import JOURNAL, MIRROR
+from utils.alerts import DISPATCHER
+from utils.metrics import PROFILER, timer
 from zone_generator import generate_zone_file
+import asyncio
+import functools
 import logging
-import os
-import tempfile
 
 # === Custom CSV File Filter ===
 class CSVFileFilter(MessageFilter):
@@ -26,22 +28,24 @@ async def start(update: Update, _: ContextTypes.DEFAULT_TYPE):
         "Available commands:\n"
         "• /refresh\\_zone — Regenerate Fibonacci pivot zones for all Nifty50 stocks\n"
         "• /signal SYMBOL — Check signal status for a specific stock\n"
+        "• /jobs — Show running and recent jobs\n"
+        "• /cancel JOB\\_ID — Cancel a queued or running job\n"
+        "• /profile COMMAND — Profile the next run of a command (e.g. refresh\\_zone, ic\\_scan, signal)\n"
         "• Upload a `.csv` option chain file → IC Scanner runs automatically",
         parse_mode="Markdown"
     )
 
 # === Helper: Check signal for a stock ===
-def check_signal_for_stock(row, entry_log_df):
+def check_signal_for_stock(row, entry):
     """
     Checks if a symbol is near a key pivot zone and whether a recent entry already exists.
+    entry: the symbol's entry_log row, or None.
     Returns a formatted status string.
     """
     symbol = str(row.get("Symbol", "")).upper()
 
     # Check for existing entry in log
-    already_entered = False
-    if not entry_log_df.empty and "Symbol" in entry_log_df.columns:
-        already_entered = symbol in entry_log_df["Symbol"].str.upper().values
+    already_entered = entry is not None
 
     zones = {
         "PP": row.get("PP"),
@@ -70,21 +74,22 @@ async def signal(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return
 
         symbol = context.args[0].upper()
-        sheet_id = CONFIG["GSHEET_ID"]
 
-        zone_df = read_sheet(sheet_id, "trading_zones")
-        entry_log_df = read_sheet(sheet_id, "entry_log")
-
-        if zone_df.empty or "Symbol" not in zone_df.columns:
-            await update.message.reply_text("❌ Zone sheet is empty or unreachable.")
-            return
+        # indexed reads from the local journal; Sheets is only read on a first run
+        try:
+            await asyncio.to_thread(MIRROR.ensure_pulled, "trading_zones", "entry_log")
+        except Exception as e:
+            print(f"[Signal] ⚠️ Could not seed journal from Sheets: {e}")
 
-        if symbol not in zone_df["Symbol"].values:
-            await update.message.reply_text(f"❌ Symbol *{symbol}* not found in zone sheet.", parse_mode="Markdown")
+        row = JOURNAL.get("trading_zones", symbol)
+        if row is None:
+            if not JOURNAL.count("trading_zones"):
+                await update.message.reply_text("❌ Zone journal is empty — run /refresh\\_zone.", parse_mode="Markdown")
+            else:
+                await update.message.reply_text(f"❌ Symbol *{symbol}* not found in zone sheet.", parse_mode="Markdown")
             return
 
-        row = zone_df[zone_df["Symbol"] == symbol].iloc[0]
-        msg = check_signal_for_stock(row, entry_log_df)
+        msg = check_signal_for_stock(row, JOURNAL.get("entry_log", symbol))
         await update.message.reply_text(msg, parse_mode="Markdown")
 
     except Exception as e:
@@ -93,17 +98,59 @@ async def signal(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 # === Telegram Command: Refresh Zone ===
 async def refresh_zone(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await update.message.reply_text("🔄 Regenerating pivot zones for all Nifty50 stocks... This may take a few minutes.")
+    running = JOBS.active("refresh_zone")
+    job = JOBS.submit("refresh_zone", generate_zone_file, force=True, pass_job=True)
+    queued = f" (queued behind #{running[0].id})" if running else ""
+    await update.message.reply_text(
+        f"🔄 Job #{job.id}: regenerating pivot zones for all Nifty50 stocks{queued}... This may take a few minutes.\n"
+        f"Use /jobs for progress or /cancel {job.id} to stop it."
+    )
+    # report the outcome later; the handler returns right away
+    context.application.create_task(_report_refresh(update, job))
+
+async def _report_refresh(update: Update, job):
     try:
-        df = generate_zone_file(force=True)
+        df = await job.wait()
         if df is not None:
-            await update.message.reply_text(f"✅ Zone file refreshed successfully. {len(df)} symbols updated.")
+            await update.message.reply_text(f"✅ Job #{job.id}: zone file refreshed successfully. {len(df)} symbols updated.")
         else:
-            await update.message.reply_text("❌ Zone generation failed. Check logs.")
+            await update.message.reply_text(f"❌ Job #{job.id}: zone generation failed. Check logs.")
+    except JobCancelled:
+        await update.message.reply_text(f"🛑 Job #{job.id} cancelled.")
     except Exception as e:
         logging.exception(e)
         await update.message.reply_text(f"❌ Error refreshing zones: {e}")
 
+# === Telegram Commands: Jobs / Cancel ===
+async def jobs(update: Update, _: ContextTypes.DEFAULT_TYPE):
+    recent = JOBS.recent()
+    if not recent:
+        await update.message.reply_text("No jobs yet.")
+        return
+    await update.message.reply_text("🧵 Recent jobs:\n" + "\n".join(job.describe() for job in reversed(recent)))
+
+async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not context.args:
+        await update.message.reply_text("❓ Usage: /cancel JOB_ID")
+        return
+    job = JOBS.cancel(context.args[0])
+    if job is None:
+        await update.message.reply_text(f"❌ No job {context.args[0]}.")
+    elif not job.active:
+        await update.message.reply_text(f"ℹ️ Job #{job.id} already {job.status}.")
+    else:
+        await update.message.reply_text(f"🛑 Cancelling job #{job.id} ({job.command})...")
+
+# === Telegram Command: Profile ===
+async def profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not context.args:
+        armed = ", ".join(PROFILER.armed()) or "none"
+        await update.message.reply_text(f"❓ Usage: /profile COMMAND (armed: {armed})")
+        return
+    command = context.args[0].lstrip("/")
+    PROFILER.arm(command)
+    await update.message.reply_text(f"🔬 The next {command} run will be profiled (data/profiles/).")
+
 # === Telegram CSV Upload for IC ===
 async def upload_ic_csv(update: Update, context: ContextTypes.DEFAULT_TYPE):
     doc = update.message.document
@@ -111,35 +158,72 @@ async def upload_ic_csv(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("⚠️ Please upload a valid CSV file.")
         return
 
-    with tempfile.TemporaryDirectory() as tmpdir:
-        file_path = os.path.join(tmpdir, doc.file_name)
-        new_file = await context.bot.get_file(doc.file_id)
-        await new_file.download_to_drive(file_path)
+    # parsed straight from memory (engine/chain_parser.py), no temp file
+    new_file = await context.bot.get_file(doc.file_id)
+    data = bytes(await new_file.download_as_bytearray())
 
-        try:
-            # 🔒 Detect locked mode from filename
-            locked_mode = "locked" in doc.file_name.lower()
+    try:
+        # 🔒 Detect locked mode from filename
+        locked_mode = "locked" in doc.file_name.lower()
 
-            ic_list = await find_adaptive_ic_from_csv(file_path)
+        ic_list = await find_adaptive_ic_from_csv(doc.file_name, jobs=JOBS, data=data)
 
-            if ic_list:
-                await log_and_alert_ic_candidates(ic_list)
-                if locked_mode:
-                    await update.message.reply_text("🔒 Locked IC strategy scanned and logged.")
-                else:
-                    await update.message.reply_text("✅ IC candidates scanned and logged.")
+        if ic_list:
+            await log_and_alert_ic_candidates(ic_list)
+            if locked_mode:
+                await update.message.reply_text("🔒 Locked IC strategy scanned and logged.")
             else:
-                await update.message.reply_text("⚠️ No valid ICs found.")
+                await update.message.reply_text("✅ IC candidates scanned and logged.")
+        else:
+            await update.message.reply_text("⚠️ No valid ICs found.")
 
-        except Exception as e:
-            await update.message.reply_text(f"❌ Failed to scan IC: {e}")
+    except Exception as e:
+        await update.message.reply_text(f"❌ Failed to scan IC: {e}")
 
 # === Start Bot ===
+def _instrumented(command, handler, profiled=True):
+    """
+    Handler timed as bot_command_seconds{command}. With profiled=True an armed
+    /profile runs it under cProfile (the loop thread, so concurrent handlers
+    show up too); commands backed by a job are profiled in the job instead.
+    """
+    @functools.wraps(handler)
+    async def wrapper(update, context):
+        with timer("bot_command_seconds", command=command):
+            if not profiled:
+                return await handler(update, context)
+            with PROFILER.profile(command):
+                return await handler(update, context)
+    return wrapper
+
+async def _post_init(app):
+    # alerts go out through the application's bot and its connection pool
+    DISPATCHER.attach(app.bot, loop=asyncio.get_running_loop())
+    MIRROR.start()
+
+async def _post_stop(_app):
+    await DISPATCHER.close()
+    await asyncio.to_thread(MIRROR.stop)      # last outbox flush
+
+async def _shutdown_jobs(_app):
+    JOBS.shutdown()
+
 def start_bot(config):
     logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
-    app = ApplicationBuilder().token(config["TELEGRAM_TOKEN"]).build()
-    app.add_handler(CommandHandler("start", start))
-    app.add_handler(CommandHandler("signal", signal))
-    app.add_handler(CommandHandler("refresh_zone", refresh_zone))
-    app.add_handler(MessageHandler(csv_filter, upload_ic_csv))
+    app = (
+        ApplicationBuilder()
+        .token(config["TELEGRAM_TOKEN"])
+        .concurrent_updates(True)      # one slow command must not hold up the others
+        .post_init(_post_init)
+        .post_stop(_post_stop)         # the bot is still up: deliver queued alerts, flush the journal
+        .post_shutdown(_shutdown_jobs)
+        .build()
+    )
+    app.add_handler(CommandHandler("start", _instrumented("start", start)))
+    app.add_handler(CommandHandler("signal", _instrumented("signal", signal)))
+    app.add_handler(CommandHandler("refresh_zone", _instrumented("refresh_zone", refresh_zone, profiled=False)))
+    app.add_handler(CommandHandler("jobs", _instrumented("jobs", jobs)))
+    app.add_handler(CommandHandler("cancel", _instrumented("cancel", cancel)))
+    app.add_handler(CommandHandler("profile", _instrumented("profile", profile, profiled=False)))
+    app.add_handler(MessageHandler(csv_filter, _instrumented("ic_upload", upload_ic_csv)))
     app.run_polling()
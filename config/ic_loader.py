@@ -0,0 +1,10 @@
+# config/ic_loader.py
+
+import json
+
+try:
+    with open("config/ic_settings.json") as f:
+        IC_SETTINGS = json.load(f)
+except Exception as e:
+    print(f"[Config] ⚠️ Failed to load ic_settings.json: {e}")
+    IC_SETTINGS = {}
@@ -1,26 +1,47 @@
 import pandas as pd
 import numpy as np
 from utils.nifty_manager import NiftyManager
-from engine.entry_signals import scan_multiple
+from engine.entry_signals import ZONES, evaluate_entries, mark_entry
+from engine.indicators import IndicatorPanel, filters_enabled, signal_settings
+from engine.intraday import INTRADAY_ROOT, IntradayResolver, intraday_enabled
+from engine.pivots import LEVELS, PivotTable
+from engine.price_panel import PricePanel
+from engine.position_book import PositionBook
+from utils.metrics import timer
+
+# entry zone -> column in LEVELS of its exit target (-1: PP is held, no zone exit)
+EXIT_LEVEL = np.array([-1, LEVELS.index("R1"), LEVELS.index("R2"), LEVELS.index("R3")])
+
+EXIT_COLUMNS = [
+    'symbol', 'entry_price', 'exit_price', 'entry_zone',
+    'entry_date', 'exit_date', 'quantity', 'pnl', 'reason'
+]
 
 
 def load_pp_levels(pp_csv):
-    df = pd.read_csv(pp_csv)
-    pp_map = {}
-    for _, row in df.iterrows():
-        yr = int(row['Year'])
-        sym = row['symbol']
-        levels = {
-            "PP": row['pp'],
-            "S1": row['s1'],
-            "S2": row['s2'],
-            "S3": row['s3'],
-            "R1": row['r1'],
-            "R2": row['r2'],
-            "R3": row['r3']
-        }
-        pp_map.setdefault(yr, {})[sym] = levels
-    return pp_map
+    """Legacy {year: {symbol: {level: value}}} map of a pivot CSV."""
+    return PivotTable.from_csv(pp_csv).to_pp_map()
+
+
+def pivot_cube(pp_map, symbols, years):
+    """
+    Lay pp_map out as a float array of shape (n_years, n_symbols, len(LEVELS)),
+    where row k holds the levels for year years[0] + k. Missing entries are NaN.
+    """
+    y0 = int(years.min()) if len(years) else 0
+    n_years = int(years.max()) - y0 + 1 if len(years) else 0
+    sym_index = {s: i for i, s in enumerate(symbols)}
+    cube = np.full((n_years, len(symbols), len(LEVELS)), np.nan)
+    for yr, by_sym in pp_map.items():
+        k = int(yr) - y0
+        if not 0 <= k < n_years:
+            continue
+        for sym, levels in by_sym.items():
+            s = sym_index.get(sym)
+            if s is None:
+                continue
+            cube[k, s] = [levels.get(lv, np.nan) for lv in LEVELS]
+    return y0, cube
 
 
 class MockPriceFeed:
@@ -41,16 +62,79 @@ class MockPriceFeed:
         }
 
 
+class DayState:
+    """Per-symbol state carried from one day to the next by the daily loop."""
+
+    def __init__(self, n_syms=0):
+        self.was_member = np.full(n_syms, -1, dtype=np.int8)   # -1: not seen yet
+        self.removed = np.zeros(n_syms, dtype=bool)
+        self.used = np.zeros((n_syms, len(ZONES)), dtype=bool)  # (zone, year) slots taken
+        self.cur_year = None
+
+    def grow(self, n_syms):
+        """Extend to `n_syms` symbols (new ones appended, as a stream discovers them)."""
+        extra = n_syms - len(self.removed)
+        if extra > 0:
+            self.was_member = np.concatenate([self.was_member, np.full(extra, -1, dtype=np.int8)])
+            self.removed = np.concatenate([self.removed, np.zeros(extra, dtype=bool)])
+            self.used = np.concatenate([self.used, np.zeros((extra, len(ZONES)), dtype=bool)])
+
+
 class BacktestEngine:
     def __init__(self, price_df, pp_csv, nifty_csv, config):
-        self.price_df = price_df.copy()
+        # price_df is only read, never copied; None builds an engine for
+        # run_stream() that never holds the whole history
+        self.price_df = price_df
         self.config = config
         self.nifty_mgr = NiftyManager(nifty_csv)
-        self.pp_map = load_pp_levels(pp_csv)
+        self.pivots = PivotTable.from_csv(pp_csv)
+
+        # Columnar core: dense (date x symbol) prices and a struct-of-arrays book
+        self.panel = PricePanel.from_frame(price_df) if price_df is not None else None
+        self.data_version = price_df.attrs.get('data_version') if price_df is not None else None
+        self._member = None                  # cached membership mask (read-only)
+        self._indicators = {}                # (rsi_period, volume_days) -> IndicatorPanel
+        self._intraday = {}                  # intraday store root -> IntradayResolver
+        self._reset_state()
 
-        self.positions = pd.DataFrame(columns=[
-            'symbol', 'entry_zone', 'entry_price', 'quantity', 'entry_date'
-        ])
+    def with_config(self, config):
+        """
+        Fresh engine for `config` that shares this one's loaded inputs (prices,
+        panel, pivots, membership) read-only, so repeated runs skip the loading.
+        """
+        clone = object.__new__(type(self))
+        clone.price_df = self.price_df
+        clone.config = config
+        clone.nifty_mgr = self.nifty_mgr
+        clone.pivots = self.pivots
+        clone.panel = self.panel
+        clone.data_version = self.data_version
+        clone._member = self._membership_mask()
+        clone._indicators = self._indicators
+        clone._intraday = self._intraday
+        clone._reset_state()
+        return clone
+
+    def for_symbols(self, sym_ids, config=None):
+        """
+        Engine over a subset of the panel's symbols (e.g. one shard), sharing
+        pivots and membership; `price_df` is not carried over.
+        """
+        clone = object.__new__(type(self))
+        clone.price_df = None
+        clone.config = dict(self.config if config is None else config)
+        clone.nifty_mgr = self.nifty_mgr
+        clone.pivots = self.pivots
+        clone.panel = self.panel.take(sym_ids)
+        clone.data_version = self.data_version
+        clone._member = self._membership_mask()[:, np.asarray(sym_ids, dtype=np.int64)]
+        clone._indicators = {k: ind.take(sym_ids) for k, ind in self._indicators.items()}
+        clone._intraday = self._intraday
+        clone._reset_state()
+        return clone
+
+    def _reset_state(self):
+        self.book = PositionBook()
         self.active_positions = {}
         self.entry_log = []
         self.exit_log = []
@@ -58,137 +142,213 @@ class BacktestEngine:
         # Protocol-R tracking
         self.removal_dates = {}              # sym -> date of member→non-member flip
         self.protocol_r_exited_syms = set()  # syms already fully exited by Protocol-R
-        self._was_member = {}                # sym -> last seen membership (bool)
+
+    @property
+    def pp_map(self):
+        """Legacy {year: {symbol: levels}} view of self.pivots."""
+        return self.pivots.to_pp_map()
+
+    @property
+    def positions(self):
+        """Open positions as a DataFrame (legacy view of self.book)."""
+        return self.book.to_frame(self.panel.symbols, ZONES)
+
+    def _membership_mask(self):
+        """(date x symbol) mask of cells that have a price row and are Nifty members."""
+        if self._member is None:
+            panel = self.panel
+            self._member = self.nifty_mgr.membership_bitmap(panel.dates, panel.symbols) & panel.present
+        return self._member
+
+    def indicators(self):
+        """IndicatorPanel for the configured RSI / volume settings (disk-cached)."""
+        key = signal_settings(self.config)
+        if key not in self._indicators:
+            self._indicators[key] = IndicatorPanel.load_or_compute(
+                self.panel, *key, data_version=self.data_version)
+        return self._indicators[key]
+
+    def _entry_gate(self):
+        """(date x symbol x zone) mask of entries allowed by the signal filters, or None when off."""
+        if not filters_enabled(self.config):
+            return None
+        return self.indicators().gate(self.config)
+
+    def intraday(self):
+        """IntradayResolver for same-day entry / exit order, or None when config["INTRADAY"] is off."""
+        if not intraday_enabled(self.config):
+            return None
+        root = self.config.get("INTRADAY_STORE", INTRADAY_ROOT)
+        if root not in self._intraday:
+            self._intraday[root] = IntradayResolver(root)
+        return self._intraday[root]
+
+    def _pivot_cube(self, panel=None):
+        """
+        pivot_cube() for the panel (default self.panel), with entry levels of
+        zones left out of config["ZONES"] (default: all of ZONES) blanked so
+        they never fill.
+        """
+        panel = self.panel if panel is None else panel
+        y0, cube = self.pivots.align(panel.symbols, panel.years)
+        enabled = self.config.get("ZONES")
+        if enabled is not None:
+            if isinstance(enabled, str):
+                enabled = [z.strip() for z in enabled.replace("+", ",").split(",") if z.strip()]
+            unknown = set(enabled) - set(ZONES)
+            if unknown:
+                raise ValueError(f"[Backtest] ❌ Unknown zones in config ZONES: {sorted(unknown)}")
+            off = [i for i, z in enumerate(ZONES) if z not in enabled]
+            cube[:, :, off] = np.nan
+        return y0, cube
 
     def run_backtest(self):
-        all_dates = sorted(self.price_df['date'].unique())
-        prot_r = self.config.get("PROTOCOL_R", "N")  # "Y" or "N"
+        """
+        Run the backtest and return the exit log. config["ENGINE_MODE"] picks
+        "daily" (default, steps every date), "events" (first-touch mode in
+        engine/first_touch.py; same results, skips days where nothing fires)
+        or "streaming" (engine/streaming.py over date chunks of price_df; same
+        results, only one chunk laid out at a time). config["SHARDS"] > 1
+        splits the symbols across processes (engine/sharding.py) and merges
+        to the same output. config["INTRADAY"] = "Y" settles same-day
+        entry / exit order from intraday bars in every mode (engine/intraday.py).
+        """
+        mode = self.config.get("ENGINE_MODE", "daily")
+        if int(self.config.get("SHARDS", 1)) > 1:
+            from engine.sharding import run_sharded
+            mode, run = "sharded", run_sharded
+        elif mode == "events":
+            from engine.first_touch import run_first_touch
+            run = run_first_touch
+        elif mode == "streaming":
+            from engine.streaming import ListSink, frame_chunks, run_stream
+            run = lambda engine: run_stream(engine, frame_chunks(engine.price_df), ListSink())
+        else:
+            mode, run = "daily", BacktestEngine._run_daily
+
+        with timer("backtest_seconds", mode=mode):
+            exits = run(self)
+        n_open = int((exits['reason'] == 'OPEN').sum())
+        print(f"[Backtest] ✅ {mode}: {len(self.entry_log)} entries, {len(exits) - n_open} exits, {n_open} open")
+        return exits
+
+    def run_stream(self, chunks, sink=None):
+        """
+        Streaming run over `chunks`, date-ordered OHLC frames (see
+        engine/streaming.py: csv_chunks, store_chunks). With a sink, trades
+        go to it as they happen and its close() result is returned; without
+        one, returns the exit log like run_backtest().
+        """
+        from engine.streaming import ListSink, run_stream
+        sink = ListSink() if sink is None else sink
+        with timer("backtest_seconds", mode="streaming"):
+            result = run_stream(self, chunks, sink)
+        print(f"[Backtest] ✅ streaming: {sink.n_entries} entries, {sink.n_exits} exits, {sink.n_open} open")
+        return result
+
+    def _run_daily(self):
+        panel = self.panel
+        state = DayState(len(panel.symbols))
+        y0, cube = self._pivot_cube()
+        gate = self._entry_gate()                           # RSI / volume filters (opt-in)
+        self._step_days(panel, y0, cube, self._membership_mask(), gate, state)
+
+        # === Unrealized P&L for still-open positions ===
+        if len(panel.dates):
+            self._open_rows(panel.present[-1], panel.close[-1])
+        return pd.DataFrame(self.exit_log, columns=EXIT_COLUMNS)
 
-        for dt in all_dates:
-            dt_ts = pd.to_datetime(dt)
-            year_key = int(dt_ts.year)
+    def _step_days(self, panel, y0, cube, member, gate, state):
+        """
+        Step every date of `panel`: Protocol-R flips, entries, then exits.
+        Per-symbol state lives in `state`, so consecutive panels (chunks of
+        one history) continue where the previous one stopped.
+        """
+        alloc = self.config["ALLOCATION_PER_ZONE"]
+        intraday = self.intraday()                          # same-day entry / exit order (opt-in)
+        symbols = panel.symbols
+        no_pivots = np.full((len(symbols), len(LEVELS)), np.nan)
+        was_member, removed, used = state.was_member, state.removed, state.used
 
-            day_df = self.price_df[self.price_df['date'] == dt]
-            symbols_today = day_df['symbol'].unique().tolist()
-            pivots_today = self.pp_map.get(year_key, {})
+        for i in range(len(panel.dates)):
+            dt_ts = pd.Timestamp(panel.dates[i])
+            year_key = int(panel.years[i])
+            if year_key != state.cur_year:
+                state.cur_year = year_key
+                used[:] = False
 
-            # Quick lookups
-            day_highs = dict(zip(day_df['symbol'], day_df['high']))
-            day_closes = dict(zip(day_df['symbol'], day_df['close']))
+            k = year_key - y0
+            pivots_today = cube[k] if 0 <= k < len(cube) else no_pivots
+            present = panel.present[i]
+            is_mem = member[i]
 
             # --- Membership flip detection (member -> non-member) ---
-            for sym in symbols_today:
-                is_mem = self.nifty_mgr.is_member(sym, dt)
-                was_mem = self._was_member.get(sym)
-                if was_mem is None:
-                    # first time we see the symbol; remember state
-                    self._was_member[sym] = is_mem
-                else:
-                    if was_mem and not is_mem and sym not in self.removal_dates:
-                        self.removal_dates[sym] = dt_ts
-                        print(f"[Protocol-R Activated] {sym} removed on {dt_ts.date()}")
-                    self._was_member[sym] = is_mem
-
-            # --- ENTRY: only while member ---
-            for sym in symbols_today:
-                if not self.nifty_mgr.is_member(sym, dt):
-                    continue
-
-                entries = scan_multiple(
-                    symbols=[sym],
-                    pivots_map={sym: pivots_today.get(sym, {})},
-                    price_feed=MockPriceFeed(day_df),
-                    config=self.config,
-                    date=dt,
-                    current_year=year_key,
-                    active_positions=self.active_positions
-                )
-
-                for e in entries:
-                    if e and e.action == "BUY":
-                        self.positions = pd.concat([self.positions, pd.DataFrame([{
-                            'symbol': e.symbol,
-                            'entry_zone': e.zone,
-                            'entry_price': e.price,
-                            'quantity': e.qty,
-                            'entry_date': dt_ts
-                        }])], ignore_index=True)
-
-                        self.entry_log.append({
-                            'symbol': e.symbol,
-                            'zone': e.zone,
-                            'price': e.price,
-                            'date': dt_ts
-                        })
-
-            # --- EXIT processing ---
-            exit_rows = []
+            flips = np.flatnonzero(present & (was_member == 1) & ~is_mem & ~removed)
+            for s in panel.day_order(i, flips):
+                removed[s] = True
+                self.removal_dates[symbols[s]] = dt_ts
+                print(f"[Protocol-R Activated] {symbols[s]} removed on {dt_ts.date()}")
+            was_member[present] = is_mem[present]
+
+            # --- ENTRY: only while member, once per (zone, year) ---
+            zone_px = pivots_today[:, :len(ZONES)]
+            eligible = is_mem if gate is None else is_mem[:, None] & gate[i]
+            fills = evaluate_entries(panel.low[i], zone_px, used, eligible=eligible, allocation=alloc)
+            used[fills.sym, fills.zone] = True
+            for f in panel.day_order_fills(i, fills):
+                s, z = fills.sym[f], fills.zone[f]
+                sym, zone = symbols[s], ZONES[z]
+                mark_entry(self.active_positions, sym, zone, year_key, dt_ts)
 
-            # --- Normal exits for still-members ---
-            for idx, pos in self.positions.iterrows():
-                sym = pos['symbol']
-                zone = pos['entry_zone']
-                pivot = pivots_today.get(sym)
-                if pivot is None or sym not in day_highs:
-                    continue
-
-                high_px = day_highs[sym]
-                reason = None
-                exit_px = None
-
-                if zone == "S1" and high_px >= pivot["R1"]:
-                    reason, exit_px = "R1", pivot["R1"]
-                elif zone == "S2" and high_px >= pivot["R2"]:
-                    reason, exit_px = "R2", pivot["R2"]
-                elif zone == "S3" and high_px >= pivot["R3"]:
-                    reason, exit_px = "R3", pivot["R3"]
-
-                if reason:
-                    pnl = (exit_px - pos['entry_price']) * pos['quantity']
-                    exit_rows.append({
-                        'symbol': sym,
-                        'entry_price': pos['entry_price'],
-                        'exit_price': exit_px,
-                        'entry_zone': pos['entry_zone'],
-                        'entry_date': pos['entry_date'],
-                        'exit_date': dt_ts,
-                        'quantity': pos['quantity'],
-                        'pnl': pnl,
-                        'reason': reason
-                    })
-                    self.positions.at[idx, 'to_remove'] = True
-
-            # Drop closed positions
-            if not self.positions.empty and 'to_remove' in self.positions.columns:
-                self.positions = self.positions[self.positions['to_remove'] != True]
-                self.positions.drop(columns=['to_remove'], inplace=True)
+                self.book.add(s, z, fills.price[f], int(fills.qty[f]), dt_ts)
+                self.entry_log.append({
+                    'symbol': sym,
+                    'zone': zone,
+                    'price': fills.price[f],
+                    'date': dt_ts
+                })
+
+            # --- EXIT processing: S1->R1, S2->R2, S3->R3 on the day's high ---
+            slots = self.book.open_slots()
+            if not slots.size:
+                continue
+            pos_sym = self.book.sym[slots]
+            lvl = EXIT_LEVEL[self.book.zone[slots]]
+            target = np.where(lvl >= 0, pivots_today[pos_sym, np.maximum(lvl, 0)], np.nan)
+            hit = panel.high[i][pos_sym] >= target
+            if intraday is not None:
+                # fills of today whose bar also reached the target: did the high come after the fill?
+                same_day = np.flatnonzero(hit & (self.book.entry_date[slots] == dt_ts.to_datetime64()))
+                for j in same_day:
+                    hit[j] = intraday.allows_exit(symbols[pos_sym[j]], dt_ts, self.book.entry_price[slots[j]], target[j])
+
+            exit_rows = []
+            for slot, lv in zip(slots[hit], lvl[hit]):
+                exit_rows.append(self._exit_row(slot, pivots_today[self.book.sym[slot], lv], dt_ts, LEVELS[lv]))
+            self.book.close_many(slots[hit])
 
             if exit_rows:
                 self.exit_log.extend(exit_rows)
 
-        # === Unrealized P&L for still-open positions ===
-        last_date = pd.to_datetime(self.price_df['date'].max())
-        last_df = self.price_df[self.price_df['date'] == last_date]
-        last_closes = dict(zip(last_df['symbol'], last_df['close']))
-
-        for _, pos in self.positions.iterrows():
-            sym = pos['symbol']
-            if sym in last_closes:
-                last_close = last_closes[sym]
-                unrealized_pnl = (last_close - pos['entry_price']) * pos['quantity']
-                self.exit_log.append({
-                    'symbol': sym,
-                    'entry_price': pos['entry_price'],
-                    'exit_price': last_close,
-                    'entry_zone': pos['entry_zone'],
-                    'entry_date': pos['entry_date'],
-                    'exit_date': "OPEN",
-                    'quantity': pos['quantity'],
-                    'pnl': unrealized_pnl,
-                    'reason': "OPEN"
-                })
-        print(self.exit_log)
-        return pd.DataFrame(self.exit_log, columns=[
-            'symbol', 'entry_price', 'exit_price', 'entry_zone',
-            'entry_date', 'exit_date', 'quantity', 'pnl', 'reason'
-        ])
+    def _open_rows(self, last_present, last_closes):
+        """OPEN rows (unrealized P&L at the last close) for positions still held."""
+        for slot in self.book.open_slots():
+            s = self.book.sym[slot]
+            if last_present[s]:
+                self.exit_log.append(self._exit_row(slot, last_closes[s], "OPEN", "OPEN"))
+
+    def _exit_row(self, slot, exit_px, exit_date, reason):
+        book = self.book
+        entry_price = book.entry_price[slot]
+        quantity = int(book.quantity[slot])
+        return {
+            'symbol': self.panel.symbols[book.sym[slot]],
+            'entry_price': entry_price,
+            'exit_price': exit_px,
+            'entry_zone': ZONES[book.zone[slot]],
+            'entry_date': pd.Timestamp(book.entry_date[slot]),
+            'exit_date': exit_date,
+            'quantity': quantity,
+            'pnl': (exit_px - entry_price) * quantity,
+            'reason': reason
+        }
@@ -0,0 +1,168 @@
+# chain_parser.py
+"""
+Streaming parser for NSE option-chain CSV exports.
+
+    CALLS,,PUTS
+    ,OI,CHNG IN OI,VOLUME,IV,LTP,CHNG,BID QTY,BID,ASK,ASK QTY,STRIKE,BID QTY,BID,ASK,ASK QTY,CHNG,LTP,IV,VOLUME,CHNG IN OI,OI,
+    ,"1,234",...,"52,000.00",...
+
+The header row fixes the layout: columns left of STRIKE are calls, right of
+it puts. It is detected once per distinct header (cached by hash) and the
+rows are then read in a single csv pass straight into NumPy arrays, from a
+path or an in-memory buffer (e.g. a Telegram download). "-", blanks and
+junk become NaN; rows without a strike are dropped; output is sorted by
+strike (stable, so repeated strikes keep file order).
+"""
+
+import csv
+import hashlib
+import io
+
+import numpy as np
+
+# NSE column name -> field; per side the matching column nearest to STRIKE is used
+FIELD_NAMES = {
+    "OI": "oi",
+    "IV": "iv",
+    "LTP": "ltp",
+    "BID": "bid",
+    "BID PRICE": "bid",
+    "ASK": "ask",
+    "ASK PRICE": "ask",
+}
+FIELDS = ("ltp", "oi", "iv", "bid", "ask")
+# legacy fallback: LTPs sit 6 columns either side of STRIKE
+LTP_OFFSET = 6
+HEADER_SCAN_LINES = 5
+LAYOUT_CACHE_SIZE = 32
+
+_LAYOUTS = {}
+
+
+class ChainLayout:
+    """Column indexes of one header: strike plus {field: index} per side."""
+
+    def __init__(self, strike, ce, pe, n_columns):
+        self.strike = strike
+        self.ce = ce
+        self.pe = pe
+        self.n_columns = n_columns
+
+
+class OptionChain:
+    """
+    Parsed chain as float64 arrays, sorted by strike:
+    strike, ce_ltp, pe_ltp, ce_oi, pe_oi, ce_iv, pe_iv, ce_bid, ce_ask, pe_bid, pe_ask.
+    chain["strike"] works like a frame column for scan_ic_chain().
+    """
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        for name, values in arrays.items():
+            setattr(self, name, values)
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def __len__(self):
+        return len(self.strike)
+
+    def to_frame(self, columns=("strike", "ce_ltp", "pe_ltp")):
+        import pandas as pd
+        return pd.DataFrame({c: self.arrays[c] for c in columns})
+
+
+def _cell_name(cell):
+    return str(cell).strip().lstrip('\ufeff').upper()
+
+
+def detect_layout(header):
+    """ChainLayout for a header row (list of cells); raises ValueError if unusable."""
+    names = [_cell_name(c) for c in header]
+    strike = next((i for i, name in enumerate(names) if "STRIKE" in name), None)
+    if strike is None:
+        raise ValueError("❌ Strike column not found.")
+
+    ce, pe = {}, {}
+    for i in range(strike - 1, -1, -1):             # nearest column to STRIKE wins
+        field = FIELD_NAMES.get(names[i])
+        if field:
+            ce.setdefault(field, i)
+    for i in range(strike + 1, len(names)):
+        field = FIELD_NAMES.get(names[i])
+        if field:
+            pe.setdefault(field, i)
+
+    if "ltp" not in ce or "ltp" not in pe:
+        if strike < LTP_OFFSET or strike + LTP_OFFSET >= len(names):
+            raise ValueError("❌ Column offset for LTPs is out of range.")
+        ce["ltp"], pe["ltp"] = strike - LTP_OFFSET, strike + LTP_OFFSET
+    return ChainLayout(strike, ce, pe, len(names))
+
+
+def layout_for(header_line):
+    """Cached detect_layout() keyed by a hash of the raw header line."""
+    key = hashlib.sha1(header_line.encode()).hexdigest()
+    layout = _LAYOUTS.get(key)
+    if layout is None:
+        layout = detect_layout(next(csv.reader([header_line])))
+        if len(_LAYOUTS) >= LAYOUT_CACHE_SIZE:
+            _LAYOUTS.pop(next(iter(_LAYOUTS)))
+        _LAYOUTS[key] = layout
+    return layout
+
+
+def _number(cell):
+    try:
+        return float(cell.replace(",", ""))
+    except (ValueError, AttributeError):
+        return np.nan
+
+
+def _text(source):
+    """Text of a path, bytes/bytearray/memoryview buffer, str or text stream."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source).decode("utf-8-sig", errors="replace")
+    if hasattr(source, "read"):
+        data = source.read()
+        return data.decode("utf-8-sig", errors="replace") if isinstance(data, bytes) else data
+    with open(source, encoding="utf-8-sig", errors="replace") as f:
+        return f.read()
+
+
+def parse_chain(source):
+    """OptionChain from an NSE option-chain CSV (path or in-memory buffer)."""
+    lines = io.StringIO(_text(source))
+    header_line = None
+    for _ in range(HEADER_SCAN_LINES):
+        line = lines.readline()
+        if not line:
+            break
+        if "STRIKE" in line.upper():
+            header_line = line.rstrip("\r\n")
+            break
+    if header_line is None:
+        raise ValueError("❌ Strike column not found.")
+    layout = layout_for(header_line)
+
+    columns = [("strike", layout.strike)]
+    for side, fields in (("ce", layout.ce), ("pe", layout.pe)):
+        columns += [(f"{side}_{field}", fields[field]) for field in FIELDS if field in fields]
+
+    rows = []
+    for row in csv.reader(lines):
+        if not row:
+            continue
+        n = len(row)
+        rows.append([_number(row[i]) if i < n else np.nan for _, i in columns])
+
+    values = np.array(rows, dtype=np.float64).reshape(len(rows), len(columns))
+    values = values[~np.isnan(values[:, 0])]
+    values = values[np.argsort(values[:, 0], kind="stable")]
+
+    by_column = values.T.copy()                 # one contiguous array per field
+    arrays = {name: by_column[k] for k, (name, _) in enumerate(columns)}
+    for side in ("ce", "pe"):
+        for field in FIELDS:
+            arrays.setdefault(f"{side}_{field}", np.full(len(values), np.nan))
+    return OptionChain(arrays)
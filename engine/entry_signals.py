@@ -1,5 +1,7 @@
 # entry_signals.py
-import pandas as pd
+import numpy as np
+
+ZONES = ["PP", "S1", "S2", "S3"]
 
 
 class EntryResult:
@@ -13,6 +15,92 @@ class EntryResult:
         self.value = value
 
 
+class EntryFills:
+    """
+    Fills from one evaluate_entries call as parallel arrays, sorted by
+    (day, sym, zone). `day` is 0 for a single-day batch.
+    """
+    def __init__(self, day, sym, zone, price, qty):
+        self.day = day
+        self.sym = sym
+        self.zone = zone
+        self.price = price
+        self.qty = qty
+
+    def __len__(self):
+        return len(self.sym)
+
+
+def evaluate_entries(lows, zone_prices, occupied, eligible=None, allocation=None):
+    """
+    Vectorized BUY check: a (symbol, zone) fills at its zone price the first
+    time the low trades at or below it, unless its (zone, year) slot is taken.
+
+    lows:        (n,) lows for one day, or (T, n) for T days of the same year
+    zone_prices: (n, k) zone levels (NaN = no level), or (T, n, k)
+    occupied:    (n, k) bool, (zone, year) slots already used before this batch
+    eligible:    optional bool mask broadcastable to lows (e.g. membership),
+                 or to (..., n, k) for per-zone filters
+    allocation:  capital per zone; when given, qty = allocation // price
+
+    Each (symbol, zone) fills at most once per call, which also covers the
+    once-per-date guard. The caller marks the returned slots as occupied.
+    """
+    lows = np.asarray(lows, dtype=np.float64)
+    zone_prices = np.asarray(zone_prices, dtype=np.float64)
+    occupied = np.asarray(occupied, dtype=bool)
+
+    hit = lows[..., None] <= zone_prices
+    if eligible is not None:
+        eligible = np.asarray(eligible, dtype=bool)
+        if eligible.ndim == lows.ndim:
+            eligible = eligible[..., None]
+        hit &= eligible
+
+    if lows.ndim == 1:
+        hit &= ~occupied
+        sym, zone = np.nonzero(hit)
+        day = np.zeros(len(sym), dtype=np.int64)
+        price = np.broadcast_to(zone_prices, hit.shape)[sym, zone]
+    else:
+        hit = np.broadcast_to(hit, (lows.shape[0],) + occupied.shape)
+        filled = hit.any(axis=0) & ~occupied
+        sym, zone = np.nonzero(filled)
+        day = hit.argmax(axis=0)[sym, zone]
+        order = np.lexsort((zone, sym, day))
+        day, sym, zone = day[order], sym[order], zone[order]
+        price = np.broadcast_to(zone_prices, hit.shape)[day, sym, zone]
+
+    qty = None
+    if allocation is not None:
+        qty = np.floor_divide(allocation, price).astype(np.int64)
+    return EntryFills(day, sym, zone, price, qty)
+
+
+def mark_entry(active_positions, symbol, zone, current_year, date):
+    """Record a fill in the legacy active_positions dict."""
+    slots = active_positions.setdefault(symbol, {})
+    # Mark this zone slot as used for this year
+    slots[(zone, current_year)] = True
+    # Also mark for this date → avoids duplicate same-day entries
+    slots[(zone, date)] = True
+
+
+def _is_occupied(active_positions, symbol, zone, date, current_year):
+    slots = active_positions.get(symbol, {})
+    return bool(slots.get((zone, current_year)) or slots.get((zone, date)))
+
+
+def _level(pivots, zone):
+    value = pivots.get(zone.upper())
+    return np.nan if value is None else value
+
+
+def _to_result(symbol, zone, price, qty):
+    qty = int(qty)
+    return EntryResult(symbol, zone, "BUY", "Order placed", qty, price, qty * price)
+
+
 def check_single_zone(
     symbol,
     zone,
@@ -22,7 +110,13 @@ def check_single_zone(
     date,
     current_year,
     active_positions,
+    indicators=None,
 ):
+    """
+    indicators: optional IndicatorPanel (engine/indicators.py); with
+    config["SIGNAL_FILTERS"] == "Y" S2/S3 entries must pass its RSI / volume
+    filters (O(1) lookups of the previous session's values).
+    """
     low_px = price_row.get("low")
     if low_px is None:
         return None
@@ -31,59 +125,61 @@ def check_single_zone(
     if symbol not in active_positions:
         active_positions[symbol] = {}
 
-    # 🚫 Block if already an active trade for (zone, year)
-    if active_positions[symbol].get((zone, current_year)):
+    zone_price = pivots.get(zone.upper())
+    if zone_price is None:
         return None
 
-    # 🚫 Block if trade already taken today for same (zone, date)
-    if active_positions[symbol].get((zone, date)):
+    if indicators is not None and not _passes_filters(indicators, symbol, zone, date, config):
         return None
 
-    zone_price = pivots.get(zone.upper())
-    if zone_price is None:
+    fills = evaluate_entries(
+        [low_px],
+        [[zone_price]],
+        [[_is_occupied(active_positions, symbol, zone, date, current_year)]],
+        allocation=config["ALLOCATION_PER_ZONE"],
+    )
+    if not len(fills):
         return None
 
-    # ✅ BUY trigger at LOW <= zone price
-    if low_px <= zone_price:
-        qty = int(config["ALLOCATION_PER_ZONE"] // zone_price)
-        filled_price = zone_price
+    mark_entry(active_positions, symbol, zone, current_year, date)
+    return _to_result(symbol, zone, fills.price[0], fills.qty[0])
 
-        # Mark this zone slot as used for this year
-        active_positions[symbol][(zone, current_year)] = True
-        # Also mark for this date → avoids duplicate same-day entries
-        active_positions[symbol][(zone, date)] = True
 
-        return EntryResult(
-            symbol,
-            zone,
-            "BUY",
-            "Order placed",
-            qty,
-            filled_price,
-            qty * filled_price,
-        )
+def _passes_filters(indicators, symbol, zone, date, config):
+    from engine.indicators import filters_enabled
+    return not filters_enabled(config) or indicators.allows(symbol, zone.upper(), date, config)
 
-    return None
 
-
-def scan_multiple(symbols, pivots_map, price_feed, config, date, current_year, active_positions):
-    results = []
+def scan_multiple(symbols, pivots_map, price_feed, config, date, current_year, active_positions,
+                  indicators=None):
+    syms, lows = [], []
     for sym in symbols:
         price_row = price_feed.get_price_row(sym, date)
-        if not price_row:
+        if not price_row or price_row.get("low") is None:
             continue
+        active_positions.setdefault(sym, {})
+        syms.append(sym)
+        lows.append(price_row["low"])
 
-        for zone in ["PP", "S1", "S2", "S3"]:
-            res = check_single_zone(
-                symbol=sym,
-                zone=zone,
-                pivots=pivots_map.get(sym, {}),
-                price_row=price_row,
-                config=config,
-                date=date,
-                current_year=current_year,
-                active_positions=active_positions,
-            )
-            if res:
-                results.append(res)
+    if not syms:
+        return []
+
+    zone_prices = [
+        [_level(pivots_map.get(sym, {}), zone) for zone in ZONES]
+        for sym in syms
+    ]
+    occupied = [
+        [_is_occupied(active_positions, sym, zone, date, current_year) for zone in ZONES]
+        for sym in syms
+    ]
+    eligible = None
+    if indicators is not None:
+        eligible = [[_passes_filters(indicators, sym, zone, date, config) for zone in ZONES] for sym in syms]
+    fills = evaluate_entries(lows, zone_prices, occupied, eligible=eligible,
+                             allocation=config["ALLOCATION_PER_ZONE"])
+
+    results = []
+    for s, z, price, qty in zip(fills.sym, fills.zone, fills.price, fills.qty):
+        mark_entry(active_positions, syms[s], ZONES[z], current_year, date)
+        results.append(_to_result(syms[s], ZONES[z], price, qty))
     return results
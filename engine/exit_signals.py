@@ -1,6 +1,16 @@
 # exit_signals.py
+import heapq
+import numpy as np
 import pandas as pd
 from datetime import timedelta
+from engine.entry_signals import ZONES
+from engine.position_book import PositionBook
+
+PROTOCOL_R_HOLD = timedelta(days=365)
+# entry zone -> column of its exit target in the R-level table (R1, R2, R3)
+ZONE_EXIT = {"S1": 0, "S2": 1, "S3": 2}
+_ZONE_EXIT_COL = np.array([ZONE_EXIT.get(z, -1) for z in ZONES])
+
 
 class ExitSignals:
     def __init__(self, positions_df, nifty_manager, r_levels_df):
@@ -11,18 +21,104 @@ class ExitSignals:
         r_levels_df: DataFrame with R-levels for each symbol
             Columns: ['symbol','R1','R2','R3']
         """
-        self.positions = positions_df
         self.nifty = nifty_manager
         self.r_levels = r_levels_df
 
+        self.symbols = []
+        self.sym_index = {}
+        self._r_arr = np.full((16, 3), np.nan)  # sym id -> (R1, R2, R3), NaN if unknown; grows by doubling
+
+        # symbol -> (R1, R2, R3), first row per symbol wins
+        self.r_lookup = {}
+        for sym, r1, r2, r3 in r_levels_df[['symbol', 'R1', 'R2', 'R3']].itertuples(index=False):
+            self.r_lookup.setdefault(sym, np.array([r1, r2, r3], dtype=np.float64))
+
+        # Protocol-R 12-month timers: heap of (expiry, symbol); _timers holds the
+        # live expiry per symbol so entries left behind by an R-level exit are skipped
+        self._expiry_heap = []
+        self._timers = {}
+        self._due = set()                        # expired, waiting for a price/R-levels
+
+        self.book = PositionBook(capacity=max(len(positions_df), 16))
+        for row in positions_df.to_dict('records'):
+            self.add_position(row)
+
+    # --- book helpers ---
+    def _sym_id(self, symbol):
+        s = self.sym_index.get(symbol)
+        if s is None:
+            s = len(self.symbols)
+            self.symbols.append(symbol)
+            self.sym_index[symbol] = s
+            if s == len(self._r_arr):
+                grown = np.full((2 * s, 3), np.nan)
+                grown[:s] = self._r_arr
+                self._r_arr = grown
+            r = self.r_lookup.get(symbol)
+            if r is not None:
+                self._r_arr[s] = r
+        return s
+
+    def add_position(self, row):
+        """Add one open position given as a dict with the positions_df columns."""
+        active = bool(row.get('protocol_r_active', False) == True)
+        removed_on = pd.Timestamp(row.get('removed_on')) if active else pd.NaT
+        zone = row['entry_zone']
+        pid = self.book.add(
+            self._sym_id(row['symbol']),
+            ZONES.index(zone) if zone in ZONES else -1,
+            row['entry_price'],
+            row['quantity'],
+            row.get('entry_date'),
+            protocol_r_active=active,
+            removed_on=removed_on.to_datetime64(),
+        )
+        if active:
+            self._start_timer(row['symbol'], removed_on)
+        return pid
+
+    def _start_timer(self, symbol, removed_on):
+        if symbol not in self._timers and not pd.isna(removed_on):
+            self._timers[symbol] = removed_on + PROTOCOL_R_HOLD
+            heapq.heappush(self._expiry_heap, (self._timers[symbol], symbol))
+
+    @property
+    def positions(self):
+        """Open positions as a DataFrame (legacy view of self.book)."""
+        book = self.book
+        slots = book.open_slots()
+        return pd.DataFrame({
+            'symbol': [self.symbols[s] for s in book.sym[slots]],
+            'entry_zone': [ZONES[z] if z >= 0 else None for z in book.zone[slots]],
+            'entry_price': book.entry_price[slots],
+            'quantity': book.quantity[slots],
+            'removed_on': pd.to_datetime(book.removed_on[slots]),
+            'protocol_r_active': book.protocol_r_active[slots],
+        }, index=book.pid[slots])
+
+    def _prices(self, price_lookup):
+        """Current price per symbol id (NaN when missing from price_lookup)."""
+        return np.array([
+            np.nan if price_lookup.get(sym) is None else price_lookup[sym]
+            for sym in self.symbols
+        ], dtype=np.float64)
+
     def check_protocol_r(self, current_date, price_lookup):
         """Mark positions for Protocol R if stock removed from Nifty."""
-        current_nifty = self.nifty.get_symbols_on_date(current_date)
-        for idx, pos in self.positions.iterrows():
-            symbol = pos['symbol']
-            if symbol not in current_nifty and not pos.get('protocol_r_active', False):
-                self.positions.at[idx, 'protocol_r_active'] = True
-                self.positions.at[idx, 'removed_on'] = current_date
+        current_nifty = set(self.nifty.get_symbols_on_date(current_date))
+        in_nifty = np.array([sym in current_nifty for sym in self.symbols], dtype=bool)
+
+        book = self.book
+        slots = book.open_slots()
+        flag = slots[~in_nifty[book.sym[slots]] & ~book.protocol_r_active[slots]]
+        if not flag.size:
+            return
+
+        current_date = pd.Timestamp(current_date)
+        book.protocol_r_active[flag] = True
+        book.removed_on[flag] = current_date.to_datetime64()
+        for s in np.unique(book.sym[flag]):
+            self._start_timer(self.symbols[s], current_date)
 
     def execute_exits(self, current_date, price_lookup):
         """
@@ -33,60 +129,65 @@ class ExitSignals:
         Returns list of exits: [{'symbol','exit_price','quantity','reason'}]
         """
         exits = []
-        # First, handle Protocol R
-        for symbol in self.positions['symbol'].unique():
-            proto_positions = self.positions[(self.positions['symbol'] == symbol) & (self.positions['protocol_r_active'] == True)]
-            if proto_positions.empty:
-                continue
-
-            r_vals = self.r_levels.loc[self.r_levels['symbol'] == symbol]
-            if r_vals.empty:
-                continue
-            R_levels = r_vals.iloc[0][['R1','R2','R3']].values
-            current_price = price_lookup.get(symbol)
-            removed_on = proto_positions['removed_on'].iloc[0]
-
-            # Exit if any R hit
-            if current_price >= min(R_levels):
-                # Exit all positions for this symbol
-                for idx, pos in proto_positions.iterrows():
-                    exits.append({
-                        'symbol': symbol,
-                        'exit_price': current_price,
-                        'quantity': pos['quantity'],
-                        'reason': 'Protocol R - R-level hit'
-                    })
-                    self.positions.drop(idx, inplace=True)
-            # Exit after 12 months if no R hit
-            elif current_date >= removed_on + timedelta(days=365):
-                for idx, pos in proto_positions.iterrows():
-                    exits.append({
-                        'symbol': symbol,
-                        'exit_price': current_price,
-                        'quantity': pos['quantity'],
-                        'reason': 'Protocol R - 12 months hold'
-                    })
-                    self.positions.drop(idx, inplace=True)
+        book = self.book
+        slots = book.open_slots()
+        if not slots.size:
+            return exits
+
+        current_date = pd.Timestamp(current_date)
+        prices = self._prices(price_lookup)
+        sym = book.sym[slots]
+        px = prices[sym]
+        r_vals = self._r_arr[sym]
+        has_r = ~np.isnan(r_vals).all(axis=1)
+        proto = book.protocol_r_active[slots]
+
+        # Pop every 12-month timer that has run out; a symbol stays due until
+        # it actually has a price and R-levels to exit against
+        while self._expiry_heap and self._expiry_heap[0][0] <= current_date:
+            expiry, symbol = heapq.heappop(self._expiry_heap)
+            if self._timers.get(symbol) == expiry:
+                self._due.add(self.sym_index[symbol])
+        due = np.zeros(len(self.symbols), dtype=bool)
+        due[list(self._due)] = True
+
+        # First, handle Protocol R: exit all of a symbol's flagged positions
+        r_min = np.nanmin(np.where(has_r[:, None], r_vals, 0.0), axis=1)
+        r_hit = proto & has_r & (px >= r_min)
+        timed_out = proto & has_r & ~np.isnan(px) & ~r_hit & due[sym]
+        proto_exit = r_hit | timed_out
+        if proto_exit.any():
+            # symbols in order of their first open position, then position order
+            _, first = np.unique(sym, return_index=True)
+            sym_rank = np.empty(len(self.symbols), dtype=np.int64)
+            sym_rank[sym[first]] = first
+            idx = np.flatnonzero(proto_exit)
+            idx = idx[np.lexsort((idx, sym_rank[sym[idx]]))]
+            for i in idx:
+                exits.append({
+                    'symbol': self.symbols[sym[i]],
+                    'exit_price': price_lookup.get(self.symbols[sym[i]]),
+                    'quantity': int(book.quantity[slots[i]]),
+                    'reason': 'Protocol R - R-level hit' if r_hit[i] else 'Protocol R - 12 months hold'
+                })
+            for s in np.unique(sym[idx]):
+                self._due.discard(int(s))
+                self._timers.pop(self.symbols[s], None)
 
         # Next, handle normal zone-based exits (S1->R1, S2->R2, S3->R3)
-        for idx, pos in self.positions.iterrows():
-            if pos.get('protocol_r_active', False):
-                continue  # already handled
-            symbol = pos['symbol']
-            entry_zone = pos['entry_zone']
-            current_price = price_lookup.get(symbol)
-            r_vals = self.r_levels.loc[self.r_levels['symbol'] == symbol]
-            if r_vals.empty:
-                continue
-            if entry_zone == 'S1' and current_price >= r_vals.iloc[0]['R1']:
-                exits.append({'symbol': symbol, 'exit_price': current_price, 'quantity': pos['quantity'], 'reason': 'S1 -> R1'})
-                self.positions.drop(idx, inplace=True)
-            elif entry_zone == 'S2' and current_price >= r_vals.iloc[0]['R2']:
-                exits.append({'symbol': symbol, 'exit_price': current_price, 'quantity': pos['quantity'], 'reason': 'S2 -> R2'})
-                self.positions.drop(idx, inplace=True)
-            elif entry_zone == 'S3' and current_price >= r_vals.iloc[0]['R3']:
-                exits.append({'symbol': symbol, 'exit_price': current_price, 'quantity': pos['quantity'], 'reason': 'S3 -> R3'})
-                self.positions.drop(idx, inplace=True)
+        zone = book.zone[slots]
+        zone_col = np.where(zone >= 0, _ZONE_EXIT_COL[zone], -1)
+        target = np.where(zone_col >= 0, r_vals[np.arange(len(slots)), np.maximum(zone_col, 0)], np.nan)
+        zone_exit = ~proto & (px >= target)
+        for i in np.flatnonzero(zone_exit):
+            zone = ZONES[book.zone[slots[i]]]
+            exits.append({
+                'symbol': self.symbols[sym[i]],
+                'exit_price': price_lookup.get(self.symbols[sym[i]]),
+                'quantity': int(book.quantity[slots[i]]),
+                'reason': f"{zone} -> R{ZONE_EXIT[zone] + 1}"
+            })
             # PP positions are held (unless Protocol R triggered)
 
-        return exits
\ No newline at end of file
+        book.close_many(slots[proto_exit | zone_exit])
+        return exits
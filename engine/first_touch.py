@@ -0,0 +1,201 @@
+# first_touch.py
+"""
+Event-skipping ("first-touch") backtest mode.
+
+Entries and zone exits only ever fire the first time a price crosses a level
+that is fixed for the whole year, so instead of stepping every day this mode
+computes those first-touch days directly:
+
+- entries: per year, a running minimum of the member-only lows is
+  non-increasing, so the first day it reaches a zone level is one binary
+  search per (symbol, zone)
+- exits: per (symbol, year, R-level) the sorted days whose high reaches the
+  level; a position's exit is the first of those on/after its entry day
+  (searchsorted), scanning forward year by year since targets follow the
+  current year's pivots
+
+The events are then replayed in time order into the engine's book and logs,
+reproducing the daily engine's entry_log, exit_log (including order), OPEN
+rows, active_positions and Protocol-R removal dates.
+"""
+
+import numpy as np
+import pandas as pd
+
+from engine.entry_signals import ZONES, mark_entry
+
+
+def year_blocks(years):
+    """[(year, start, stop)] row ranges of consecutive equal years."""
+    if not len(years):
+        return []
+    cuts = np.flatnonzero(np.diff(years)) + 1
+    starts = np.concatenate([[0], cuts])
+    stops = np.concatenate([cuts, [len(years)]])
+    return [(int(years[a]), int(a), int(b)) for a, b in zip(starts, stops)]
+
+
+def membership_flips(panel, member):
+    """
+    [(day, sym)] of each symbol's first member -> non-member flip, comparing
+    consecutive days on which the symbol has a price row; in day order.
+    """
+    flips = []
+    for s in range(len(panel.symbols)):
+        rows = np.flatnonzero(panel.present[:, s])
+        if len(rows) < 2:
+            continue
+        m = member[rows, s]
+        drop = np.flatnonzero(m[:-1] & ~m[1:])
+        if drop.size:
+            flips.append((int(rows[drop[0] + 1]), s))
+    return _day_sorted(panel, flips)
+
+
+def _day_sorted(panel, events):
+    """Sort (day, sym, ...) tuples by day, then source row order within the day."""
+    def key(ev):
+        day, s = ev[0], ev[1]
+        row = s if panel.row_order is None else panel.row_order[day, s]
+        return (day, row) + tuple(ev[2:])
+    return sorted(events, key=key)
+
+
+def first_touch_entries(panel, member, cube, y0, allocation, gate=None):
+    """
+    Entry fills as arrays (day, sym, zone, price, qty) in the daily engine's
+    order: by day, source row order, then zone. `gate` is an optional
+    (date x symbol x zone) mask of allowed entries (signal filters).
+    """
+    n_z = len(ZONES)
+    days, syms, zones = [], [], []
+    for year, a, b in year_blocks(panel.years):
+        k = year - y0
+        if not 0 <= k < len(cube):
+            continue
+        levels = cube[k, :, :n_z]
+        lows = panel.low[a:b]
+        ok = member[a:b] & ~np.isnan(lows)
+        if gate is None:
+            lows = np.where(ok, lows, np.inf)[:, :, None]
+        else:
+            lows = np.where(ok[:, :, None] & gate[a:b], lows[:, :, None], np.inf)
+        run_min = np.minimum.accumulate(lows, axis=0)       # non-increasing per column
+        for s in np.flatnonzero(~np.isnan(levels).all(axis=1)):
+            lv = levels[s]
+            for z in np.flatnonzero(~np.isnan(lv)):
+                # first t with run_min[t] <= level  <=>  -run_min[t] >= -level
+                t = int(np.searchsorted(-run_min[:, s, 0 if gate is None else z], -lv[z], side='left'))
+                if t < b - a:
+                    days.append(a + t)
+                    syms.append(s)
+                    zones.append(z)
+
+    day = np.asarray(days, dtype=np.int64)
+    sym = np.asarray(syms, dtype=np.int64)
+    zone = np.asarray(zones, dtype=np.int64)
+    row = sym if panel.row_order is None else panel.row_order[day, sym]
+    order = np.lexsort((zone, row, day))
+    day, sym, zone = day[order], sym[order], zone[order]
+
+    k = panel.years[day] - y0
+    price = cube[k, sym, zone] if len(day) else np.empty(0)
+    qty = np.floor_divide(allocation, price).astype(np.int64)
+    return day, sym, zone, price, qty
+
+
+class ExitIndex:
+    """
+    Sorted hit days per (symbol, year, level): rows where the day's high
+    reaches that year's level. first_exit() answers "first hit on/after day e".
+    """
+
+    def __init__(self, panel, cube, y0, levels):
+        self.levels = list(levels)
+        self.blocks = [(y, a, b) for y, a, b in year_blocks(panel.years) if 0 <= y - y0 < len(cube)]
+        self.y0 = y0
+        self.cube = cube
+        self._hits = {}                       # (block no, sym, level col) -> sorted days
+        for n, (year, a, b) in enumerate(self.blocks):
+            target = cube[year - y0][:, self.levels]             # (S, L)
+            t, s, l = np.nonzero(panel.high[a:b, :, None] >= target[None])
+            order = np.lexsort((t, l, s))
+            t, s, l = t[order] + a, s[order], l[order]
+            keys = s * len(self.levels) + l
+            cuts = np.flatnonzero(np.diff(keys)) + 1
+            for chunk in np.split(np.arange(len(t)), cuts):
+                if chunk.size:
+                    self._hits[(n, int(s[chunk[0]]), int(l[chunk[0]]))] = t[chunk]
+        self._block_stop = np.array([b for _, _, b in self.blocks], dtype=np.int64)
+
+    def first_exit(self, sym, level_col, entry_day):
+        """(exit day, year) of the first hit of LEVELS[level_col] on/after entry_day, or None."""
+        li = self.levels.index(level_col)
+        n = int(np.searchsorted(self._block_stop, entry_day, side='right'))
+        for n in range(n, len(self.blocks)):
+            days = self._hits.get((n, sym, li))
+            if days is None:
+                continue
+            j = int(np.searchsorted(days, entry_day, side='left'))
+            if j < len(days):
+                return int(days[j]), self.blocks[n][0]
+        return None
+
+
+def run_first_touch(engine):
+    """First-touch equivalent of BacktestEngine.run_backtest (daily mode)."""
+    from engine.backtest_engine import EXIT_COLUMNS, EXIT_LEVEL, LEVELS
+
+    panel = engine.panel
+    symbols = panel.symbols
+    alloc = engine.config["ALLOCATION_PER_ZONE"]
+    y0, cube = engine._pivot_cube()
+    member = engine._membership_mask()
+
+    # --- Membership flips (member -> non-member) ---
+    for day, s in membership_flips(panel, member):
+        dt_ts = pd.Timestamp(panel.dates[day])
+        engine.removal_dates[symbols[s]] = dt_ts
+        print(f"[Protocol-R Activated] {symbols[s]} removed on {dt_ts.date()}")
+
+    # --- Entries, in fill order ---
+    day, sym, zone, price, qty = first_touch_entries(panel, member, cube, y0, alloc, gate=engine._entry_gate())
+    exit_cols = sorted({int(c) for c in EXIT_LEVEL if c >= 0})
+    exits = ExitIndex(panel, cube, y0, exit_cols)
+    intraday = engine.intraday()
+    pending = []                                    # (exit day, entry seq, slot, level col, year)
+    for n in range(len(day)):
+        s, z = int(sym[n]), int(zone[n])
+        dt_ts = pd.Timestamp(panel.dates[day[n]])
+        mark_entry(engine.active_positions, symbols[s], ZONES[z], int(panel.years[day[n]]), dt_ts)
+        slot = engine.book.slot_of(engine.book.add(s, z, price[n], int(qty[n]), dt_ts))
+        engine.entry_log.append({'symbol': symbols[s], 'zone': ZONES[z], 'price': price[n], 'date': dt_ts})
+
+        lv = int(EXIT_LEVEL[z])
+        if lv >= 0:
+            hit = exits.first_exit(s, lv, int(day[n]))
+            if (intraday is not None and hit is not None and hit[0] == day[n]
+                    and not intraday.allows_exit(symbols[s], dt_ts, price[n], cube[hit[1] - y0, s, lv])):
+                hit = exits.first_exit(s, lv, int(day[n]) + 1)
+            if hit is not None:
+                pending.append((hit[0], n, slot, lv, hit[1]))
+
+    # --- Exits, in (exit day, entry order) like the daily scan over open slots ---
+    pending.sort()
+    closed = []
+    for exit_day, _, slot, lv, year in pending:
+        s = int(engine.book.sym[slot])
+        exit_px = cube[year - y0, s, lv]
+        engine.exit_log.append(engine._exit_row(slot, exit_px, pd.Timestamp(panel.dates[exit_day]), LEVELS[lv]))
+        closed.append(slot)
+    engine.book.close_many(closed)
+
+    # === Unrealized P&L for still-open positions ===
+    if len(panel.dates):
+        last_present = panel.present[-1]
+        last_closes = panel.close[-1]
+        for slot in engine.book.open_slots():
+            s = engine.book.sym[slot]
+            if last_present[s]:
+                engine.exit_log.append(engine._exit_row(slot, last_closes[s], "OPEN", "OPEN"))
+    return pd.DataFrame(engine.exit_log, columns=EXIT_COLUMNS)
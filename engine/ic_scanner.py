@@ -1,17 +1,28 @@
+import asyncio
 import pandas as pd
+import numpy as np
 import datetime
 import yfinance as yf
 import re
 import os
-from upload.gdrive_sync import append_to_gsheet, get_config_dict
+from config.ic_loader import IC_SETTINGS
+from engine.chain_parser import parse_chain
+from engine.ic_search import scan_ic_chain_full
+from engine.pricing import chain_greeks, ic_metrics, years_to_expiry
+from upload.gdrive_sync import get_config_dict
+from upload.journal import write_rows
 from utils.alerts import send_telegram_alert
+from utils.metrics import timer
 
 STRIKE_INTERVAL = 100
 MARGIN_REQUIREMENT = 160000
+# ICs priced per scan when ranking by EV / POP or filtering on POP
+RANK_POOL = 2000
 
 def get_banknifty_spot():
     try:
-        df = yf.download("^NSEBANK", period="1d", interval="1m", auto_adjust=False)
+        with timer("yfinance_seconds", op="spot"):
+            df = yf.download("^NSEBANK", period="1d", interval="1m", auto_adjust=False)
         if isinstance(df.columns, pd.MultiIndex):
             if ('Close', '^NSEBANK') in df.columns:
                 close_series = df[('Close', '^NSEBANK')]
@@ -45,95 +56,225 @@ def round_to_nearest(x, base=STRIKE_INTERVAL):
     return base * round(x / base)
 
 
-async def find_adaptive_ic_from_csv(csv_path):
-    config = get_config_dict()
-
+def scan_ic_chain(df, spot, expiry, min_wing_width, min_net_credit, min_spot_diff, top_n):
+    """
+    Search every (short put i, short call j >= i + 4) pair of a strike-sorted
+    chain with hedges exactly min_wing_width away.
+    df: OptionChain (engine/chain_parser.py) or frame with columns strike, ce_ltp, pe_ltp
+    Returns (top_n ICs by net credit, combos checked, max credit seen, valid IC count).
+    """
+    strikes = np.asarray(df["strike"], dtype=float)
+    ce_ltp = np.asarray(df["ce_ltp"], dtype=float)
+    pe_ltp = np.asarray(df["pe_ltp"], dtype=float)
+    n = len(strikes)
+
+    m = n - 4
+    total_checked = m * (m + 1) // 2 if m > 0 else 0
+
+    # strike -> first row with that strike
+    strike_idx = {}
+    for k, strike in enumerate(strikes):
+        strike_idx.setdefault(strike, k)
+
+    def hedge_ltp(targets, ltp):
+        rows = np.array([strike_idx.get(t, -1) for t in targets], dtype=np.int64)
+        return np.where(rows >= 0, ltp[np.maximum(rows, 0)], np.nan)
+
+    # prune short legs to strikes at least min_spot_diff away from spot
+    pe_rows = np.flatnonzero((strikes <= spot) & (spot - strikes >= min_spot_diff))
+    ce_rows = np.flatnonzero((strikes >= spot) & (strikes - spot >= min_spot_diff))
+
+    pe_sell, ce_sell = strikes[pe_rows], strikes[ce_rows]
+    pe_buy_strike, ce_buy_strike = pe_sell - min_wing_width, ce_sell + min_wing_width
+    pe_legs = np.stack([pe_ltp[pe_rows], hedge_ltp(pe_buy_strike, pe_ltp)])
+    ce_legs = np.stack([ce_ltp[ce_rows], hedge_ltp(ce_buy_strike, ce_ltp)])
+    pe_ok = ~(np.isnan(pe_legs) | (pe_legs == 0)).any(axis=0)
+    ce_ok = ~(np.isnan(ce_legs) | (ce_legs == 0)).any(axis=0)
+
+    # credit matrix over (short put, short call)
+    credit = ce_legs[0][None, :] + pe_legs[0][:, None] - ce_legs[1][None, :] - pe_legs[1][:, None]
+    valid = (
+        (ce_rows[None, :] >= pe_rows[:, None] + 4)
+        & pe_ok[:, None] & ce_ok[None, :]
+        & (credit >= min_net_credit)
+    )
+    vi, vj = np.nonzero(valid)
+    n_valid = len(vi)
+    if not n_valid:
+        return [], total_checked, 0, 0
+
+    credits = credit[vi, vj]
+    max_credit_seen = max(0, credits.max())
+    rounded = np.round(credits, 2)
+
+    # top-N by rounded credit, ties in scan order (pe row, then ce row)
+    if 0 < top_n < n_valid:
+        cutoff = np.partition(rounded, n_valid - top_n)[n_valid - top_n]
+        keep = np.flatnonzero(rounded >= cutoff)
+    else:
+        keep = np.arange(n_valid)
+    keep = keep[np.lexsort((vj[keep], vi[keep], -rounded[keep]))][:top_n]
+
+    ic_list = [{
+        "sell_pe": int(pe_sell[vi[k]]), "buy_pe": int(pe_buy_strike[vi[k]]),
+        "sell_ce": int(ce_sell[vj[k]]), "buy_ce": int(ce_buy_strike[vj[k]]),
+        "net_credit": rounded[k], "expiry": expiry
+    } for k in keep]
+    return ic_list, total_checked, max_credit_seen, n_valid
+
+
+def load_ic_chain_csv(csv_path):
+    """Strike / CE LTP / PE LTP frame (sorted by strike) from an NSE option-chain CSV."""
+    return parse_chain(csv_path).to_frame()
+
+
+def _setting(config, key, default=None):
+    """Sheet config `key` (lower case), else IC_SETTINGS[KEY]; blank / 0 mean unset."""
+    value = config.get(key, IC_SETTINGS.get(key.upper(), default))
+    if value in (None, ""):
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return value
+    return value or None
+
+
+def wing_search_settings(config):
+    """
+    (mode, max_wing_width, max_hedge_cost, lot_size): mode "full" searches
+    every wing width >= min_wing_width, "fixed" only exactly min_wing_width
+    (legacy). max_wing_width follows from MAX_MARGIN_PER_IC / LOT_SIZE.
+    """
+    mode = str(_setting(config, "wing_search", "full") or "full").strip().lower()
+    lot_size = _setting(config, "lot_size")
+    max_margin = _setting(config, "max_margin_per_ic")
+    max_wing_width = max_margin / lot_size if max_margin and lot_size else None
+    return mode, max_wing_width, _setting(config, "max_hedge_cost"), lot_size
+
+
+def ranking_settings(config):
+    """(rank_by, min_pop, rate): rank_by is "credit" (default), "ev" or "pop"; min_pop a fraction."""
+    rank_by = str(_setting(config, "rank_by", "credit") or "credit").strip().lower()
+    if rank_by not in ("credit", "ev", "pop"):
+        print(f"[ICScanner] ⚠️ Unknown rank_by '{rank_by}', ranking by credit")
+        rank_by = "credit"
+    min_pop = _setting(config, "min_pop")
+    if min_pop and min_pop > 1:          # given in percent
+        min_pop /= 100
+    return rank_by, min_pop, _setting(config, "risk_free_rate") or 0.0
+
+
+def price_ics(ic_list, chain, spot, expiry, rate=0.0):
+    """
+    Add pop / ev (flat ATM IV, engine/pricing.py) and short-leg deltas to
+    each IC, in one vectorized pass; returns the chain's ATM IV.
+    """
+    t = years_to_expiry(expiry)
+    greeks = chain_greeks(chain, spot, t, rate)
+    if not ic_list:
+        return greeks["atm_iv"]
+
+    legs = {k: np.array([ic[k] for ic in ic_list], dtype=float)
+            for k in ("sell_pe", "buy_pe", "sell_ce", "buy_ce", "net_credit")}
+    pop, ev = ic_metrics(spot, t, greeks["atm_iv"], legs["sell_pe"], legs["buy_pe"],
+                         legs["sell_ce"], legs["buy_ce"], legs["net_credit"], rate)
+    strikes = np.asarray(chain["strike"], dtype=float)
+    pe_delta = greeks["pe_delta"][np.searchsorted(strikes, legs["sell_pe"])]
+    ce_delta = greeks["ce_delta"][np.searchsorted(strikes, legs["sell_ce"])]
+
+    def clean(x, digits):
+        return round(float(x), digits) if np.isfinite(x) else None
+
+    for k, ic in enumerate(ic_list):
+        ic["pop"] = clean(pop[k], 3)
+        ic["ev"] = clean(ev[k], 2)
+        ic["pe_delta"] = clean(pe_delta[k], 3)
+        ic["ce_delta"] = clean(ce_delta[k], 3)
+    return greeks["atm_iv"]
+
+
+def rank_ics(ic_list, rank_by, min_pop, top_n):
+    """Drop ICs under min_pop, order by rank_by (unpriced ICs last, credit order kept on ties)."""
+    if min_pop:
+        ic_list = [ic for ic in ic_list if ic.get("pop") is not None and ic["pop"] >= min_pop]
+    if rank_by != "credit":
+        ic_list = sorted(ic_list, key=lambda ic: (ic.get(rank_by) is None, -(ic.get(rank_by) or 0)))
+    return ic_list[:max(top_n, 0)]
+
+
+def scan_ic_csv(csv_path, config, spot, data=None):
+    """
+    Synchronous, picklable IC scan of one chain CSV (safe to run in a worker
+    process): returns (ic_list, summary text). `data` is the file's bytes when
+    it was downloaded into memory; csv_path then only supplies the expiry.
+    """
     min_wing_width = int(config.get("min_wing_width", 800))
     min_net_credit = int(config.get("min_net_credit", 300))
     min_spot_diff = int(config.get("min_spot_diff", 1000))
     top_n = int(config.get("top_n_strategies", 3))
 
-    try:
-        expiry = extract_expiry_from_filename(csv_path)
-        df_raw = pd.read_csv(csv_path, skiprows=1, thousands=",")
-        df_raw.columns = df_raw.columns.str.strip()
-
-        strike_col = next((col for col in df_raw.columns if "strike" in col.lower()), None)
-        if not strike_col:
-            raise ValueError("❌ Strike column not found.")
-
-        strike_idx = list(df_raw.columns).index(strike_col)
-        if strike_idx < 6 or strike_idx + 6 >= len(df_raw.columns):
-            raise ValueError("❌ Column offset for LTPs is out of range.")
-
-        df_ce = df_raw[[strike_col, df_raw.columns[strike_idx - 6]]].copy()
-        df_pe = df_raw[[strike_col, df_raw.columns[strike_idx + 6]]].copy()
-        df_ce.columns = ["strike", "ce_ltp"]
-        df_pe.columns = ["strike", "pe_ltp"]
-
-        df_ce["strike"] = pd.to_numeric(df_ce["strike"].astype(str).str.replace(",", ""), errors="coerce")
-        df_ce["ce_ltp"] = pd.to_numeric(df_ce["ce_ltp"].astype(str).str.replace(",", ""), errors="coerce")
-        df_pe["strike"] = pd.to_numeric(df_pe["strike"].astype(str).str.replace(",", ""), errors="coerce")
-        df_pe["pe_ltp"] = pd.to_numeric(df_pe["pe_ltp"].astype(str).str.replace(",", ""), errors="coerce")
-
-        df = pd.merge(df_ce, df_pe, on="strike", how="outer")
-        df.dropna(subset=["strike"], inplace=True)
-        df.sort_values("strike", inplace=True)
-        df.reset_index(drop=True, inplace=True)
-
-        spot = get_banknifty_spot()
-        if spot is None:
-            raise ValueError("❌ Could not fetch spot price")
-
-        ic_list = []
-        total_checked = 0
-        max_credit_seen = 0
-
-        for i in range(len(df)):
-            for j in range(i + 4, len(df)):
-                total_checked += 1
-                ce_sell, pe_sell = float(df.iloc[j]["strike"]), float(df.iloc[i]["strike"])
-                if pe_sell > spot or ce_sell < spot:
-                    continue
-
-                if (spot - pe_sell) < min_spot_diff or (ce_sell - spot) < min_spot_diff:
-                    continue
-
-                ce_ltp = df.iloc[j].get("ce_ltp")
-                pe_ltp = df.iloc[i].get("pe_ltp")
-
-                ce_buy_strike = ce_sell + min_wing_width
-                pe_buy_strike = pe_sell - min_wing_width
-
-                ce_buy = df[df["strike"] == ce_buy_strike]["ce_ltp"].values
-                pe_buy = df[df["strike"] == pe_buy_strike]["pe_ltp"].values
-
-                if not ce_buy.size or not pe_buy.size:
-                    continue
-
-                ce_buy, pe_buy = ce_buy[0], pe_buy[0]
-                if any(pd.isna(x) or x == 0 for x in [ce_ltp, pe_ltp, ce_buy, pe_buy]):
-                    continue
-
-                net_credit = ce_ltp + pe_ltp - ce_buy - pe_buy
-                if net_credit < min_net_credit:
-                    continue
-
-                max_credit_seen = max(max_credit_seen, net_credit)
-                ic_list.append({
-                    "sell_pe": int(pe_sell), "buy_pe": int(pe_buy_strike),
-                    "sell_ce": int(ce_sell), "buy_ce": int(ce_buy_strike),
-                    "net_credit": round(net_credit, 2), "expiry": expiry
-                })
-
-        summary = f"""
+    expiry = extract_expiry_from_filename(csv_path)
+    # recorded in the process that runs the scan (a CPU job's worker keeps its own)
+    with timer("ic_scan_seconds", phase="parse"):
+        chain = parse_chain(csv_path if data is None else data)
+    if spot is None:
+        raise ValueError("❌ Could not fetch spot price")
+
+    mode, max_wing_width, max_hedge_cost, lot_size = wing_search_settings(config)
+    rank_by, min_pop, rate = ranking_settings(config)
+    # candidates by credit; a wider pool when EV / POP decide the final top_n
+    pool = top_n if rank_by == "credit" and not min_pop else max(top_n, RANK_POOL)
+    with timer("ic_scan_seconds", phase="search", mode=mode):
+        if mode == "fixed":
+            ic_list, total_checked, max_credit_seen, n_valid = scan_ic_chain(
+                chain, spot, expiry, min_wing_width, min_net_credit, min_spot_diff, pool
+            )
+        else:
+            ic_list, total_checked, max_credit_seen, n_valid = scan_ic_chain_full(
+                chain, spot, expiry, min_wing_width, min_net_credit, min_spot_diff, pool,
+                max_wing_width=max_wing_width, max_hedge_cost=max_hedge_cost, lot_size=lot_size
+            )
+    with timer("ic_scan_seconds", phase="price"):
+        iv = price_ics(ic_list, chain, spot, expiry, rate)
+        ic_list = rank_ics(ic_list, rank_by, min_pop, top_n)
+    iv_text = f"{iv * 100:.1f}%" if np.isfinite(iv) else "n/a"
+    vix_threshold = _setting(config, "vix_threshold")
+    if vix_threshold and np.isfinite(iv) and iv * 100 < vix_threshold:
+        iv_text += f" ⚠️ below VIX_THRESHOLD {vix_threshold:g}"
+
+    summary = f"""
 🧪 *IC Scan Summary*
 • Total combos scanned: {total_checked}
 • Max credit observed: ₹{round(max_credit_seen, 2)}
-• Valid ICs found: {len(ic_list)}
+• Valid ICs found: {n_valid}
+• ATM IV: {iv_text} | Ranked by: {rank_by.upper() if rank_by != "credit" else "credit"}
 """
-        await send_telegram_alert(summary)
-        return sorted(ic_list, key=lambda x: -x["net_credit"])[:top_n]
+    return ic_list, summary
+
+
+async def find_adaptive_ic_from_csv(csv_path, jobs=None, data=None):
+    """
+    Scan a chain CSV without blocking the event loop: config and spot are
+    fetched in threads, the search runs as an "ic_scan" CPU job when a
+    JobManager is given (in a thread otherwise). Pass the upload's bytes as
+    `data` to skip the file; csv_path is then just its name (for the expiry).
+    """
+    with timer("ic_scan_seconds", phase="config"):
+        config = await asyncio.to_thread(get_config_dict)
+
+    try:
+        with timer("ic_scan_seconds", phase="spot"):
+            spot = await asyncio.to_thread(get_banknifty_spot)
+        with timer("ic_scan_seconds", phase="scan"):
+            if jobs is not None:
+                ic_list, summary = await jobs.run("ic_scan", scan_ic_csv, csv_path, config, spot, data, kind="cpu")
+            else:
+                ic_list, summary = await asyncio.to_thread(scan_ic_csv, csv_path, config, spot, data)
+
+        with timer("ic_scan_seconds", phase="alert"):
+            await send_telegram_alert(summary)
+        return ic_list
 
     except Exception as e:
         raise ValueError(f"❌ Error parsing CSV: {e}")
@@ -143,13 +284,16 @@ async def log_and_alert_ic_candidates(ic_list):
     if not ic_list:
         return
 
-    config = get_config_dict()
+    config = await asyncio.to_thread(get_config_dict)
     output_sheet = config.get("output_sheet", "IC_Trades")
     symbol = config.get("symbol", "BANKNIFTY")
 
+    timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     rows = []
     for ic in ic_list:
         rows.append({
+            # journal / sheet key: one row per logged IC
+            "Trade ID": f"{ic['expiry']}:{ic['sell_pe']}/{ic['buy_pe']}:{ic['sell_ce']}/{ic['buy_ce']}@{timestamp}",
             "Symbol": symbol,
             "Expiry": ic["expiry"],
             "Sell PE": ic['sell_pe'],
@@ -157,15 +301,23 @@ async def log_and_alert_ic_candidates(ic_list):
             "Sell CE": ic['sell_ce'],
             "Buy CE": ic['buy_ce'],
             "Net Credit": ic['net_credit'],
-            "Margin": MARGIN_REQUIREMENT,
+            "Margin": ic.get("margin", MARGIN_REQUIREMENT),
+            "POP": ic.get("pop"),
+            "EV": ic.get("ev"),
             "Status": "New",
-            "Timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            "Timestamp": timestamp
         })
 
-    append_to_gsheet(rows, sheet_name=output_sheet)
+    # local journal first; the Sheets copy is written in the background
+    await asyncio.to_thread(write_rows, output_sheet, rows, key="Trade ID", append=True)
+
+    def odds(ic):
+        if ic.get("pop") is None:
+            return ""
+        return f"\n🎯 POP: {ic['pop']:.0%} | EV: ₹{ic['ev']}"
 
     msg = "\n\n".join([
-        f"*IC #{i+1}*\nPE: {ic['sell_pe']}/{ic['buy_pe']}\nCE: {ic['sell_ce']}/{ic['buy_ce']}\n💰 Credit: ₹{ic['net_credit']}"
+        f"*IC #{i+1}*\nPE: {ic['sell_pe']}/{ic['buy_pe']}\nCE: {ic['sell_ce']}/{ic['buy_ce']}\n💰 Credit: ₹{ic['net_credit']}{odds(ic)}"
         for i, ic in enumerate(ic_list)
     ])
     await send_telegram_alert(f"🟢 *Top IC Candidates ({ic_list[0]['expiry']})*\n\n{msg}")
@@ -0,0 +1,187 @@
+# ic_search.py
+"""
+Full wing-width iron condor search.
+
+For a short put at strike K the credit-maximising hedge is the cheapest put
+in [K - max_wing, K - min_wing] (any strike <= K - min_wing when uncapped);
+calls mirror that above the short call. Those windows are range-minimum
+queries, answered in O(1) each from a sparse table over hedge cost per
+strike, so every short leg gets its best hedge in O(n log n) total.
+
+An IC's credit is then put_credit[i] + call_credit[j], so the best pairs are
+enumerated in descending credit with a heap over both sides sorted by credit
+(no n x n matrix); the valid-IC count uses binary search over sorted credits.
+Hedges costing more than max_hedge_cost (per leg) are skipped; on equal cost
+the nearer (narrower) hedge wins.
+"""
+
+import heapq
+
+import numpy as np
+
+# short call row must be at least this many rows above the short put row
+MIN_ROW_GAP = 4
+
+
+class RangeMin:
+    """Sparse table: index of the minimum of `values` over row ranges [lo, hi)."""
+
+    def __init__(self, values, prefer_right=False):
+        self.values = np.asarray(values, dtype=float)
+        self.prefer_right = prefer_right
+        n = len(self.values)
+        self.levels = [np.arange(n)]            # levels[k][i]: argmin over [i, i + 2**k)
+        half = 1
+        while 2 * half <= n:
+            prev = self.levels[-1]
+            self.levels.append(self._pick(prev[:n - 2 * half + 1], prev[half:n - half + 1]))
+            half *= 2
+
+    def _pick(self, a, b):
+        va, vb = self.values[a], self.values[b]
+        take_b = vb <= va if self.prefer_right else vb < va
+        return np.where(take_b, b, a)
+
+    def query(self, lo, hi):
+        """argmin per (lo, hi) pair; -1 where the range is empty."""
+        lo = np.asarray(lo, dtype=np.int64)
+        hi = np.asarray(hi, dtype=np.int64)
+        out = np.full(lo.shape, -1, dtype=np.int64)
+        length = hi - lo
+        ok = length > 0
+        level = np.zeros(lo.shape, dtype=np.int64)
+        level[ok] = np.floor(np.log2(length[ok])).astype(np.int64)
+        for k in np.unique(level[ok]):
+            m = ok & (level == k)
+            table = self.levels[k]
+            out[m] = self._pick(table[lo[m]], table[hi[m] - (1 << k)])
+        return out
+
+
+def hedge_cost(ltp, max_hedge_cost=None):
+    """Premium paid per hedge row; inf where the leg is unquoted, zero or over the cap."""
+    cost = np.where(np.isnan(ltp) | (ltp == 0), np.inf, ltp)
+    if max_hedge_cost:
+        cost = np.where(cost <= max_hedge_cost, cost, np.inf)
+    return cost
+
+
+def best_hedges(strikes, cost, short_strikes, side, min_wing_width, max_wing_width=None):
+    """
+    Row of the cheapest hedge for each short strike (-1 if none): puts look
+    below (side="pe"), calls above (side="ce"); wing width in
+    [min_wing_width, max_wing_width].
+    """
+    n = len(strikes)
+    if side == "pe":
+        hi = np.searchsorted(strikes, short_strikes - min_wing_width, side="right")
+        lo = (np.searchsorted(strikes, short_strikes - max_wing_width, side="left")
+              if max_wing_width else np.zeros(len(short_strikes), dtype=np.int64))
+        rows = RangeMin(cost, prefer_right=True).query(lo, hi)
+    else:
+        lo = np.searchsorted(strikes, short_strikes + min_wing_width, side="left")
+        hi = (np.searchsorted(strikes, short_strikes + max_wing_width, side="right")
+              if max_wing_width else np.full(len(short_strikes), n, dtype=np.int64))
+        rows = RangeMin(cost, prefer_right=False).query(lo, hi)
+    usable = rows >= 0
+    usable[usable] = np.isfinite(cost[rows[usable]])
+    return np.where(usable, rows, -1)
+
+
+def _count_at_least(credit_a, credit_b, threshold):
+    """Number of (a, b) pairs with credit_a[a] + credit_b[b] >= threshold."""
+    b = np.sort(credit_b)
+    idx = np.searchsorted(b, threshold - credit_a, side="left")
+    # settle float edge cases against the actual sums
+    while True:
+        down = (idx > 0) & (credit_a + b[np.maximum(idx - 1, 0)] >= threshold)
+        up = (idx < len(b)) & (credit_a + b[np.minimum(idx, len(b) - 1)] < threshold)
+        if not (down.any() or up.any()):
+            break
+        idx = idx - down + up
+    return int((len(b) - idx).sum())
+
+
+def scan_ic_chain_full(chain, spot, expiry, min_wing_width, min_net_credit, min_spot_diff, top_n,
+                       max_wing_width=None, max_hedge_cost=None, lot_size=None):
+    """
+    scan_ic_chain() over every wing width >= min_wing_width (<= max_wing_width
+    when given), each short leg paired with its cheapest allowed hedge.
+    Same return value; ICs also carry "margin" (wider wing x lot_size) when
+    lot_size is known.
+    """
+    strikes = np.asarray(chain["strike"], dtype=float)
+    ce_ltp = np.asarray(chain["ce_ltp"], dtype=float)
+    pe_ltp = np.asarray(chain["pe_ltp"], dtype=float)
+    n = len(strikes)
+
+    m = n - MIN_ROW_GAP
+    total_checked = m * (m + 1) // 2 if m > 0 else 0
+
+    pe_rows = np.flatnonzero((strikes <= spot) & (spot - strikes >= min_spot_diff))
+    ce_rows = np.flatnonzero((strikes >= spot) & (strikes - spot >= min_spot_diff))
+
+    pe_hedge = best_hedges(strikes, hedge_cost(pe_ltp, max_hedge_cost), strikes[pe_rows], "pe",
+                           min_wing_width, max_wing_width)
+    ce_hedge = best_hedges(strikes, hedge_cost(ce_ltp, max_hedge_cost), strikes[ce_rows], "ce",
+                           min_wing_width, max_wing_width)
+
+    def side(rows, hedge, ltp):
+        sell = ltp[rows]
+        ok = (hedge >= 0) & ~np.isnan(sell) & (sell != 0)
+        credit = sell[ok] - ltp[hedge[ok]]
+        return rows[ok], hedge[ok], credit
+
+    p_rows, p_hedge, p_credit = side(pe_rows, pe_hedge, pe_ltp)
+    c_rows, c_hedge, c_credit = side(ce_rows, ce_hedge, ce_ltp)
+    if not len(p_rows) or not len(c_rows):
+        return [], total_checked, 0, 0
+
+    # --- valid count: all pairs over the credit floor, minus pairs too close in rows ---
+    n_valid = _count_at_least(p_credit, c_credit, min_net_credit)
+    too_close = np.searchsorted(c_rows, p_rows + MIN_ROW_GAP, side="left")    # c_rows is ascending
+    for t in range(int(too_close.max()) if len(too_close) else 0):
+        m_t = too_close > t
+        n_valid -= int((p_credit[m_t] + c_credit[t] >= min_net_credit).sum())
+    if n_valid <= 0:
+        return [], total_checked, 0, 0
+
+    # --- best pairs by credit from a heap over both sides sorted by credit ---
+    p_order = np.argsort(-p_credit, kind="stable")
+    c_order = np.argsort(-c_credit, kind="stable")
+    ps, cs = p_credit[p_order], c_credit[c_order]
+    want = top_n if top_n > 0 else 1        # top_n <= 0 still reports the best credit
+    heap = [(-(ps[0] + cs[0]), 0, 0)]
+    picked, cutoff = [], None
+    while heap:
+        neg, a, b = heapq.heappop(heap)
+        credit = -neg
+        if credit < min_net_credit:
+            break
+        rounded = float(np.round(credit, 2))
+        if cutoff is not None and rounded < cutoff:
+            break
+        i, j = int(p_order[a]), int(c_order[b])
+        if c_rows[j] >= p_rows[i] + MIN_ROW_GAP:
+            picked.append((-rounded, i, j, credit))
+            if len(picked) == want:
+                cutoff = rounded            # keep popping ties of the last place
+        if b + 1 < len(cs):
+            heapq.heappush(heap, (-(ps[a] + cs[b + 1]), a, b + 1))
+        if b == 0 and a + 1 < len(ps):
+            heapq.heappush(heap, (-(ps[a + 1] + cs[0]), a + 1, 0))
+
+    max_credit_seen = max(0, max(p[3] for p in picked)) if picked else 0
+    picked.sort(key=lambda p: p[:3])        # credit desc, then scan order (put row, call row)
+
+    ic_list = []
+    for neg_rounded, i, j, _ in picked[:max(top_n, 0)]:
+        ic = {
+            "sell_pe": int(strikes[p_rows[i]]), "buy_pe": int(strikes[p_hedge[i]]),
+            "sell_ce": int(strikes[c_rows[j]]), "buy_ce": int(strikes[c_hedge[j]]),
+            "net_credit": -neg_rounded, "expiry": expiry,
+        }
+        if lot_size:
+            ic["margin"] = int(max(ic["sell_pe"] - ic["buy_pe"], ic["buy_ce"] - ic["sell_ce"]) * lot_size)
+        ic_list.append(ic)
+    return ic_list, total_checked, max_credit_seen, n_valid
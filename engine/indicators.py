@@ -0,0 +1,226 @@
+# indicators.py
+"""
+Rolling indicator panel (RSI, volume ratio) for the entry signal filters.
+
+Both indicators are computed for the whole (date x symbol) price panel in one
+pass and cached on disk (data/cache/indicators) under a key built from the
+data version and the indicator settings. Per-symbol history is the symbol's
+own price rows, so gaps in one symbol do not shift another's values.
+
+Gating reads the values as of the *previous* session of each symbol (an
+entry fills intraday, before that day's close/volume are known):
+    S2 / S3 entries need  RSI <= {zone}_RSI_MAX   and  volume ratio >= {zone}_VOL_MIN
+with thresholds from config, falling back to SIGNAL_CONFIG.signal_thresholds
+in config/pp_settings.json. PP / S1 entries are never gated.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from config.pp_loader import PP_SETTINGS
+from engine.entry_signals import ZONES
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'cache', 'indicators')
+DEFAULT_RSI_PERIOD = 14
+DEFAULT_VOLUME_DAYS = 20
+GATED_ZONES = ("S2", "S3")
+FIELDS = ("rsi", "volume_ratio")
+
+
+def signal_settings(config=None):
+    """(rsi_period, volume_avg_days) from config overrides or pp_settings.json."""
+    config = config or {}
+    sc = PP_SETTINGS.get("SIGNAL_CONFIG", {})
+    return (int(config.get("RSI_PERIOD", sc.get("rsi_period", DEFAULT_RSI_PERIOD))),
+            int(config.get("VOLUME_AVG_DAYS", sc.get("volume_avg_days", DEFAULT_VOLUME_DAYS))))
+
+
+def zone_thresholds(config=None):
+    """{zone: (rsi_max, volume_min)} for the gated zones (NaN = no limit)."""
+    config = config or {}
+    th = PP_SETTINGS.get("SIGNAL_CONFIG", {}).get("signal_thresholds", {})
+    out = {}
+    for zone in GATED_ZONES:
+        rsi_max = config.get(f"{zone}_RSI_MAX", th.get(zone, {}).get("rsi"))
+        vol_min = config.get(f"{zone}_VOL_MIN", th.get(zone, {}).get("volume"))
+        out[zone] = (np.nan if rsi_max is None else float(rsi_max),
+                     np.nan if vol_min is None else float(vol_min))
+    return out
+
+
+def filters_enabled(config):
+    return str(config.get("SIGNAL_FILTERS", "N")).upper() == "Y"
+
+
+def wilder_rsi(close, period=DEFAULT_RSI_PERIOD):
+    """
+    RSI of every column of `close` (T x S, NaN = no row), Wilder smoothing
+    seeded with the simple average of the first `period` changes. Changes are
+    taken between a symbol's consecutive price rows; NaN until warmed up.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    T, S = close.shape
+    rsi = np.full((T, S), np.nan)
+    prev = np.full(S, np.nan)
+    seen = np.zeros(S, dtype=np.int64)
+    avg_gain = np.zeros(S)
+    avg_loss = np.zeros(S)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for t in range(T):
+            c = close[t]
+            valid = ~np.isnan(c) & ~np.isnan(prev)
+            d = np.where(valid, c - prev, 0.0)
+            gain, loss = np.maximum(d, 0.0), np.maximum(-d, 0.0)
+            seen += valid
+
+            seeding = valid & (seen <= period)
+            avg_gain = np.where(seeding, avg_gain + gain / period, avg_gain)
+            avg_loss = np.where(seeding, avg_loss + loss / period, avg_loss)
+            smooth = valid & (seen > period)
+            avg_gain = np.where(smooth, (avg_gain * (period - 1) + gain) / period, avg_gain)
+            avg_loss = np.where(smooth, (avg_loss * (period - 1) + loss) / period, avg_loss)
+
+            ready = valid & (seen >= period)
+            value = np.where(avg_loss > 0, 100.0 - 100.0 / (1.0 + avg_gain / avg_loss),
+                             np.where(avg_gain > 0, 100.0, 50.0))
+            rsi[t] = np.where(ready, value, np.nan)
+            prev = np.where(np.isnan(c), prev, c)
+    return rsi
+
+
+def volume_ratio(volume, days=DEFAULT_VOLUME_DAYS):
+    """
+    Each row's volume over the mean of the symbol's previous `days` volumes
+    (T x S, NaN until `days` earlier rows exist or when the mean is 0).
+    """
+    volume = np.asarray(volume, dtype=np.float64)
+    out = np.full(volume.shape, np.nan)
+    for s in range(volume.shape[1]):
+        rows = np.flatnonzero(~np.isnan(volume[:, s]))
+        if len(rows) <= days:
+            continue
+        v = volume[rows, s]
+        csum = np.concatenate([[0.0], np.cumsum(v)])
+        mean_prev = (csum[days:-1] - csum[:-days - 1]) / days       # rows days..n-1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out[rows[days:], s] = np.where(mean_prev > 0, v[days:] / mean_prev, np.nan)
+    return out
+
+
+def prior_session(values):
+    """Per column, the last non-NaN value strictly before each row (NaN if none)."""
+    T, S = values.shape
+    idx = np.where(~np.isnan(values), np.arange(T)[:, None], -1)
+    idx = np.maximum.accumulate(idx, axis=0)
+    out = np.full((T, S), np.nan)
+    src = idx[:-1]
+    has = src >= 0
+    rows, cols = np.nonzero(has)
+    out[1:][rows, cols] = values[src[rows, cols], cols]
+    return out
+
+
+class IndicatorPanel:
+    def __init__(self, dates, symbols, rsi, volume_ratio, rsi_period, volume_days):
+        self.dates = dates
+        self.symbols = list(symbols)
+        self.sym_index = {s: i for i, s in enumerate(self.symbols)}
+        self.date_index = {d: i for i, d in enumerate(pd.DatetimeIndex(dates))}
+        self.rsi = rsi
+        self.volume_ratio = volume_ratio
+        self.rsi_period = rsi_period
+        self.volume_days = volume_days
+        self._prior = {}
+
+    # --- build / cache ---
+    @classmethod
+    def compute(cls, panel, rsi_period=DEFAULT_RSI_PERIOD, volume_days=DEFAULT_VOLUME_DAYS):
+        close = np.where(panel.present, panel.close, np.nan)
+        volume = np.where(panel.present, panel.volume, np.nan)
+        return cls(panel.dates, panel.symbols, wilder_rsi(close, rsi_period),
+                   volume_ratio(volume, volume_days), rsi_period, volume_days)
+
+    @staticmethod
+    def cache_key(panel, rsi_period, volume_days, data_version=None):
+        h = hashlib.sha1()
+        h.update(json.dumps([rsi_period, volume_days, panel.symbols,
+                             str(panel.dates[0]) if len(panel.dates) else None,
+                             str(panel.dates[-1]) if len(panel.dates) else None,
+                             len(panel.dates)], default=str).encode())
+        if data_version:
+            h.update(str(data_version).encode())
+        else:
+            # no version from the store: fingerprint the inputs themselves
+            for arr in (panel.dates, panel.present, panel.close, panel.volume):
+                h.update(np.ascontiguousarray(arr).tobytes())
+        return h.hexdigest()[:20]
+
+    @classmethod
+    def load_or_compute(cls, panel, rsi_period=DEFAULT_RSI_PERIOD, volume_days=DEFAULT_VOLUME_DAYS,
+                        data_version=None, cache_dir=CACHE_DIR):
+        path = os.path.join(cache_dir, cls.cache_key(panel, rsi_period, volume_days, data_version) + '.npz')
+        try:
+            with np.load(path) as z:
+                if z['rsi'].shape == panel.shape:
+                    return cls(panel.dates, panel.symbols, z['rsi'], z['volume_ratio'], rsi_period, volume_days)
+        except (OSError, KeyError, ValueError):
+            pass
+
+        ind = cls.compute(panel, rsi_period, volume_days)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = path + '.tmp.npz'
+            np.savez(tmp, rsi=ind.rsi, volume_ratio=ind.volume_ratio)
+            os.replace(tmp, path)
+        except OSError as e:
+            print(f"[Indicators] ⚠️ Could not write cache {path}: {e}")
+        return ind
+
+    def take(self, sym_ids):
+        sym_ids = np.asarray(sym_ids, dtype=np.int64)
+        sub = IndicatorPanel(self.dates, [self.symbols[s] for s in sym_ids], self.rsi[:, sym_ids],
+                             self.volume_ratio[:, sym_ids], self.rsi_period, self.volume_days)
+        sub._prior = {k: v[:, sym_ids] for k, v in self._prior.items()}
+        return sub
+
+    # --- lookups ---
+    def prior(self, name):
+        """(T x S) values of `name` as of each symbol's previous session."""
+        if name not in self._prior:
+            self._prior[name] = prior_session(getattr(self, name))
+        return self._prior[name]
+
+    def value(self, symbol, date, name="rsi", prior=True):
+        """O(1) lookup of one indicator value (NaN if unknown symbol/date)."""
+        s = self.sym_index.get(symbol)
+        i = self.date_index.get(pd.Timestamp(date))
+        if s is None or i is None:
+            return np.nan
+        return float((self.prior(name) if prior else getattr(self, name))[i, s])
+
+    def gate(self, config):
+        """(T x S x len(ZONES)) bool: entries allowed by the signal filters."""
+        rsi, vol = self.prior("rsi"), self.prior("volume_ratio")
+        ok = np.ones(rsi.shape + (len(ZONES),), dtype=bool)
+        for zone, (rsi_max, vol_min) in zone_thresholds(config).items():
+            z = ZONES.index(zone)
+            if not np.isnan(rsi_max):
+                ok[..., z] &= rsi <= rsi_max
+            if not np.isnan(vol_min):
+                ok[..., z] &= vol >= vol_min
+        return ok
+
+    def allows(self, symbol, zone, date, config):
+        """Signal filter for a single (symbol, zone, date) entry."""
+        if zone not in GATED_ZONES:
+            return True
+        rsi_max, vol_min = zone_thresholds(config)[zone]
+        if not np.isnan(rsi_max) and not self.value(symbol, date, "rsi") <= rsi_max:
+            return False
+        if not np.isnan(vol_min) and not self.value(symbol, date, "volume_ratio") >= vol_min:
+            return False
+        return True
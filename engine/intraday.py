@@ -0,0 +1,88 @@
+# intraday.py
+"""
+Intraday touch order for the days a daily bar cannot settle.
+
+Entries fill at a zone's pivot once the day's low reaches it, and exits
+fire once the high reaches the R-level. So when one day's bar spans both a
+new fill's entry level and its exit target, daily data cannot tell whether
+the high came after the fill. With config["INTRADAY"] = "Y" the engine (all
+modes) asks an IntradayResolver about exactly those days and nothing else,
+which keeps years of minute data affordable: only a handful of symbol-days
+are ever read.
+
+Bars (1-minute, 5-minute, any interval) live in an OHLCStore of their own
+(config["INTRADAY_STORE"], default data/ohlc_intraday): per-symbol
+memory-mapped .npy columns keyed by full timestamps. Import with
+
+    python -m engine.intraday bars.csv [more.csv ...]   # symbol, date (timestamp), open, high, low, close
+
+Rules for a fill at `entry` with target `exit` on the same day:
+- the fill is the first bar whose low <= entry
+- the exit stands if a later bar's high >= exit, or if the fill bar itself
+  reaches it and opened at/below entry (filled on its first tick, so its
+  high came after)
+- with no bars for that symbol and day, or bars that never reach the entry
+  level, the daily assumption (exit stands) is kept
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from utils.metrics import inc
+from utils.ohlc_store import OHLCStore
+
+INTRADAY_ROOT = os.path.join(os.path.dirname(__file__), '../data/ohlc_intraday')
+
+
+def intraday_enabled(config):
+    return str(config.get("INTRADAY", "N")).upper() == "Y"
+
+
+class IntradayResolver:
+    """Same-day entry / exit order from memory-mapped intraday bars."""
+
+    def __init__(self, store=INTRADAY_ROOT):
+        self.store = store if isinstance(store, OHLCStore) else OHLCStore(store)
+
+    def bars(self, symbol, day):
+        """Column arrays of `symbol`'s bars on the calendar day of `day`; None if the symbol has none."""
+        if symbol not in self.store.manifest['symbols']:
+            return None
+        start = pd.Timestamp(day).normalize()
+        return self.store.load_symbol(symbol, start, start + pd.Timedelta(days=1) - pd.Timedelta(1, 'ns'))
+
+    def exit_after_entry(self, symbol, day, entry_px, exit_px):
+        """
+        True / False: whether the high reached exit_px after the low first
+        reached entry_px on `day`; None when the bars cannot tell.
+        """
+        bars = self.bars(symbol, day)
+        if bars is None or not len(bars['date']):
+            return None
+        fill = np.flatnonzero(bars['low'] <= entry_px)
+        if not fill.size:
+            return None
+        f = int(fill[0])
+        start = f if bars['open'][f] <= entry_px else f + 1
+        return bool((bars['high'][start:] >= exit_px).any())
+
+    def allows_exit(self, symbol, day, entry_px, exit_px):
+        """False only when the bars show the exit level was not reached after the fill."""
+        ok = self.exit_after_entry(symbol, day, entry_px, exit_px)
+        inc("intraday_resolutions_total", result={True: "exit", False: "held", None: "no_bars"}[ok])
+        return ok is not False
+
+
+def main(argv=None):
+    store = OHLCStore(INTRADAY_ROOT)
+    for path in (argv if argv is not None else sys.argv[1:]):
+        store.import_csv(path, dayfirst=False)
+        print(f"[Intraday] ✅ Imported {path} -> {store.root}")
+    print(f"[Intraday] 📦 {len(store.symbols())} symbols in {store.root}")
+
+
+if __name__ == "__main__":
+    main()
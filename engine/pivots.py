@@ -0,0 +1,199 @@
+# pivots.py
+"""
+Historical Fibonacci pivot table.
+
+build_pivot_table() derives PP / S1-S3 / R1-R3 for every (symbol, year) of a
+long OHLC frame in one groupby pass: year Y's High / Low / Close give the
+levels used in year Y + 1. Tables are written as versioned CSVs in the
+hist_pp_levels.csv layout (symbol, Year, pp, r1, s1, r2, s2, r3, s3) with a
+latest.json pointer, and load into a PivotTable: a dense
+(year x symbol-id x level) float array with NaN for missing levels.
+
+    python -m engine.pivots                 # rebuild from the local OHLC store
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+LEVELS = ["PP", "S1", "S2", "S3", "R1", "R2", "R3"]
+# hist_pp_levels.csv column order
+CSV_COLUMNS = ["symbol", "Year", "pp", "r1", "s1", "r2", "s2", "r3", "s3"]
+FIB = {"S1": -0.382, "S2": -0.618, "S3": -1.000, "R1": 0.382, "R2": 0.618, "R3": 1.000}
+FORMULA_VERSION = "fib-v1"
+
+PIVOT_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'pivots')
+
+
+def fib_levels(high, low, close):
+    """Unrounded {level: value} for scalars or arrays of yearly High / Low / Close."""
+    pp = (high + low + close) / 3
+    r = high - low
+    out = {"PP": pp}
+    for level, k in FIB.items():
+        out[level] = pp + k * r
+    return out
+
+
+def yearly_hlc(price_df):
+    """(symbol, year) -> High, Low, Close (last close of the year), one groupby pass."""
+    df = price_df.rename(columns={c: str(c).strip().lower() for c in price_df.columns})
+    df = df[['symbol', 'date', 'high', 'low', 'close']].dropna(subset=['high', 'low', 'close'])
+    df = df.assign(date=pd.to_datetime(df['date'])).sort_values('date', kind='stable')
+    df['year'] = df['date'].dt.year
+    g = df.groupby(['symbol', 'year'], sort=False)
+    out = pd.DataFrame({'high': g['high'].max(), 'low': g['low'].min(), 'close': g['close'].last()})
+    return out.reset_index()
+
+
+def build_pivot_table(price_df, symbols=None, include_current_year=False):
+    """
+    Pivot rows (CSV_COLUMNS) for year + 1 of every complete (symbol, year) in
+    `price_df`. The running calendar year is skipped unless include_current_year.
+    """
+    hlc = yearly_hlc(price_df)
+    if symbols is not None:
+        hlc = hlc[hlc['symbol'].isin(list(symbols))]
+    if not include_current_year:
+        hlc = hlc[hlc['year'] < datetime.date.today().year]
+
+    levels = fib_levels(hlc['high'].to_numpy(), hlc['low'].to_numpy(), hlc['close'].to_numpy())
+    table = pd.DataFrame({'symbol': hlc['symbol'].to_numpy(), 'Year': hlc['year'].to_numpy() + 1})
+    for col in CSV_COLUMNS[2:]:
+        table[col] = np.round(levels[col.upper()], 2)
+    return table.sort_values(['symbol', 'Year'], ascending=[True, False], kind='stable').reset_index(drop=True)
+
+
+def table_version(table):
+    """Content hash of a pivot table (stable for equal rows)."""
+    csv = table[CSV_COLUMNS].to_csv(index=False, float_format='%.2f')
+    return hashlib.sha1((FORMULA_VERSION + csv).encode()).hexdigest()[:12]
+
+
+def save_pivot_table(table, out_dir=PIVOT_DIR, data_version=None):
+    """Write fib_pivots_<version>.csv and point latest.json at it; returns the CSV path."""
+    version = table_version(table)
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"fib_pivots_{version}.csv")
+    if not os.path.exists(path):
+        tmp = path + '.tmp'
+        table[CSV_COLUMNS].to_csv(tmp, index=False, float_format='%.2f')
+        os.replace(tmp, path)
+
+    meta = {
+        'file': os.path.basename(path),
+        'version': version,
+        'formula': FORMULA_VERSION,
+        'data_version': data_version,
+        'rows': int(len(table)),
+        'symbols': int(table['symbol'].nunique()),
+        'years': [int(table['Year'].min()), int(table['Year'].max())] if len(table) else [],
+        'built_at': datetime.datetime.now().isoformat(timespec='seconds'),
+    }
+    tmp = os.path.join(out_dir, 'latest.json.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(meta, f, indent=1)
+    os.replace(tmp, os.path.join(out_dir, 'latest.json'))
+    return path
+
+
+def latest_pivot_table(out_dir=PIVOT_DIR):
+    """Path of the newest saved table, or None."""
+    try:
+        with open(os.path.join(out_dir, 'latest.json')) as f:
+            return os.path.join(out_dir, json.load(f)['file'])
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+class PivotTable:
+    """
+    Pivot levels as a dense array: cube[year - y0, sym_id, level] with
+    levels in LEVELS order (NaN = missing).
+    """
+
+    def __init__(self, symbols, y0, cube):
+        self.symbols = list(symbols)
+        self.sym_index = {s: i for i, s in enumerate(self.symbols)}
+        self.y0 = int(y0)
+        self.cube = cube
+
+    @classmethod
+    def from_frame(cls, df):
+        """Table in the hist_pp_levels.csv layout; a later row wins for a repeated (symbol, year)."""
+        df = df.rename(columns={c: str(c).strip().lstrip('\ufeff').lower() for c in df.columns})
+        missing = [c for c in ['symbol', 'year'] + [lv.lower() for lv in LEVELS] if c not in df.columns]
+        if missing:
+            raise ValueError(f"[Pivots] ❌ Pivot table is missing columns {missing}")
+
+        df = df.dropna(subset=['symbol', 'year'])
+        df = df[~df.duplicated(['symbol', 'year'], keep='last')]
+        codes, symbols = pd.factorize(df['symbol'])
+        years = df['year'].to_numpy(dtype=np.int64)
+        if not len(years):
+            return cls([], 0, np.full((0, 0, len(LEVELS)), np.nan))
+        y0 = int(years.min())
+        cube = np.full((int(years.max()) - y0 + 1, len(symbols), len(LEVELS)), np.nan)
+        values = df[[lv.lower() for lv in LEVELS]].apply(pd.to_numeric, errors='coerce').to_numpy(np.float64)
+        cube[years - y0, codes] = values
+        return cls(symbols, y0, cube)
+
+    @classmethod
+    def from_csv(cls, path):
+        return cls.from_frame(pd.read_csv(path))
+
+    @property
+    def years(self):
+        return np.arange(self.y0, self.y0 + len(self.cube))
+
+    def levels(self, symbol, year):
+        """{level: value} for one (symbol, year), or None."""
+        s = self.sym_index.get(symbol)
+        k = int(year) - self.y0
+        if s is None or not 0 <= k < len(self.cube) or np.isnan(self.cube[k, s]).all():
+            return None
+        return dict(zip(LEVELS, self.cube[k, s].tolist()))
+
+    def align(self, symbols, years):
+        """
+        (y0, cube) for another symbol list and the year span of `years`:
+        cube[k, i] holds the levels of symbols[i] in year y0 + k.
+        """
+        years = np.asarray(years)
+        y0 = int(years.min()) if len(years) else 0
+        n_years = int(years.max()) - y0 + 1 if len(years) else 0
+        out = np.full((n_years, len(symbols), len(LEVELS)), np.nan)
+        src = np.array([self.sym_index.get(s, -1) for s in symbols], dtype=np.int64)
+        lo, hi = max(y0, self.y0), min(y0 + n_years, self.y0 + len(self.cube))
+        if hi > lo and (src >= 0).any():
+            cols = np.flatnonzero(src >= 0)
+            out[lo - y0:hi - y0, cols] = self.cube[lo - self.y0:hi - self.y0][:, src[cols]]
+        return y0, out
+
+    def to_pp_map(self):
+        """Legacy {year: {symbol: {level: value}}} view."""
+        pp_map = {}
+        for k, s in zip(*np.nonzero(~np.isnan(self.cube).all(axis=2))):
+            pp_map.setdefault(int(self.y0 + k), {})[self.symbols[s]] = dict(zip(LEVELS, self.cube[k, s].tolist()))
+        return pp_map
+
+
+def main():
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+    from utils.ohlc_store import OHLCStore
+
+    store = OHLCStore()
+    started = datetime.datetime.now()
+    table = build_pivot_table(store.load())
+    path = save_pivot_table(table, data_version=store.data_version)
+    took = (datetime.datetime.now() - started).total_seconds()
+    print(f"[Pivots] ✅ {len(table)} rows ({table['symbol'].nunique()} symbols) -> {path} in {took:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
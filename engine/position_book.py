@@ -0,0 +1,115 @@
+# position_book.py
+import numpy as np
+import pandas as pd
+
+
+class PositionBook:
+    """
+    Preallocated struct-of-arrays store for open positions.
+
+    Positions are appended in fill order and closed in O(1) by clearing their
+    `is_open` flag. Closed slots are compacted away (order preserved) once they
+    outnumber the open ones, so `open_slots()` stays proportional to the live book.
+    Each position also gets a monotonically increasing `pid` that survives compaction.
+    """
+
+    # name -> (dtype, fill value for empty slots)
+    _FIELDS = {
+        'pid': (np.int64, 0),
+        'sym': (np.int32, 0),
+        'zone': (np.int8, 0),
+        'entry_price': (np.float64, np.nan),
+        'quantity': (np.int64, 0),
+        'entry_date': ('datetime64[ns]', np.datetime64('NaT')),
+        # Protocol-R state
+        'protocol_r_active': (bool, False),
+        'removed_on': ('datetime64[ns]', np.datetime64('NaT')),
+    }
+
+    def __init__(self, capacity=256):
+        self._cap = max(int(capacity), 1)
+        self._n = 0          # used slots (open + closed-but-not-compacted)
+        self._live = 0
+        self._next_pid = 0
+        self.is_open = np.zeros(self._cap, dtype=bool)
+        for name, (dtype, fill) in self._FIELDS.items():
+            setattr(self, name, np.full(self._cap, fill, dtype=dtype))
+
+    def __len__(self):
+        return self._live
+
+    def _grow(self):
+        self._cap *= 2
+        for name, (dtype, fill) in list(self._FIELDS.items()) + [('is_open', (bool, False))]:
+            new = np.full(self._cap, fill, dtype=dtype)
+            new[:self._n] = getattr(self, name)[:self._n]
+            setattr(self, name, new)
+
+    def add(self, sym, zone, entry_price, quantity, entry_date, **extra):
+        """Append an open position and return its pid."""
+        if self._n == self._cap:
+            if self._n - self._live >= self._live:
+                self.compact()
+            if self._n == self._cap:
+                self._grow()
+        i = self._n
+        pid = self._next_pid
+        self.pid[i] = pid
+        self.sym[i] = sym
+        self.zone[i] = zone
+        self.entry_price[i] = entry_price
+        self.quantity[i] = quantity
+        self.entry_date[i] = pd.Timestamp(entry_date).to_datetime64()
+        for name, value in extra.items():
+            getattr(self, name)[i] = value
+        self.is_open[i] = True
+        self._n += 1
+        self._live += 1
+        self._next_pid += 1
+        return pid
+
+    def close(self, slot):
+        """Close the position at `slot` (as returned by open_slots)."""
+        if self.is_open[slot]:
+            self.is_open[slot] = False
+            self._live -= 1
+
+    def close_many(self, slots):
+        slots = np.asarray(slots, dtype=np.int64)
+        if slots.size:
+            was = self.is_open[slots]
+            self.is_open[slots] = False
+            self._live -= int(was.sum())
+
+    def slot_of(self, pid):
+        """Current slot of `pid`, or None if it was compacted away."""
+        i = int(np.searchsorted(self.pid[:self._n], pid))
+        if i < self._n and self.pid[i] == pid:
+            return i
+        return None
+
+    def open_slots(self):
+        """Slots of open positions, in fill order."""
+        if self._n - self._live > max(self._live, 64):
+            self.compact()
+        return np.flatnonzero(self.is_open[:self._n])
+
+    def compact(self):
+        keep = np.flatnonzero(self.is_open[:self._n])
+        m = len(keep)
+        for name, (_, fill) in list(self._FIELDS.items()) + [('is_open', (bool, False))]:
+            arr = getattr(self, name)
+            arr[:m] = arr[keep]
+            arr[m:self._n] = fill
+        self._n = m
+
+    def to_frame(self, symbols, zones):
+        """Open positions as the legacy positions DataFrame."""
+        slots = self.open_slots()
+        return pd.DataFrame({
+            'symbol': [symbols[s] for s in self.sym[slots]],
+            'entry_zone': [zones[z] for z in self.zone[slots]],
+            'entry_price': self.entry_price[slots],
+            'quantity': self.quantity[slots],
+            'entry_date': pd.to_datetime(self.entry_date[slots]),
+        }, columns=['symbol', 'entry_zone', 'entry_price', 'quantity', 'entry_date'])
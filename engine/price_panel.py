@@ -0,0 +1,112 @@
+# price_panel.py
+import numpy as np
+import pandas as pd
+
+PANEL_FIELDS = ['open', 'high', 'low', 'close', 'volume']
+
+
+class PricePanel:
+    """
+    Dense (date x symbol) view of a long OHLC frame.
+
+    Every field in PANEL_FIELDS is a float64 array of shape (n_dates, n_symbols);
+    cells with no source row are NaN and False in `present`.
+    Symbols keep their order of first appearance in the source frame, and
+    `row_order` keeps each cell's source row position so same-day work can be
+    visited in the order the old per-date scan used.
+    """
+
+    def __init__(self, dates, symbols, fields, present, row_order=None):
+        self.dates = dates
+        self.symbols = list(symbols)
+        self.sym_index = {s: i for i, s in enumerate(self.symbols)}
+        self.fields = fields
+        self.present = present
+        self.row_order = row_order
+        self.years = dates.astype('datetime64[Y]').astype(np.int64) + 1970
+
+    @classmethod
+    def from_frame(cls, price_df, symbols=None):
+        """
+        Panel of a long frame. With `symbols` (e.g. those of an earlier chunk
+        of a stream) columns keep those positions and new symbols are added
+        after them, so symbol ids stay stable across chunks.
+        """
+        cols = {str(c).strip().lower(): c for c in price_df.columns}
+        for req in ('date', 'symbol', 'high', 'low', 'close'):
+            if req not in cols:
+                raise ValueError(f"[Panel] ❌ price_df is missing column '{req}'")
+
+        dt = pd.to_datetime(price_df[cols['date']]).to_numpy()
+        syms = price_df[cols['symbol']].to_numpy()
+
+        dates, d_idx = np.unique(dt, return_inverse=True)
+        if symbols is None:
+            s_codes, symbols = pd.factorize(syms)
+        else:
+            s_codes = pd.Index(symbols).get_indexer(syms)
+            new = pd.unique(syms[s_codes < 0])
+            if len(new):
+                symbols = list(symbols) + list(new)
+                s_codes = pd.Index(symbols).get_indexer(syms)
+        n_d, n_s = len(dates), len(symbols)
+
+        # first row wins for duplicated (date, symbol) pairs
+        flat = d_idx.astype(np.int64) * n_s + s_codes
+        flat, first = np.unique(flat, return_index=True)
+
+        present = np.zeros(n_d * n_s, dtype=bool)
+        present[flat] = True
+        row_order = np.full(n_d * n_s, -1, dtype=np.int64)
+        row_order[flat] = first
+
+        fields = {}
+        for name in PANEL_FIELDS:
+            arr = np.full(n_d * n_s, np.nan)
+            if name in cols:
+                src = pd.to_numeric(price_df[cols[name]], errors='coerce').to_numpy(dtype=np.float64)
+                arr[flat] = src[first]
+            fields[name] = arr.reshape(n_d, n_s)
+
+        return cls(dates, symbols, fields, present.reshape(n_d, n_s), row_order.reshape(n_d, n_s))
+
+    def take(self, sym_ids):
+        """Panel restricted to the symbol columns `sym_ids` (row_order keeps the source positions)."""
+        sym_ids = np.asarray(sym_ids, dtype=np.int64)
+        return PricePanel(
+            self.dates,
+            [self.symbols[s] for s in sym_ids],
+            {name: arr[:, sym_ids] for name, arr in self.fields.items()},
+            self.present[:, sym_ids],
+            None if self.row_order is None else self.row_order[:, sym_ids],
+        )
+
+    def __getattr__(self, name):
+        fields = self.__dict__.get('fields', {})
+        if name in fields:
+            return fields[name]
+        raise AttributeError(name)
+
+    @property
+    def shape(self):
+        return self.present.shape
+
+    def day_order(self, i, sym_ids):
+        """Sort `sym_ids` of date row `i` by their source row position."""
+        sym_ids = np.asarray(sym_ids)
+        if self.row_order is None or sym_ids.size < 2:
+            return sym_ids
+        return sym_ids[np.argsort(self.row_order[i, sym_ids], kind='stable')]
+
+    def day_order_fills(self, i, fills):
+        """Indices into same-day `fills` (from evaluate_entries), in source row order then zone."""
+        key = fills.sym if self.row_order is None else self.row_order[i, fills.sym]
+        return np.lexsort((fills.zone, key))
+
+    def date_index(self, date):
+        """Row of `date` in the panel, or None if it is not a trading date."""
+        key = np.datetime64(pd.to_datetime(date), 'ns').astype(self.dates.dtype)
+        i = int(np.searchsorted(self.dates, key))
+        if i < len(self.dates) and self.dates[i] == key:
+            return i
+        return None
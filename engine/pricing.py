@@ -0,0 +1,190 @@
+# pricing.py
+"""
+Vectorized Black-Scholes pricing for option chains and iron condors.
+
+Every function takes NumPy arrays (or scalars that broadcast) and works on a
+whole chain at once: implied_vol() solves all strikes together with a
+safeguarded Newton iteration (a step that leaves the current bracket falls
+back to bisection), so there is no per-strike Python loop. Index options
+are European; no dividend yield. Vols are annualised decimals (0.14, not 14).
+
+    greeks = chain_greeks(chain, spot, t)          # IV + delta per strike
+    pop, ev = ic_metrics(spot, t, greeks["atm_iv"], ..., credit)
+"""
+
+import datetime
+
+import numpy as np
+
+VOL_MIN = 1e-4
+VOL_MAX = 5.0
+IV_TOL = 1e-6
+IV_MAX_ITER = 60
+YEAR_SECONDS = 365 * 24 * 3600
+# NSE index options expire at the close
+EXPIRY_TIME = datetime.time(15, 30)
+MIN_YEARS = 1 / (365 * 24)        # floor of one hour, for chains scanned on / after expiry day
+
+_SQRT2 = np.sqrt(2.0)
+_SQRT2PI = np.sqrt(2.0 * np.pi)
+
+
+def _erfc(x):
+    """Complementary error function (Chebyshev fit, relative error < 1.2e-7)."""
+    z = np.abs(x)
+    t = 1.0 / (1.0 + 0.5 * z)
+    poly = -z * z - 1.26551223 + t * (1.00002368 + t * (0.37409196 + t * (0.09678418 + t * (
+        -0.18628806 + t * (0.27886807 + t * (-1.13520398 + t * (1.48851587 + t * (
+            -0.82215223 + t * 0.17087277))))))))
+    ans = t * np.exp(poly)
+    return np.where(x >= 0, ans, 2.0 - ans)
+
+
+def norm_cdf(x):
+    return 0.5 * _erfc(-np.asarray(x, dtype=float) / _SQRT2)
+
+
+def norm_pdf(x):
+    x = np.asarray(x, dtype=float)
+    return np.exp(-0.5 * x * x) / _SQRT2PI
+
+
+def years_to_expiry(expiry, now=None):
+    """Year fraction from `now` to the close on `expiry` ("28-Aug-2025" or date), floored at an hour."""
+    if isinstance(expiry, str):
+        expiry = datetime.datetime.strptime(expiry, "%d-%b-%Y").date()
+    if isinstance(expiry, datetime.datetime):
+        expiry = expiry.date()
+    now = now or datetime.datetime.now()
+    seconds = (datetime.datetime.combine(expiry, EXPIRY_TIME) - now).total_seconds()
+    return max(seconds / YEAR_SECONDS, MIN_YEARS)
+
+
+def _d1_d2(spot, strike, t, vol, rate):
+    sig_t = vol * np.sqrt(t)
+    d1 = (np.log(spot / strike) + (rate + 0.5 * vol * vol) * t) / sig_t
+    return d1, d1 - sig_t
+
+
+def bs_price(spot, strike, t, vol, rate=0.0, is_call=True):
+    """Black-Scholes premium; `is_call` may be an array of flags."""
+    d1, d2 = _d1_d2(spot, strike, t, vol, rate)
+    df = np.exp(-rate * t)
+    call = spot * norm_cdf(d1) - strike * df * norm_cdf(d2)
+    put = strike * df * norm_cdf(-d2) - spot * norm_cdf(-d1)
+    return np.where(is_call, call, put)
+
+
+def bs_delta(spot, strike, t, vol, rate=0.0, is_call=True):
+    d1, _ = _d1_d2(spot, strike, t, vol, rate)
+    return np.where(is_call, norm_cdf(d1), norm_cdf(d1) - 1.0)
+
+
+def bs_vega(spot, strike, t, vol, rate=0.0):
+    d1, _ = _d1_d2(spot, strike, t, vol, rate)
+    return spot * norm_pdf(d1) * np.sqrt(t)
+
+
+def implied_vol(price, spot, strike, t, rate=0.0, is_call=True, tol=IV_TOL, max_iter=IV_MAX_ITER):
+    """
+    Implied vol per element (NaN where the price is missing, zero or outside
+    the no-arbitrage bounds). All elements are solved together; converged
+    ones are frozen while the rest keep iterating.
+    """
+    price, spot, strike, t, is_call = np.broadcast_arrays(
+        np.asarray(price, dtype=float), np.asarray(spot, dtype=float),
+        np.asarray(strike, dtype=float), np.asarray(t, dtype=float), np.asarray(is_call, dtype=bool))
+    df = np.exp(-rate * t)
+    lower = np.where(is_call, np.maximum(spot - strike * df, 0.0), np.maximum(strike * df - spot, 0.0))
+    upper = np.where(is_call, spot, strike * df)
+    ok = np.isfinite(price) & (price > lower) & (price < upper) & (strike > 0) & (t > 0)
+
+    vol = np.full(price.shape, np.nan)
+    idx = np.flatnonzero(ok.ravel())
+    if not len(idx):
+        return vol
+
+    p, s, k, tt, c = (a.ravel()[idx] for a in (price, spot, strike, t, is_call))
+    lo, hi = np.full(len(idx), VOL_MIN), np.full(len(idx), VOL_MAX)
+    # Brenner-Subrahmanyam start, kept inside the bracket
+    x = np.clip(_SQRT2PI / np.sqrt(tt) * p / s, 0.05, 1.0)
+    active = np.arange(len(idx))
+    for _ in range(max_iter):
+        xa = x[active]
+        diff = bs_price(s[active], k[active], tt[active], xa, rate, c[active]) - p[active]
+        done = np.abs(diff) < tol * np.maximum(p[active], 1.0)
+        # price rises with vol: a positive error means the root is below
+        hi[active] = np.where(diff > 0, xa, hi[active])
+        lo[active] = np.where(diff > 0, lo[active], xa)
+        vega = bs_vega(s[active], k[active], tt[active], xa, rate)
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            step = xa - diff / vega
+        bisect = ~np.isfinite(step) | (step <= lo[active]) | (step >= hi[active])
+        x[active] = np.where(done, xa, np.where(bisect, 0.5 * (lo[active] + hi[active]), step))
+        active = active[~done]
+        if not len(active):
+            break
+    x[active] = np.nan                           # did not converge
+    vol.ravel()[idx] = x
+    return vol
+
+
+def chain_greeks(chain, spot, t, rate=0.0):
+    """
+    {ce_iv, pe_iv, ce_delta, pe_delta} arrays aligned with chain["strike"],
+    plus the scalar atm_iv (linear in strike around spot, calls and puts
+    averaged). IVs are solved from LTPs; strikes that do not solve fall back
+    to the file's IV column (percent) when the chain has one.
+    """
+    strikes = np.asarray(chain["strike"], dtype=float)
+    out = {}
+    for side, is_call in (("ce", True), ("pe", False)):
+        iv = implied_vol(np.asarray(chain[f"{side}_ltp"], dtype=float), spot, strikes, t, rate, is_call)
+        try:
+            quoted = np.asarray(chain[f"{side}_iv"], dtype=float) / 100
+        except KeyError:
+            quoted = None
+        if quoted is not None:
+            iv = np.where(np.isnan(iv) & (quoted > 0), quoted, iv)
+        out[f"{side}_iv"] = iv
+        with np.errstate(invalid="ignore"):
+            out[f"{side}_delta"] = bs_delta(spot, strikes, t, iv, rate, is_call)
+    out["atm_iv"] = atm_iv(strikes, out["ce_iv"], out["pe_iv"], spot)
+    return out
+
+
+def atm_iv(strikes, ce_iv, pe_iv, spot):
+    """IV at spot: per-strike mean of the call / put IVs that exist, interpolated in strike."""
+    iv = np.nanmean(np.vstack([ce_iv, pe_iv]), axis=0) if len(strikes) else np.array([])
+    ok = np.isfinite(iv)
+    if not ok.any():
+        return np.nan
+    return float(np.interp(spot, strikes[ok], iv[ok]))
+
+
+def prob_below(spot, level, t, vol, rate=0.0):
+    """Risk-neutral P(S_T < level) under a lognormal with volatility `vol`."""
+    _, d2 = _d1_d2(spot, level, t, vol, rate)
+    return norm_cdf(-d2)
+
+
+def ic_metrics(spot, t, vol, sell_pe, buy_pe, sell_ce, buy_ce, credit, rate=0.0):
+    """
+    (pop, ev) per iron condor, vectorized over the leg arrays, under one
+    flat vol (normally the ATM IV):
+      pop: probability of expiring between the breakevens (sell_pe - credit,
+           sell_ce + credit), i.e. of keeping some of the credit
+      ev:  credit minus the model value of the two spreads, both in
+           today's money: the expected P&L per unit (present value), which
+           is positive when the market's skew pays more for the wings than
+           a flat vol does
+    """
+    sell_pe, buy_pe, sell_ce, buy_ce, credit = (
+        np.asarray(a, dtype=float) for a in (sell_pe, buy_pe, sell_ce, buy_ce, credit))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        low = np.maximum(sell_pe - credit, 1e-9)
+        pop = prob_below(spot, sell_ce + credit, t, vol, rate) - prob_below(spot, low, t, vol, rate)
+        spreads = (bs_price(spot, sell_pe, t, vol, rate, False) - bs_price(spot, buy_pe, t, vol, rate, False)
+                   + bs_price(spot, sell_ce, t, vol, rate, True) - bs_price(spot, buy_ce, t, vol, rate, True))
+    ev = credit - spreads
+    return pop, ev
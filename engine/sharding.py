@@ -0,0 +1,142 @@
+# sharding.py
+"""
+Symbol-sharded backtest.
+
+Everything run_backtest tracks (zone/year slots, open positions, R-level
+exits, membership flips) is per symbol, so the universe can be split into
+shards that run on separate cores. Shard engines are column slices of the
+parent's panel; forked workers inherit the parent engine, spawned ones get
+their (shard-sized) engine pickled.
+
+The merge restores the single-process order exactly, using the parent
+panel's source row order (`row_order`, i.e. the order rows appear within a
+date):
+    entry_log   by (entry date, row order, zone)
+    exit_log    closed rows by (exit date, entry date, row order, zone),
+                then OPEN rows by (entry date, row order, zone)
+    flips       by (date, row order)
+"""
+
+import contextlib
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from engine.entry_signals import ZONES, mark_entry
+
+# engine being sharded (visible to forked workers)
+_BASE = None
+
+
+def plan_shards(panel, n_shards):
+    """
+    Split the panel's symbol ids into up to `n_shards` groups with similar
+    numbers of price rows (largest symbols first, greedy); ids sorted per shard.
+    """
+    n_shards = max(1, min(int(n_shards), len(panel.symbols)))
+    load = panel.present.sum(axis=0)
+    bins = [[] for _ in range(n_shards)]
+    totals = np.zeros(n_shards)
+    for s in np.argsort(-load, kind='stable'):
+        b = int(np.argmin(totals))
+        bins[b].append(s)
+        totals[b] += load[s]
+    return [np.sort(np.asarray(b, dtype=np.int64)) for b in bins if b]
+
+
+def _run_shard(sym_ids, config, engine=None):
+    """Run one shard; returns its logs, removal dates and still-open positions."""
+    shard = engine if engine is not None else _BASE.for_symbols(sym_ids, config)
+    with contextlib.redirect_stdout(io.StringIO()):
+        shard.run_backtest()
+    book = shard.book
+    open_positions = [
+        (shard.panel.symbols[book.sym[s]], int(book.zone[s]), book.entry_price[s],
+         int(book.quantity[s]), pd.Timestamp(book.entry_date[s]))
+        for s in book.open_slots()
+    ]
+    return shard.exit_log, shard.entry_log, shard.removal_dates, open_positions
+
+
+class _OrderKeys:
+    """Sort keys from the parent panel: day index and source row order of (date, symbol)."""
+
+    def __init__(self, panel):
+        self.panel = panel
+        self.index = pd.DatetimeIndex(panel.dates)
+
+    def day(self, ts):
+        return int(self.index.get_loc(pd.Timestamp(ts)))
+
+    def row(self, day, symbol):
+        s = self.panel.sym_index[symbol]
+        return s if self.panel.row_order is None else int(self.panel.row_order[day, s])
+
+    def entry(self, symbol, zone, date):
+        day = self.day(date)
+        return (day, self.row(day, symbol), ZONES.index(zone))
+
+
+def run_sharded(engine):
+    """Sharded equivalent of engine.run_backtest(); fills the engine's logs and book."""
+    global _BASE
+    from engine.backtest_engine import EXIT_COLUMNS
+
+    panel = engine.panel
+    config = {**engine.config, "SHARDS": 1}
+    shards = plan_shards(panel, engine.config.get("SHARDS", 1))
+    workers = int(engine.config.get("SHARD_WORKERS") or min(len(shards), os.cpu_count() or 1))
+    engine._entry_gate()        # build shared inputs (indicators) once, before slicing
+
+    if workers <= 1 or len(shards) <= 1:
+        results = [_run_shard(ids, config, engine.for_symbols(ids, config)) for ids in shards]
+    else:
+        fork = 'fork' in multiprocessing.get_all_start_methods()
+        ctx = multiprocessing.get_context('fork' if fork else 'spawn')
+        _BASE = engine
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+                if fork:
+                    futures = [pool.submit(_run_shard, ids, config) for ids in shards]
+                else:
+                    futures = [pool.submit(_run_shard, None, None, engine.for_symbols(ids, config)) for ids in shards]
+                results = [f.result() for f in futures]
+        finally:
+            _BASE = None
+
+    keys = _OrderKeys(panel)
+
+    # --- Membership flips ---
+    removals = [(keys.day(ts), keys.row(keys.day(ts), sym), sym, ts)
+                for _, _, removal_dates, _ in results for sym, ts in removal_dates.items()]
+    for _, _, sym, ts in sorted(removals, key=lambda r: r[:2]):
+        engine.removal_dates[sym] = ts
+        print(f"[Protocol-R Activated] {sym} removed on {ts.date()}")
+
+    # --- Entries ---
+    entries = [e for _, entry_log, _, _ in results for e in entry_log]
+    entries.sort(key=lambda e: keys.entry(e['symbol'], e['zone'], e['date']))
+    for e in entries:
+        mark_entry(engine.active_positions, e['symbol'], e['zone'], e['date'].year, e['date'])
+    engine.entry_log.extend(entries)
+
+    # --- Exits: closed in (exit date, entry order), then OPEN rows in entry order ---
+    def exit_key(row):
+        entry = keys.entry(row['symbol'], row['entry_zone'], row['entry_date'])
+        if row['reason'] == 'OPEN':
+            return (1, 0) + entry
+        return (0, keys.day(row['exit_date'])) + entry
+
+    engine.exit_log.extend(sorted((row for exit_log, _, _, _ in results for row in exit_log), key=exit_key))
+
+    # --- Still-open positions back into the parent's book ---
+    open_positions = [p for _, _, _, positions in results for p in positions]
+    open_positions.sort(key=lambda p: keys.entry(p[0], ZONES[p[1]], p[4]))
+    for symbol, zone, price, qty, entry_date in open_positions:
+        engine.book.add(panel.sym_index[symbol], zone, price, qty, entry_date)
+
+    return pd.DataFrame(engine.exit_log, columns=EXIT_COLUMNS)
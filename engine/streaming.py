@@ -0,0 +1,207 @@
+# streaming.py
+"""
+Out-of-core ("streaming") backtest mode.
+
+The daily engine lays the whole history out as one (date x symbol) panel.
+Here OHLC arrives as date-ordered chunks instead (a generator of long
+frames), and each chunk is laid out, stepped with the daily engine's own
+loop and dropped before the next one is read:
+
+    engine = BacktestEngine(None, pp_csv, nifty_csv, config)
+    engine.run_stream(store_chunks("data/ohlc_store"), CsvSink("exits.csv"))
+
+Between chunks only the position book, the per-symbol Protocol-R / zone
+state, pivots and membership stay resident. Trades go to a sink as each chunk
+finishes, so memory depends on the chunk size and the number of symbols,
+not on the length of the history. Results equal the daily engine's (same
+entry_log / exit_log rows, in the same order).
+
+Sources:
+- frame_chunks: an in-memory frame, `days` trading dates at a time
+- csv_chunks: a date-sorted CSV read `chunksize` rows at a time
+- store_chunks: windows of calendar days from the OHLC store (memory maps)
+
+Chunks must not share dates: a day split across two chunks would be stepped
+twice. csv_chunks holds back the rows of each chunk's last date for this.
+SIGNAL_FILTERS is not supported here (its indicators need the full history).
+"""
+
+import numpy as np
+import pandas as pd
+
+from engine.backtest_engine import EXIT_COLUMNS, DayState
+from engine.indicators import filters_enabled
+from engine.price_panel import PricePanel
+from utils.ohlc_store import OHLCStore
+
+ENTRY_COLUMNS = ['symbol', 'zone', 'price', 'date']
+FRAME_CHUNK_DAYS = 250        # trading dates per frame chunk (about a year)
+CSV_CHUNK_ROWS = 100_000
+STORE_CHUNK_DAYS = 366        # calendar days per store window
+
+
+# --- sources ---
+def frame_chunks(price_df, days=FRAME_CHUNK_DAYS):
+    """Chunks of `days` trading dates of an in-memory long frame (rows keep their order within a date)."""
+    cols = {str(c).strip().lower(): c for c in price_df.columns}
+    dt = pd.to_datetime(price_df[cols['date']]).to_numpy()
+    order = np.argsort(dt, kind='stable')
+    dt = dt[order]
+    dates = np.unique(dt)
+    for a in range(0, len(dates), days):
+        lo = np.searchsorted(dt, dates[a], side='left')
+        hi = np.searchsorted(dt, dates[min(a + days, len(dates)) - 1], side='right')
+        yield price_df.iloc[order[lo:hi]]
+
+
+def csv_chunks(csv_path, chunksize=CSV_CHUNK_ROWS, dayfirst=True):
+    """
+    Chunks of a date-sorted OHLC CSV, `chunksize` rows at a time. The rows of
+    each chunk's last date are carried into the next chunk so no date is split.
+    """
+    carry = None
+    for part in pd.read_csv(csv_path, chunksize=chunksize):
+        part.columns = [str(c).strip().lower() for c in part.columns]
+        part['date'] = pd.to_datetime(part['date'], dayfirst=dayfirst)
+        if carry is not None:
+            part = pd.concat([carry, part], ignore_index=True)
+        dates = part['date'].to_numpy()
+        if not part['date'].is_monotonic_increasing:
+            raise ValueError(f"[Stream] ❌ {csv_path} is not sorted by date; "
+                             "import it into the OHLC store and use store_chunks()")
+        cut = int(np.searchsorted(dates, dates[-1], side='left'))
+        carry = part.iloc[cut:]
+        if cut:
+            yield part.iloc[:cut]
+    if carry is not None and len(carry):
+        yield carry
+
+
+def store_chunks(store, symbols=None, start=None, end=None, days=STORE_CHUNK_DAYS):
+    """Windows of `days` calendar days from an OHLCStore (or its root directory)."""
+    store = store if isinstance(store, OHLCStore) else OHLCStore(store)
+    return store.windows(symbols, start, end, days)
+
+
+# --- sinks ---
+class TradeSink:
+    """Receives entries and exits as a streaming run produces them."""
+
+    def __init__(self):
+        self.n_entries = self.n_exits = self.n_open = 0
+
+    def write(self, entries, exits):
+        n_open = sum(1 for row in exits if row['reason'] == 'OPEN')
+        self.n_entries += len(entries)
+        self.n_exits += len(exits) - n_open
+        self.n_open += n_open
+        self.emit(entries, exits)
+
+    def emit(self, entries, exits):
+        pass
+
+    def close(self):
+        return None
+
+
+class ListSink(TradeSink):
+    """Keeps every row in memory (the engine's entry_log / exit_log after the run)."""
+
+    def __init__(self):
+        super().__init__()
+        self.entries = []
+        self.exits = []
+
+    def emit(self, entries, exits):
+        self.entries.extend(entries)
+        self.exits.extend(exits)
+
+    def close(self):
+        return pd.DataFrame(self.exits, columns=EXIT_COLUMNS)
+
+
+class CsvSink(TradeSink):
+    """Appends exits (and optionally entries) to CSV files chunk by chunk."""
+
+    def __init__(self, exits_csv, entries_csv=None):
+        super().__init__()
+        self.paths = {'exits': (exits_csv, EXIT_COLUMNS), 'entries': (entries_csv, ENTRY_COLUMNS)}
+        self._started = set()
+
+    def _append(self, kind, rows):
+        path, columns = self.paths[kind]
+        if not path or (not rows and kind in self._started):
+            return
+        first = kind not in self._started
+        pd.DataFrame(rows, columns=columns).to_csv(path, mode='w' if first else 'a', header=first, index=False)
+        self._started.add(kind)
+
+    def emit(self, entries, exits):
+        if entries:
+            self._append('entries', entries)
+        if exits:
+            self._append('exits', exits)
+
+    def close(self):
+        for kind in self.paths:
+            self._append(kind, [])      # header-only file for an empty run
+        return {'entries': self.n_entries, 'exits': self.n_exits, 'open': self.n_open,
+                'exits_csv': self.paths['exits'][0]}
+
+
+# --- run ---
+def _slot_year(key):
+    return key.year if isinstance(key, pd.Timestamp) else int(key)
+
+
+def _prune_active(active_positions, year):
+    """Drop legacy active_positions slots of years before `year`; they can no longer block a fill."""
+    for sym in list(active_positions):
+        slots = active_positions[sym]
+        for key in [k for k in slots if _slot_year(k[1]) < year]:
+            del slots[key]
+        if not slots:
+            del active_positions[sym]
+
+
+def run_stream(engine, chunks, sink):
+    """
+    Step `engine` through `chunks`, sending each chunk's trades to `sink`, and
+    return sink.close(). engine.panel is left on the last chunk (its symbols
+    are every symbol seen, matching the book's ids).
+    """
+    if filters_enabled(engine.config):
+        raise ValueError("[Stream] ❌ SIGNAL_FILTERS needs the full history; use ENGINE_MODE daily or events")
+
+    state = DayState()
+    symbols = []
+    panel = None
+    for chunk in chunks:
+        if not len(chunk):
+            continue
+        prev_last = panel.dates[-1] if panel is not None else None
+        year = state.cur_year
+        panel = PricePanel.from_frame(chunk, symbols)
+        if prev_last is not None and panel.dates[0] <= prev_last:
+            raise ValueError(f"[Stream] ❌ Chunks overlap or go back in time at {pd.Timestamp(panel.dates[0]).date()}")
+        symbols = panel.symbols
+        state.grow(len(symbols))
+
+        engine.panel = panel
+        y0, cube = engine._pivot_cube(panel)
+        member = engine.nifty_mgr.membership_bitmap(panel.dates, symbols) & panel.present
+        engine._step_days(panel, y0, cube, member, None, state)
+        if state.cur_year != year:
+            _prune_active(engine.active_positions, state.cur_year)
+
+        sink.write(engine.entry_log, engine.exit_log)
+        engine.entry_log, engine.exit_log = [], []
+
+    # === Unrealized P&L for still-open positions ===
+    if panel is not None:
+        engine._open_rows(panel.present[-1], panel.close[-1])
+        sink.write([], engine.exit_log)
+        engine.exit_log = []
+    if isinstance(sink, ListSink):
+        engine.entry_log, engine.exit_log = sink.entries, sink.exits
+    return sink.close()
@@ -0,0 +1,275 @@
+# sweep.py
+"""
+Parameter sweeps over BacktestEngine.
+
+Prices, pivots and membership are loaded once into a base engine. Worker
+processes get it read-only: forked children inherit it copy-on-write, and
+with spawn each worker loads it once in its initializer. Tasks only carry a
+small params dict. Each finished run appends one summary row to a CSV keyed
+by a hash of its params, the base config and the input data, so an
+interrupted sweep resumes where it stopped, and a rerun on other data or
+settings does not reuse stale rows.
+
+    python -m engine.sweep --param ALLOCATION_PER_ZONE=20000,25000,30000 \\
+        --param ZONES=PP+S1+S2+S3,S1+S2+S3 --out data/sweeps/zones.csv --workers 4
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from engine.backtest_engine import BacktestEngine
+from engine.pivots import PivotTable
+from utils.nifty_manager import NiftyManager
+from utils.ohlc_store import load_ohlc, open_store
+
+BASE = os.path.join(os.path.dirname(__file__), '..', 'data')
+DEFAULT_PATHS = {
+    'ohlc_csv': os.path.join(BASE, 'ohlc.csv'),
+    'ohlc_store': os.path.join(BASE, 'ohlc_store'),
+    'pp_csv': os.path.join(BASE, 'hist_pp_levels.csv'),
+    'nifty_csv': os.path.join(BASE, 'nifty50_membership.csv'),
+}
+BASE_CONFIG = {"ALLOCATION_PER_ZONE": 25000, "PROTOCOL_R": "N", "ENGINE_MODE": "events"}
+
+METRIC_COLUMNS = [
+    'entries', 'closed', 'open', 'wins', 'win_rate', 'realized_pnl', 'open_pnl',
+    'total_pnl', 'capital', 'return_pct', 'max_drawdown', 'seconds',
+]
+
+# base engine of this process (set in the parent before forking, or by _init_worker)
+_BASE_ENGINE = None
+
+
+def load_base_engine(paths=None, config=None):
+    """Load prices, pivots and membership once; runs are derived with with_config()."""
+    paths = {**DEFAULT_PATHS, **(paths or {})}
+    price_df = load_ohlc(paths['ohlc_csv'], store_root=paths['ohlc_store'])
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine = BacktestEngine(price_df, paths['pp_csv'], paths['nifty_csv'], dict(config or BASE_CONFIG))
+    engine._membership_mask()
+    return engine
+
+
+def inputs_version(paths=None, engine=None):
+    """
+    Short digest of the data a sweep runs on: the OHLC store's data_version,
+    the pivot table and the membership table (from `engine` if given).
+    """
+    if engine is None:
+        paths = {**DEFAULT_PATHS, **(paths or {})}
+        data_version = open_store(paths['ohlc_csv'], paths['ohlc_store']).data_version
+        pivots = PivotTable.from_csv(paths['pp_csv'])
+        membership = NiftyManager(paths['nifty_csv']).df
+    else:
+        data_version, pivots, membership = engine.data_version, engine.pivots, engine.nifty_mgr.df
+    digest = hashlib.sha1(json.dumps([data_version, pivots.y0, pivots.symbols]).encode())
+    digest.update(np.ascontiguousarray(pivots.cube).tobytes())
+    digest.update(membership.to_csv(index=False).encode())
+    return digest.hexdigest()[:12]
+
+
+def run_id(params, context=None):
+    """Stable short id of a params dict, within `context` (base config and inputs version)."""
+    key = params if context is None else {'params': params, 'context': context}
+    return hashlib.sha1(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+
+def grid(space):
+    """Every combination of `space` ({name: [values]}), in order."""
+    names = list(space)
+    return [dict(zip(names, combo)) for combo in itertools.product(*(space[n] for n in names))]
+
+
+def random_search(space, n, seed=0):
+    """`n` distinct random combinations of `space` (fewer if the grid is smaller)."""
+    rng = random.Random(seed)
+    names = list(space)
+    total = int(np.prod([len(space[n]) for n in names])) if names else 0
+    seen, out = set(), []
+    while len(out) < min(n, total):
+        params = {name: rng.choice(space[name]) for name in names}
+        key = run_id(params)
+        if key not in seen:
+            seen.add(key)
+            out.append(params)
+    return out
+
+
+def summarize(exits, entries, seconds):
+    """Summary metrics of one run from its exit-log frame and entry count."""
+    closed = exits[exits['reason'] != 'OPEN']
+    still_open = exits[exits['reason'] == 'OPEN']
+    realized = float(closed['pnl'].sum())
+    capital = float((exits['entry_price'] * exits['quantity']).sum())
+
+    # drawdown of cumulative realized P&L in exit-date order
+    curve = np.concatenate([[0.0], closed.sort_values('exit_date', kind='stable')['pnl'].cumsum().to_numpy()])
+    drawdown = float((np.maximum.accumulate(curve) - curve).max())
+
+    wins = int((closed['pnl'] > 0).sum())
+    return {
+        'entries': entries,
+        'closed': len(closed),
+        'open': len(still_open),
+        'wins': wins,
+        'win_rate': round(wins / len(closed), 4) if len(closed) else np.nan,
+        'realized_pnl': round(realized, 2),
+        'open_pnl': round(float(still_open['pnl'].sum()), 2),
+        'total_pnl': round(float(exits['pnl'].sum()), 2),
+        'capital': round(capital, 2),
+        'return_pct': round(100 * float(exits['pnl'].sum()) / capital, 4) if capital else np.nan,
+        'max_drawdown': round(drawdown, 2),
+        'seconds': round(seconds, 4),
+    }
+
+
+def run_one(params, base_config=None, context=None):
+    """Run one parameter set on this process's base engine; returns its summary row."""
+    config = {**(base_config or BASE_CONFIG), **params}
+    t0 = time.perf_counter()
+    engine = _BASE_ENGINE.with_config(config)
+    with contextlib.redirect_stdout(io.StringIO()):
+        exits = engine.run_backtest()
+    row = {'run_id': run_id(params, context)}
+    row.update({k: json.dumps(v) if isinstance(v, (list, tuple)) else v for k, v in params.items()})
+    row.update(summarize(exits, len(engine.entry_log), time.perf_counter() - t0))
+    return row
+
+
+def _init_worker(paths, base_config):
+    global _BASE_ENGINE
+    if _BASE_ENGINE is None:
+        _BASE_ENGINE = load_base_engine(paths, base_config)
+
+
+def _done_ids(out_csv):
+    if not out_csv or not os.path.exists(out_csv):
+        return set()
+    try:
+        return set(pd.read_csv(out_csv, usecols=['run_id'], dtype=str)['run_id'])
+    except (ValueError, pd.errors.EmptyDataError):
+        return set()
+
+
+def _append_row(out_csv, row, columns):
+    new = not os.path.exists(out_csv) or os.path.getsize(out_csv) == 0
+    pd.DataFrame([row], columns=columns).to_csv(out_csv, mode='a', header=new, index=False)
+
+
+def run_sweep(param_sets, out_csv=None, workers=None, paths=None, base_config=None, engine=None):
+    """
+    Run every params dict in `param_sets` (skipping run_ids already in
+    `out_csv`) over a process pool, appending one row per finished run.
+    Returns the results table (previous rows included; rows of other base
+    configs or inputs in the same file are left out).
+    """
+    global _BASE_ENGINE
+    base_config = dict(base_config or BASE_CONFIG)
+    context = {'base_config': base_config, 'inputs': inputs_version(paths, engine)}
+    ids = {run_id(p, context) for p in param_sets}
+    done = _done_ids(out_csv)
+    todo = [p for p in param_sets if run_id(p, context) not in done]
+    print(f"[Sweep] ▶️ {len(todo)} run(s) to do, {len(param_sets) - len(todo)} already in results")
+
+    names = list(dict.fromkeys(k for p in param_sets for k in p))
+    columns = ['run_id'] + names + METRIC_COLUMNS
+    if out_csv:
+        os.makedirs(os.path.dirname(os.path.abspath(out_csv)), exist_ok=True)
+
+    rows = []
+    if todo:
+        workers = workers or os.cpu_count() or 1
+        fork = 'fork' in multiprocessing.get_all_start_methods()
+        if engine is not None:
+            _BASE_ENGINE = engine
+        elif _BASE_ENGINE is None and (fork or workers == 1):
+            _BASE_ENGINE = load_base_engine(paths, base_config)
+
+        t0 = time.perf_counter()
+        if workers == 1:
+            results = (run_one(p, base_config, context) for p in todo)
+        else:
+            # fork: children inherit _BASE_ENGINE; spawn: each worker loads it once
+            ctx = multiprocessing.get_context('fork' if fork else 'spawn')
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                       initializer=_init_worker, initargs=(paths, base_config))
+            futures = [pool.submit(run_one, p, base_config, context) for p in todo]
+            results = (f.result() for f in as_completed(futures))
+
+        try:
+            for n, row in enumerate(results, 1):
+                rows.append(row)
+                if out_csv:
+                    _append_row(out_csv, row, columns)
+                if n % 10 == 0 or n == len(todo):
+                    print(f"[Sweep] ⏱️ {n}/{len(todo)} runs, {time.perf_counter() - t0:.1f}s")
+        finally:
+            if workers != 1:
+                pool.shutdown(cancel_futures=True)
+
+    if out_csv and os.path.exists(out_csv):
+        results = pd.read_csv(out_csv, dtype={'run_id': str})
+        return results[results['run_id'].isin(ids)].reset_index(drop=True)
+    return pd.DataFrame(rows, columns=columns)
+
+
+def _parse_value(text):
+    if '+' in text:
+        return [z.strip() for z in text.split('+') if z.strip()]
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text
+
+
+def parse_space(specs):
+    """['NAME=v1,v2', ...] -> {NAME: [v1, v2]}; 'a+b' values become lists (e.g. ZONES)."""
+    space = {}
+    for spec in specs:
+        name, _, values = spec.partition('=')
+        if not values:
+            raise ValueError(f"[Sweep] ❌ Bad --param '{spec}', expected NAME=v1,v2")
+        space[name.strip()] = [_parse_value(v.strip()) for v in values.split(',')]
+    return space
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Parameter sweep over BacktestEngine")
+    ap.add_argument('--param', action='append', default=[], help="NAME=v1,v2,... (ZONES values: PP+S1+S2)")
+    ap.add_argument('--random', type=int, default=0, help="sample N random combinations instead of the full grid")
+    ap.add_argument('--seed', type=int, default=0)
+    ap.add_argument('--out', default=os.path.join(BASE, 'sweeps', 'results.csv'))
+    ap.add_argument('--workers', type=int, default=None)
+    ap.add_argument('--mode', default=BASE_CONFIG['ENGINE_MODE'], choices=['daily', 'events'])
+    for key in DEFAULT_PATHS:
+        ap.add_argument(f"--{key.replace('_', '-')}", dest=key, default=DEFAULT_PATHS[key])
+    args = ap.parse_args(argv)
+
+    space = parse_space(args.param)
+    param_sets = random_search(space, args.random, args.seed) if args.random else grid(space)
+    paths = {key: getattr(args, key) for key in DEFAULT_PATHS}
+    results = run_sweep(param_sets, out_csv=args.out, workers=args.workers, paths=paths,
+                        base_config={**BASE_CONFIG, 'ENGINE_MODE': args.mode})
+    if not results.empty:
+        print(results.sort_values('total_pnl', ascending=False).head(10).to_string(index=False))
+    print(f"[Sweep] ✅ Results in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
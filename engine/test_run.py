@@ -5,22 +5,30 @@ pd.set_option('display.max_columns', None)
 pd.set_option('display.width', 200)
 
 from engine.backtest_engine import BacktestEngine
+from engine.streaming import store_chunks
+from utils.ohlc_store import load_ohlc, open_store
 
 base = os.path.dirname(__file__)
-ohlc_csv        = os.path.join(base, '../data/ohlc.csv')
+ohlc_csv        = os.path.join(base, '../data/ohlc.csv')      # seeds the store on first run
+ohlc_store      = os.path.join(base, '../data/ohlc_store')
 pp_levels_csv   = os.path.join(base, '../data/hist_pp_levels.csv')
 nifty_csv       = os.path.join(base, '../data/nifty50_membership.csv')  # optional
 
-price_df = pd.read_csv(ohlc_csv, parse_dates=['date'])
-
 # Config
 config = {
     "ALLOCATION_PER_ZONE": 25000,
     'PROTOCOL_R': 'N',   # enable Protocol-R
+    "ENGINE_MODE": "daily",   # "events": first-touch mode, same results; "streaming": out of core
+    "SIGNAL_FILTERS": "N",   # "Y": gate S2/S3 entries on RSI / volume (engine/indicators.py)
+    "INTRADAY": "N",   # "Y": order same-day entry / exit from intraday bars (engine/intraday.py)
     "S2_RSI_MAX": 40,
     "S3_RSI_MAX": 35
 }
 
+# Streaming reads the store a year at a time instead of loading all of it
+streaming = config["ENGINE_MODE"] == "streaming"
+price_df = None if streaming else load_ohlc(ohlc_csv, store_root=ohlc_store)
+
 # Initialize
 engine = BacktestEngine(
     price_df=price_df,
@@ -30,9 +38,10 @@ engine = BacktestEngine(
 )
 
 # Optional skip protocol R for testing:
-# engine.nifty_mgr.is_member = lambda s, d: True
+# import numpy as np
+# engine.nifty_mgr.membership_bitmap = lambda dates, syms: np.ones((len(dates), len(syms)), dtype=bool)
 
-results = engine.run_backtest()
+results = engine.run_stream(store_chunks(open_store(ohlc_csv, ohlc_store))) if streaming else engine.run_backtest()
 
 print("Exit Log:")
 print(results)
@@ -1,25 +1,59 @@
 from commands.telegram_bot import start_bot
+from commands.jobs import JOBS
 from config.config_loader import CONFIG
+from upload.journal import JOURNAL
+from utils.metrics import METRICS
+import json
 import threading
 from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
 import os
 
 class DummyHandler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        self.send_response(200)
-        self.send_header('Content-type', 'text/plain')
+    """
+    /          liveness text
+    /healthz   JSON status (uptime, active jobs, rows waiting for Sheets)
+    /metrics   Prometheus text; ?format=json (or /metrics.json) for a JSON snapshot
+    """
+
+    def _send(self, status, body, content_type):
+        data = body.encode() if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-Length', str(len(data)))
         self.end_headers()
-        self.wfile.write(b"ArcReactor Bot is running")
+        self.wfile.write(data)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/healthz":
+            health = {
+                "status": "ok",
+                "uptime_seconds": round(METRICS.snapshot()["uptime_seconds"], 1),
+                "active_jobs": [job.describe() for job in JOBS.active()],
+                "journal_backlog": JOURNAL.backlog(),
+            }
+            self._send(200, json.dumps(health), 'application/json')
+        elif url.path == "/metrics.json" or (url.path == "/metrics" and parse_qs(url.query).get("format") == ["json"]):
+            self._send(200, json.dumps(METRICS.snapshot()), 'application/json')
+        elif url.path == "/metrics":
+            self._send(200, METRICS.prometheus(), 'text/plain; version=0.0.4')
+        else:
+            self._send(200, b"ArcReactor Bot is running", 'text/plain')
+
+    def log_message(self, format, *args):
+        # health checks and scrapes would flood the logs
+        pass
 
 def run_dummy_server():
     port = int(os.environ.get("PORT", 8080))
     server = HTTPServer(('0.0.0.0', port), DummyHandler)
-    print(f"[Web] Dummy server listening on port {port}")
+    print(f"[Web] Server listening on port {port} (/healthz, /metrics)")
     server.serve_forever()
 
 if __name__ == "__main__":
-    # Start the dummy web server in a background thread
+    # Start the web server (health / metrics) in a background thread
     threading.Thread(target=run_dummy_server, daemon=True).start()
-    
+
     print("[ArcReactor] Launching Telegram Commander...")
     start_bot(CONFIG)
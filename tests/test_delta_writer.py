@@ -0,0 +1,91 @@
+import pandas as pd
+
+from upload.fake_sheets import FakeWorksheet
+from upload.gdrive_sync import DeltaSheetWriter
+
+
+def test_upsert_after_blank_middle_row():
+    ws = FakeWorksheet("trading_zones", rows=[
+        ["Symbol", "PP"], ["AAA", 1], ["", ""], ["BBB", 2], ["CCC", 3],
+    ])
+    writer = DeltaSheetWriter(ws)
+
+    counts = writer.upsert(pd.DataFrame([{"Symbol": "CCC", "PP": 99}]))
+
+    assert counts == {"updated": 1, "appended": 0, "unchanged": 0}
+    assert ws.cells == [["Symbol", "PP"], ["AAA", 1], ["", ""], ["BBB", 2], ["CCC", 99]]
+
+
+def test_append_after_blank_middle_row():
+    ws = FakeWorksheet("trading_zones", rows=[["Symbol", "PP"], ["AAA", 1], ["", ""], ["BBB", 2]])
+    writer = DeltaSheetWriter(ws)
+
+    writer.upsert(pd.DataFrame([{"Symbol": "DDD", "PP": 4}]))
+    writer.upsert(pd.DataFrame([{"Symbol": "DDD", "PP": 5}, {"Symbol": "BBB", "PP": 6}]))
+
+    assert ws.cells == [["Symbol", "PP"], ["AAA", 1], ["", ""], ["BBB", 6], ["DDD", 5]]
+
+
+def _sheet():
+    return FakeWorksheet("trading_zones", rows=[
+        ["Symbol", "PP", "S1"], ["AAA", 1, 10], ["BBB", 2, 20], ["CCC", 3, 30], ["DDD", 4, 40],
+    ])
+
+
+def test_batch_update_sends_only_changed_rows():
+    ws = _sheet()
+    writer = DeltaSheetWriter(ws)
+
+    counts = writer.upsert(pd.DataFrame([
+        {"Symbol": "AAA", "PP": 1, "S1": 10},
+        {"Symbol": "BBB", "PP": 22, "S1": 20},
+        {"Symbol": "DDD", "PP": 4, "S1": 44},
+    ]))
+
+    assert counts == {"updated": 2, "appended": 0, "unchanged": 1}
+    assert ws.calls["batch_update"] == 1
+    assert ws.calls["append_rows"] == 0
+    assert ws.cells_written == 6            # two rows x three columns, nothing else
+    assert ws.cells[1:] == [["AAA", 1, 10], ["BBB", 22, 20], ["CCC", 3, 30], ["DDD", 4, 44]]
+
+
+def test_new_keys_go_through_one_append_rows():
+    ws = _sheet()
+    writer = DeltaSheetWriter(ws)
+
+    counts = writer.upsert(pd.DataFrame([
+        {"Symbol": "EEE", "PP": 5, "S1": 50},
+        {"Symbol": "AAA", "PP": 1, "S1": 10},
+        {"Symbol": "FFF", "PP": 6, "S1": 60},
+    ]))
+
+    assert counts == {"updated": 0, "appended": 2, "unchanged": 1}
+    assert ws.calls["append_rows"] == 1
+    assert ws.calls["batch_update"] == 0
+    assert ws.cells[-2:] == [["EEE", 5, 50], ["FFF", 6, 60]]
+
+
+def test_unchanged_sheet_makes_no_writes():
+    ws = _sheet()
+    writer = DeltaSheetWriter(ws)
+    df = pd.DataFrame([{"Symbol": r[0], "PP": r[1], "S1": r[2]} for r in ws.cells[1:]])
+
+    writer.upsert(df)
+    writer.upsert(df.astype({"PP": str}))   # the sheet may render numbers as text
+
+    assert ws.calls["get_all_values"] == 1
+    assert sum(n for op, n in ws.calls.items() if op != "get_all_values") == 0
+    assert ws.cells_written == 0
+
+
+def test_writes_never_clear_the_sheet():
+    ws = _sheet()
+    writer = DeltaSheetWriter(ws)
+
+    writer.upsert(pd.DataFrame([{"Symbol": "AAA", "PP": 9, "S1": 90, "R1": 1}]))
+    writer.upsert(pd.DataFrame([{"Symbol": "ZZZ", "PP": 0, "S1": 0}]))
+    writer.append([{"Symbol": "YYY", "PP": 7}])
+
+    assert ws.calls["clear"] == 0
+    assert ws.cells[0] == ["Symbol", "PP", "S1", "R1"]
+    assert [r[0] for r in ws.cells[1:]] == ["AAA", "BBB", "CCC", "DDD", "ZZZ", "YYY"]
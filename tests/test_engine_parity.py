@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+
+from benchmarks.synthetic import write_dataset
+from engine.backtest_engine import BacktestEngine
+from engine.streaming import frame_chunks
+
+# the synthetic membership CSV's dates go through NiftyManager's untyped parse
+pytestmark = pytest.mark.filterwarnings("ignore:Could not infer format")
+
+MODES = {
+    "events": {"ENGINE_MODE": "events"},
+    "streaming": {"ENGINE_MODE": "streaming"},
+    "sharded": {"SHARDS": 2},
+}
+
+
+@pytest.fixture(scope="module")
+def universe(tmp_path_factory):
+    return write_dataset(str(tmp_path_factory.mktemp("synthetic")), n_symbols=12, years=4, seed=1)
+
+
+def _run(universe, protocol_r, extra=None, chunk_days=None):
+    price_df, paths = universe
+    config = {"ALLOCATION_PER_ZONE": 25000, "PROTOCOL_R": protocol_r, **(extra or {})}
+    engine = BacktestEngine(price_df, paths["pp_csv"], paths["nifty_csv"], config)
+    if chunk_days:
+        exits = engine.run_stream(frame_chunks(price_df, days=chunk_days))
+    else:
+        exits = engine.run_backtest()
+    return exits.reset_index(drop=True), pd.DataFrame(engine.entry_log)
+
+
+@pytest.mark.parametrize("protocol_r", ["N", "Y"])
+@pytest.mark.parametrize("mode", list(MODES) + ["streaming_small_chunks"])
+def test_modes_match_daily(universe, protocol_r, mode):
+    exits, entries = _run(universe, protocol_r)
+    assert len(entries) and (exits["reason"] != "OPEN").any()
+
+    if mode == "streaming_small_chunks":
+        got_exits, got_entries = _run(universe, protocol_r, chunk_days=60)   # many chunk boundaries
+    else:
+        got_exits, got_entries = _run(universe, protocol_r, MODES[mode])
+
+    pd.testing.assert_frame_equal(got_exits, exits)
+    pd.testing.assert_frame_equal(got_entries, entries)
@@ -0,0 +1,123 @@
+import math
+
+import pytest
+
+from benchmarks.synthetic import make_option_chain
+from engine.chain_parser import parse_chain
+from engine.ic_scanner import scan_ic_chain
+from engine.ic_search import MIN_ROW_GAP, scan_ic_chain_full
+
+SPOT = 52000.0
+EXPIRY = "28-Aug-2025"
+
+
+@pytest.fixture(scope="module", params=[0, 1, 2])
+def chain(request, tmp_path_factory):
+    path = tmp_path_factory.mktemp("chain") / f"BANKNIFTY-{EXPIRY}.csv"
+    return parse_chain(str(make_option_chain(str(path), spot=SPOT, n_strikes=60, seed=request.param)))
+
+
+def _quoted(x):
+    return not (math.isnan(x) or x == 0)
+
+
+def _short_rows(strikes, min_spot_diff):
+    pe = [i for i, k in enumerate(strikes) if k <= SPOT and SPOT - k >= min_spot_diff]
+    ce = [j for j, k in enumerate(strikes) if k >= SPOT and k - SPOT >= min_spot_diff]
+    return pe, ce
+
+
+def _ranked(found, top_n):
+    """(ic list, n valid, max credit) the way both scans report them: credit desc, then scan order."""
+    found.sort(key=lambda f: (-round(f[0], 2), f[1], f[2]))
+    return ([ic for _, _, _, ic in found[:top_n]], len(found),
+            max(0, max(f[0] for f in found)) if found else 0)
+
+
+def brute_fixed(chain, min_wing_width, min_net_credit, min_spot_diff, top_n):
+    strikes, ce, pe = (list(chain[c]) for c in ("strike", "ce_ltp", "pe_ltp"))
+    row = {}
+    for k, strike in enumerate(strikes):
+        row.setdefault(strike, k)
+    pe_rows, ce_rows = _short_rows(strikes, min_spot_diff)
+    found = []
+    for i in pe_rows:
+        for j in ce_rows:
+            if j < i + MIN_ROW_GAP:
+                continue
+            pe_buy, ce_buy = strikes[i] - min_wing_width, strikes[j] + min_wing_width
+            if pe_buy not in row or ce_buy not in row:
+                continue
+            legs = [ce[j], pe[i], ce[row[ce_buy]], pe[row[pe_buy]]]
+            if not all(_quoted(x) for x in legs):
+                continue
+            credit = legs[0] + legs[1] - legs[2] - legs[3]
+            if credit >= min_net_credit:
+                found.append((credit, i, j, {
+                    "sell_pe": int(strikes[i]), "buy_pe": int(pe_buy),
+                    "sell_ce": int(strikes[j]), "buy_ce": int(ce_buy),
+                    "net_credit": round(credit, 2), "expiry": EXPIRY}))
+    return _ranked(found, top_n)
+
+
+def _best_hedge(strikes, ltp, k, width, min_wing_width, max_wing_width, max_hedge_cost):
+    """Cheapest allowed hedge row for a short strike (nearest on equal cost), or None."""
+    best = None
+    for h, strike in enumerate(strikes):
+        wing = width(k, strike)
+        if wing < min_wing_width or (max_wing_width and wing > max_wing_width):
+            continue
+        if not _quoted(ltp[h]) or (max_hedge_cost and ltp[h] > max_hedge_cost):
+            continue
+        if best is None or (ltp[h], wing) < (ltp[best], width(k, strikes[best])):
+            best = h
+    return best
+
+
+def brute_full(chain, min_wing_width, min_net_credit, min_spot_diff, top_n, max_wing_width, max_hedge_cost):
+    strikes, ce, pe = (list(chain[c]) for c in ("strike", "ce_ltp", "pe_ltp"))
+    pe_rows, ce_rows = _short_rows(strikes, min_spot_diff)
+    args = (min_wing_width, max_wing_width, max_hedge_cost)
+    pe_hedge = {i: _best_hedge(strikes, pe, strikes[i], lambda k, s: k - s, *args) for i in pe_rows}
+    ce_hedge = {j: _best_hedge(strikes, ce, strikes[j], lambda k, s: s - k, *args) for j in ce_rows}
+    found = []
+    for i in pe_rows:
+        for j in ce_rows:
+            hp, hc = pe_hedge[i], ce_hedge[j]
+            if j < i + MIN_ROW_GAP or hp is None or hc is None or not (_quoted(pe[i]) and _quoted(ce[j])):
+                continue
+            credit = (pe[i] - pe[hp]) + (ce[j] - ce[hc])
+            if credit >= min_net_credit:
+                found.append((credit, i, j, {
+                    "sell_pe": int(strikes[i]), "buy_pe": int(strikes[hp]),
+                    "sell_ce": int(strikes[j]), "buy_ce": int(strikes[hc]),
+                    "net_credit": round(credit, 2), "expiry": EXPIRY}))
+    return _ranked(found, top_n)
+
+
+@pytest.mark.parametrize("min_wing_width, min_net_credit, top_n", [
+    (200, 0, 5), (500, 50, 3), (300, -1000, 40), (100, 10_000, 3),
+])
+def test_fixed_scan_matches_brute_force(chain, min_wing_width, min_net_credit, top_n):
+    ic_list, _, max_credit, n_valid = scan_ic_chain(chain, SPOT, EXPIRY, min_wing_width, min_net_credit, 300, top_n)
+    want_list, want_valid, want_max = brute_fixed(chain, min_wing_width, min_net_credit, 300, top_n)
+
+    assert n_valid == want_valid
+    assert max_credit == pytest.approx(want_max)
+    assert ic_list == want_list
+
+
+@pytest.mark.parametrize("max_wing_width, max_hedge_cost", [
+    (None, None), (800, None), (None, 30), (1000, 50), (200, None),
+])
+@pytest.mark.parametrize("min_net_credit, top_n", [(0, 5), (150, 40), (-1000, 3)])
+def test_full_search_matches_brute_force(chain, max_wing_width, max_hedge_cost, min_net_credit, top_n):
+    ic_list, _, max_credit, n_valid = scan_ic_chain_full(
+        chain, SPOT, EXPIRY, 200, min_net_credit, 300, top_n,
+        max_wing_width=max_wing_width, max_hedge_cost=max_hedge_cost)
+    want_list, want_valid, want_max = brute_full(
+        chain, 200, min_net_credit, 300, top_n, max_wing_width, max_hedge_cost)
+
+    assert n_valid == want_valid
+    assert max_credit == pytest.approx(want_max)
+    assert ic_list == want_list
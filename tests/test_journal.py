@@ -0,0 +1,58 @@
+import threading
+import time
+
+from upload.journal import Journal, SheetsMirror
+
+
+def test_pull_drops_rows_deleted_from_sheet(tmp_path):
+    journal = Journal(str(tmp_path / "journal.db"))
+    sheet = [{"Symbol": "INFY", "Zone": "S1"}, {"Symbol": "TCS", "Zone": "S2"}]
+    mirror = SheetsMirror(journal, write=lambda *a, **k: None, read=lambda name: list(sheet))
+
+    mirror.pull("entry_log")
+    assert journal.get("entry_log", "INFY") is not None
+
+    sheet.pop(0)
+    mirror.pull("entry_log")
+    assert journal.get("entry_log", "INFY") is None
+    assert journal.get("entry_log", "TCS") == {"Symbol": "TCS", "Zone": "S2"}
+
+
+def test_pull_keeps_unsent_local_rows(tmp_path):
+    journal = Journal(str(tmp_path / "journal.db"))
+    journal.upsert("entry_log", [{"Symbol": "HDFC", "Zone": "S3"}], key="Symbol")
+    mirror = SheetsMirror(journal, write=lambda *a, **k: None, read=lambda name: [])
+
+    mirror.pull("entry_log")
+
+    assert journal.get("entry_log", "HDFC") == {"Symbol": "HDFC", "Zone": "S3"}
+
+
+def test_pull_waits_for_running_flush(tmp_path):
+    journal = Journal(str(tmp_path / "journal.db"))
+    journal.upsert("entry_log", [{"Symbol": "HDFC", "Zone": "S3"}], key="Symbol")
+    sheet = []
+    entered, release, flushed = threading.Event(), threading.Event(), threading.Event()
+
+    def write(df, sheet_name, key):
+        entered.set()
+        release.wait(5)
+        sheet.extend(df.to_dict("records"))
+
+    def read(name):
+        snapshot = list(sheet)
+        flushed.wait(1)         # a pull racing the flush imports its snapshot after done()
+        return snapshot
+
+    mirror = SheetsMirror(journal, write=write, read=read)
+    flusher = threading.Thread(target=lambda: (mirror.flush(), flushed.set()))
+    flusher.start()
+    entered.wait(5)
+    puller = threading.Thread(target=mirror.pull, args=("entry_log",))
+    puller.start()
+    time.sleep(0.1)
+    release.set()
+    flusher.join(5)
+    puller.join(5)
+
+    assert journal.get("entry_log", "HDFC") == {"Symbol": "HDFC", "Zone": "S3"}
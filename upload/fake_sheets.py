@@ -0,0 +1,116 @@
+"""
+In-memory stand-ins for gspread Spreadsheet/Worksheet.
+
+They implement the subset of the gspread API this repo uses, keep cells as a
+plain list of rows and count every call, so sheet writers can be exercised
+(and their API traffic measured) without credentials or network:
+
+    ws = FakeWorksheet("trading_zones")
+    get_writer("trading_zones", worksheet=ws).upsert(df)
+    ws.calls["batch_update"], ws.records()
+"""
+
+from collections import Counter
+
+from gspread.exceptions import WorksheetNotFound
+from gspread.utils import a1_to_rowcol, rowcol_to_a1
+
+
+class FakeWorksheet:
+    def __init__(self, title="Sheet1", rows=None):
+        self.title = title
+        self.cells = [list(r) for r in rows or []]
+        self.calls = Counter()
+        self.cells_written = 0
+
+    # --- helpers ---
+    def _ensure(self, n_rows, n_cols):
+        while len(self.cells) < n_rows:
+            self.cells.append([])
+        for row in self.cells[:n_rows]:
+            if len(row) < n_cols:
+                row.extend([""] * (n_cols - len(row)))
+
+    def _write(self, top, left, values):
+        values = [list(v) for v in values]
+        width = max((len(v) for v in values), default=0)
+        self._ensure(top + len(values) - 1, left + width - 1)
+        for r, row in enumerate(values):
+            self.cells[top - 1 + r][left - 1:left - 1 + len(row)] = row
+            self.cells_written += len(row)
+
+    def _used_rows(self):
+        n = len(self.cells)
+        while n and not any(str(c).strip() for c in self.cells[n - 1]):
+            n -= 1
+        return n
+
+    def records(self):
+        """Data rows as dicts keyed by the header row."""
+        if not self.cells:
+            return []
+        header = self.cells[0]
+        return [dict(zip(header, row + [""] * (len(header) - len(row))))
+                for row in self.cells[1:self._used_rows()]]
+
+    # --- gspread API subset ---
+    def get_all_values(self, *args, **kwargs):
+        self.calls["get_all_values"] += 1
+        return [list(r) for r in self.cells[:self._used_rows()]]
+
+    def get_all_records(self, *args, **kwargs):
+        self.calls["get_all_records"] += 1
+        return self.records()
+
+    def row_values(self, row, *args, **kwargs):
+        self.calls["row_values"] += 1
+        values = list(self.cells[row - 1]) if row <= len(self.cells) else []
+        while values and values[-1] == "":
+            values.pop()
+        return values
+
+    def update(self, values=None, range_name=None, **kwargs):
+        self.calls["update"] += 1
+        top, left = a1_to_rowcol((range_name or "A1").split(":")[0])
+        self._write(top, left, values)
+        return {"updatedRange": f"{self.title}!{range_name or 'A1'}"}
+
+    def batch_update(self, data, **kwargs):
+        self.calls["batch_update"] += 1
+        for item in data:
+            top, left = a1_to_rowcol(item["range"].split("!")[-1].split(":")[0])
+            self._write(top, left, item["values"])
+        return {"totalUpdatedRows": sum(len(item["values"]) for item in data)}
+
+    def append_rows(self, values, **kwargs):
+        self.calls["append_rows"] += 1
+        first = self._used_rows() + 1
+        self._write(first, 1, values)
+        width = max((len(v) for v in values), default=1)
+        last_cell = rowcol_to_a1(first + len(values) - 1, width)
+        return {"updates": {"updatedRange": f"{self.title}!A{first}:{last_cell}"}}
+
+    def append_row(self, values, **kwargs):
+        return self.append_rows([values], **kwargs)
+
+    def clear(self):
+        self.calls["clear"] += 1
+        self.cells = []
+
+
+class FakeSpreadsheet:
+    def __init__(self, title="ArcReactorMaster", worksheets=None):
+        self.title = title
+        self._worksheets = {ws.title: ws for ws in worksheets or []}
+
+    def worksheet(self, title):
+        if title not in self._worksheets:
+            raise WorksheetNotFound(title)
+        return self._worksheets[title]
+
+    def add_worksheet(self, title, rows=1000, cols=26, **kwargs):
+        ws = self._worksheets[title] = FakeWorksheet(title)
+        return ws
+
+    def worksheets(self):
+        return list(self._worksheets.values())
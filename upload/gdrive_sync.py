@@ -1,103 +1,414 @@
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-from gspread.utils import ValueInputOption
-import pandas as pd
-import os
-import json
-
-SCOPE = [
-    "https://spreadsheets.google.com/feeds",
-    "https://www.googleapis.com/auth/drive"
-]
-
-# Lazy client — credentials are only loaded on first actual call, not at import time
-_CLIENT = None
-
-def _get_client():
-    global _CLIENT
-    if _CLIENT is None:
-        creds_json = os.environ.get("GOOGLE_CREDENTIALS_JSON")
-        if not creds_json:
-            raise RuntimeError("[GSheet] ❌ GOOGLE_CREDENTIALS_JSON env var not set")
-        creds_dict = json.loads(creds_json)
-        creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, SCOPE)
-        _CLIENT = gspread.authorize(creds)
-    return _CLIENT
-
-
-def upload_to_gsheet(df_new, sheet_name="trading_zones"):
-    if not isinstance(df_new, pd.DataFrame):
-        raise ValueError("[GSheet] ❌ df_new is not a DataFrame")
-    if df_new.empty:
-        raise ValueError("[GSheet] ❌ DataFrame is empty before upload.")
-    if "Symbol" not in df_new.columns:
-        raise ValueError(f"[GSheet] ❌ 'Symbol' column missing. Found: {df_new.columns.tolist()}")
-
-    sheet = _get_client().open("ArcReactorMaster")
-    worksheet = sheet.worksheet(sheet_name)
-
-    try:
-        data = worksheet.get_all_records()
-        df_existing = pd.DataFrame(data)
-        if df_existing.empty or "Symbol" not in df_existing.columns:
-            df_existing = pd.DataFrame(columns=df_new.columns)
-    except Exception as e:
-        print(f"[GSheet] ⚠️ Failed to fetch existing data: {e}")
-        df_existing = pd.DataFrame(columns=df_new.columns)
-
-    for symbol in df_new["Symbol"]:
-        df_existing = df_existing[df_existing["Symbol"] != symbol]
-    df_combined = pd.concat([df_existing, df_new], ignore_index=True).sort_values(by="Symbol")
-
-    worksheet.clear()
-    worksheet.update([df_combined.columns.values.tolist()] + df_combined.values.tolist())
-    print(f"[GSheet] ✅ Updated rows: {df_new['Symbol'].tolist()}")
-
-def read_sheet(sheet_id, sheet_name):
-    try:
-        sheet = _get_client().open_by_key(sheet_id).worksheet(sheet_name)
-        data = sheet.get_all_records()
-        df = pd.DataFrame(data)
-        return df
-    except Exception as e:
-        print(f"[GSheet] ❌ Read failed: {e}")
-        return pd.DataFrame()
-
-def append_row(sheet_id, sheet_name, row_data):
-    try:
-        sheet = _get_client().open_by_key(sheet_id).worksheet(sheet_name)
-        sheet.append_row(row_data, value_input_option=ValueInputOption.user_entered)
-        print(f"[GSheet] ✅ Appended to {sheet_name}: {row_data}")
-    except Exception as e:
-        print(f"[GSheet] ❌ Append failed: {e}")
-
-def append_to_gsheet(rows, sheet_name="ic_trades"):
-    sheet = _get_client().open("ArcReactorMaster")
-    worksheet = sheet.worksheet(sheet_name)
-
-    try:
-        data = worksheet.get_all_records()
-        df_existing = pd.DataFrame(data)
-    except Exception as e:
-        print(f"[GSheet] ⚠️ Failed to fetch existing data: {e}")
-        df_existing = pd.DataFrame()
-
-    df_new = pd.DataFrame(rows)
-    df_combined = pd.concat([df_existing, df_new], ignore_index=True)
-    worksheet.clear()
-    worksheet.update([df_combined.columns.values.tolist()] + df_combined.values.tolist())
-    print(f"[GSheet] ✅ Appended {len(rows)} row(s) to {sheet_name}")
-
-def get_config_dict(sheet_name="IC_Config", spreadsheet_name="ArcReactorMaster"):
-    """
-    Reads config as key-value from sheet and returns as dictionary
-    """
-    try:
-        sheet = _get_client().open(spreadsheet_name).worksheet(sheet_name)
-        rows = sheet.get_all_records()
-        config = {row["Key"]: str(row["Value"]).strip() for row in rows if row.get("Key")}
-        print(f"[GSheet] ✅ Loaded config from {sheet_name}: {config}")
-        return config
-    except Exception as e:
-        print(f"[GSheet] ❌ Config read failed: {e}")
-        return {}
\ No newline at end of file
+from gspread.utils import ValueInputOption, ValueRenderOption, rowcol_to_a1
+import pandas as pd
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from upload.gsheet_client import SHEETS, is_not_found
+from utils.metrics import inc, timer
+
+
+# --- Read-through cache ---
+
+# Seconds a sheet read stays fresh; entries keep being served (and refreshed
+# in the background) for STALE_FACTOR x TTL before a reader has to wait.
+SHEET_TTLS = {
+    "trading_zones": 3600,    # regenerated yearly / by /refresh_zone (which invalidates)
+    "IC_Config": 300,
+    "entry_log": 60,
+}
+DEFAULT_TTL = 120
+STALE_FACTOR = 10
+
+
+class _CacheEntry:
+    def __init__(self, records):
+        self.records = records
+        self.fetched_at = time.monotonic()
+        self._derived = {}
+
+    def memo(self, name, build):
+        """Value derived from the records, built once per fetch."""
+        if name not in self._derived:
+            self._derived[name] = build(self.records)
+        return self._derived[name]
+
+    def frame(self):
+        return self.memo("frame", pd.DataFrame)
+
+    def index(self, key):
+        """{str(row[key]).upper(): row} keeping the first row per key."""
+        def build(records):
+            idx = {}
+            for row in records:
+                k = str(row.get(key, "")).strip().upper()
+                if k:
+                    idx.setdefault(k, row)
+            return idx
+        return self.memo(("index", key), build)
+
+
+class SheetCache:
+    """
+    Read-through cache of worksheet records with per-sheet TTLs.
+
+    - concurrent misses for the same sheet share one fetch (single flight)
+    - expired entries are served stale while one background refresh runs
+    - invalidate(sheet_name) drops a sheet after our own writes; a fetch that
+      started before the write is not allowed to repopulate it
+    """
+
+    def __init__(self, ttls=None, default_ttl=DEFAULT_TTL, stale_factor=STALE_FACTOR):
+        self.ttls = dict(SHEET_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self.stale_factor = stale_factor
+        self._entries = {}      # (spreadsheet, sheet_name) -> _CacheEntry
+        self._inflight = {}     # (spreadsheet, sheet_name) -> Future
+        self._generation = {}   # sheet_name -> write counter
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="gsheet-refresh")
+        self.stats = {"hit": 0, "stale": 0, "miss": 0}
+
+    def ttl(self, sheet_name):
+        return self.ttls.get(sheet_name, self.default_ttl)
+
+    def get(self, spreadsheet, sheet_name, loader):
+        """_CacheEntry for the sheet; `loader()` must return its list of records."""
+        key = (spreadsheet, sheet_name)
+        ttl = self.ttl(sheet_name)
+        with self._lock:
+            entry = self._entries.get(key)
+            age = time.monotonic() - entry.fetched_at if entry else None
+            if entry and age < ttl:
+                self.stats["hit"] += 1
+                inc("sheets_cache_total", result="hit", sheet=sheet_name)
+                return entry
+            if entry and age < ttl * self.stale_factor:
+                self.stats["stale"] += 1
+                inc("sheets_cache_total", result="stale", sheet=sheet_name)
+                if key not in self._inflight:
+                    future = self._inflight[key] = Future()
+                    self._pool.submit(self._load, key, loader, future, self._generation.get(sheet_name, 0))
+                return entry
+            self.stats["miss"] += 1
+            inc("sheets_cache_total", result="miss", sheet=sheet_name)
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+                generation = self._generation.get(sheet_name, 0)
+        if owner:
+            self._load(key, loader, future, generation)
+        return future.result()
+
+    def _load(self, key, loader, future, generation):
+        try:
+            with timer("sheets_seconds", op="read", sheet=key[1]):
+                entry = _CacheEntry(loader())
+        except Exception as e:
+            with self._lock:
+                if self._inflight.get(key) is future:
+                    del self._inflight[key]
+            print(f"[GSheet] ⚠️ Refresh of {key[1]} failed: {e}")
+            future.set_exception(e)
+            return
+        with self._lock:
+            if self._generation.get(key[1], 0) == generation:
+                self._entries[key] = entry
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+        future.set_result(entry)
+
+    def invalidate(self, sheet_name=None):
+        """Drop cached reads of `sheet_name` (every sheet when None)."""
+        with self._lock:
+            if sheet_name is None:
+                names = {k[1] for k in self._entries} | {k[1] for k in self._inflight}
+            else:
+                names = {sheet_name}
+            for name in names:
+                self._generation[name] = self._generation.get(name, 0) + 1
+            for store in (self._entries, self._inflight):
+                for key in [k for k in store if k[1] in names]:
+                    del store[key]
+
+
+_CACHE = SheetCache()
+
+
+def invalidate_cache(sheet_name=None):
+    _CACHE.invalidate(sheet_name)
+
+
+def _get_all_records(ws):
+    return ws.get_all_records()
+
+
+def _records_by_key(sheet_id, sheet_name):
+    return _CACHE.get(("key", sheet_id), sheet_name,
+                      lambda: SHEETS.call(sheet_name, _get_all_records, key=sheet_id))
+
+
+def _records_by_name(spreadsheet_name, sheet_name):
+    return _CACHE.get(("name", spreadsheet_name), sheet_name,
+                      lambda: SHEETS.call(sheet_name, _get_all_records, spreadsheet_name=spreadsheet_name))
+
+
+
+def _cell(value):
+    """Sheet-safe cell value: NaN/None -> '', numpy scalars -> Python."""
+    if value is None or (isinstance(value, float) and value != value):
+        return ""
+    return value.item() if hasattr(value, "item") else value
+
+
+def _same(a, b):
+    """Cell equality across the sheet's rendering (numbers may come back as str)."""
+    if a == b:
+        return True
+    try:
+        return float(a) == float(b)
+    except (TypeError, ValueError):
+        return str(a).strip() == str(b).strip()
+
+
+class DeltaSheetWriter:
+    """
+    Row-level writer for one worksheet keyed on a column (default 'Symbol').
+
+    The sheet is read once to build {key: row number}; after that the writer
+    keeps the map and the last written values locally, sends only changed rows
+    with `batch_update` and new keys with `append_rows`. Nothing is ever
+    cleared, so a failed call leaves the previous rows in place.
+    """
+
+    def __init__(self, worksheet, key="Symbol", value_input_option=ValueInputOption.raw):
+        self.worksheet = worksheet
+        self.key = key
+        self.value_input_option = value_input_option
+        self.header = None
+        self._rows = None          # key -> (row number, [values in header order])
+        self._last_row = 0         # last used row number (1 = header)
+
+    def invalidate(self):
+        """Forget the cached sheet state; the next write re-reads it once."""
+        self.header = None
+        self._rows = None
+        self._last_row = 0
+
+    def _call(self, op, *args, **kwargs):
+        """worksheet.<op>(*args, **kwargs), timed."""
+        with timer("sheets_seconds", op=op, sheet=self.worksheet.title):
+            return getattr(self.worksheet, op)(*args, **kwargs)
+
+    def _load(self):
+        values = self._call("get_all_values", value_render_option=ValueRenderOption.unformatted)
+        self.header = [str(c) for c in values[0]] if values else []
+        self._rows = {}
+        self._last_row = len(values)
+        if self.key in self.header:
+            k = self.header.index(self.key)
+            width = len(self.header)
+            # number rows before skipping blank ones so row numbers match the sheet
+            for n, row in enumerate(values[1:], start=2):
+                if not any(str(c).strip() for c in row):
+                    continue
+                row = list(row) + [""] * (width - len(row))
+                self._rows.setdefault(str(row[k]).strip(), (n, row[:width]))
+
+    def _load_header(self):
+        self.header = [str(c) for c in self._call("row_values", 1)]
+
+    def _extend_header(self, columns):
+        """Add columns the sheet does not have yet; True if the header changed."""
+        added = [c for c in columns if c not in self.header]
+        if not added:
+            return False
+        self.header = self.header + added
+        if self._rows is not None:
+            self._rows = {k: (n, vals + [""] * len(added)) for k, (n, vals) in self._rows.items()}
+        self._call("update", [self.header], "A1", value_input_option=self.value_input_option)
+        self._last_row = max(self._last_row, 1)
+        return True
+
+    def _ordered(self, record):
+        return [_cell(record.get(col, "")) for col in self.header]
+
+    def _append(self, values):
+        resp = self._call("append_rows", values, value_input_option=self.value_input_option,
+                          table_range="A1")
+        # where the rows actually landed, e.g. "trading_zones!A52:L53"
+        updated = (resp or {}).get("updates", {}).get("updatedRange", "")
+        m = re.search(r"![A-Z]+(\d+)", updated)
+        first = int(m.group(1)) if m else self._last_row + 1
+        self._last_row = first + len(values) - 1
+        return first
+
+    def upsert(self, df):
+        """
+        Write `df` rows keyed on `self.key`: changed rows are updated in place,
+        unknown keys appended, identical rows skipped. Returns counts.
+        """
+        try:
+            if self._rows is None:
+                self._load()
+            self._extend_header(list(df.columns))
+
+            records = df.to_dict("records")
+            changed, new = {}, {}
+            for record in records:
+                key = str(_cell(record[self.key])).strip()
+                prev = self._rows.get(key)
+                values = self._ordered(record)
+                if prev is None:
+                    new[key] = values                      # later duplicate in df wins
+                elif not all(_same(a, b) for a, b in zip(prev[1], values)):
+                    changed[prev[0]] = (key, values)
+
+            if changed:
+                self._call("batch_update", self._ranges(changed), value_input_option=self.value_input_option)
+                for n, (key, values) in changed.items():
+                    self._rows[key] = (n, values)
+            if new:
+                first = self._append(list(new.values()))
+                for n, (key, values) in enumerate(new.items(), start=first):
+                    self._rows[key] = (n, values)
+        except Exception:
+            self.invalidate()
+            raise
+        return {"updated": len(changed), "appended": len(new), "unchanged": len(records) - len(changed) - len(new)}
+
+    def _ranges(self, changed):
+        """Coalesce consecutive changed rows into one range each."""
+        last_col = rowcol_to_a1(1, len(self.header)).rstrip("0123456789")
+        data, block = [], []
+        for n in sorted(changed):
+            if block and n != block[-1] + 1:
+                data.append(self._block(block, changed, last_col))
+                block = []
+            block.append(n)
+        if block:
+            data.append(self._block(block, changed, last_col))
+        return data
+
+    @staticmethod
+    def _block(block, changed, last_col):
+        return {"range": f"A{block[0]}:{last_col}{block[-1]}", "values": [changed[n][1] for n in block]}
+
+    def append(self, records):
+        """Append dict rows as-is (no key matching); returns the number of rows sent."""
+        if not records:
+            return 0
+        try:
+            if self.header is None:
+                self._load_header()
+            columns = list(dict.fromkeys(col for record in records for col in record))
+            self._extend_header(columns)
+            values = [self._ordered(record) for record in records]
+            first = self._append(values)
+            if self._rows is not None and self.key in self.header:
+                k = self.header.index(self.key)
+                for n, row in enumerate(values, start=first):
+                    self._rows.setdefault(str(row[k]).strip(), (n, row))
+        except Exception:
+            self.invalidate()
+            raise
+        return len(values)
+
+
+# (spreadsheet, sheet, key) -> DeltaSheetWriter; keeps row maps across calls
+_WRITERS = {}
+
+def get_writer(sheet_name, key="Symbol", spreadsheet_name="ArcReactorMaster", worksheet=None):
+    """Process-wide writer for a worksheet (pass `worksheet` to bind e.g. a FakeWorksheet)."""
+    cache_key = (spreadsheet_name, sheet_name, key)
+    writer = _WRITERS.get(cache_key)
+    if writer is None or (worksheet is not None and writer.worksheet is not worksheet):
+        if worksheet is None:
+            worksheet = SHEETS.worksheet(sheet_name, spreadsheet_name=spreadsheet_name)
+        writer = _WRITERS[cache_key] = DeltaSheetWriter(worksheet, key=key)
+    return writer
+
+
+def _write(sheet_name, key, action, spreadsheet_name="ArcReactorMaster"):
+    """action(writer); if the worksheet handle went stale, re-open it and retry once."""
+    try:
+        return action(get_writer(sheet_name, key=key, spreadsheet_name=spreadsheet_name))
+    except Exception as e:
+        if not is_not_found(e):
+            raise
+        print(f"[GSheet] ⚠️ {sheet_name} handle is stale ({e}); re-opening")
+        SHEETS.invalidate(spreadsheet_name=spreadsheet_name)
+        _WRITERS.pop((spreadsheet_name, sheet_name, key), None)
+        return action(get_writer(sheet_name, key=key, spreadsheet_name=spreadsheet_name))
+
+
+def upload_to_gsheet(df_new, sheet_name="trading_zones", key="Symbol"):
+    if not isinstance(df_new, pd.DataFrame):
+        raise ValueError("[GSheet] ❌ df_new is not a DataFrame")
+    if df_new.empty:
+        raise ValueError("[GSheet] ❌ DataFrame is empty before upload.")
+    if key not in df_new.columns:
+        raise ValueError(f"[GSheet] ❌ '{key}' column missing. Found: {df_new.columns.tolist()}")
+
+    try:
+        stats = _write(sheet_name, key, lambda writer: writer.upsert(df_new))
+    finally:
+        invalidate_cache(sheet_name)
+    print(f"[GSheet] ✅ Updated rows: {df_new[key].tolist()} "
+          f"({stats['updated']} changed, {stats['appended']} new, {stats['unchanged']} unchanged)")
+    return stats
+
+def read_sheet_records(sheet_name, spreadsheet_name="ArcReactorMaster"):
+    """Rows of a sheet as dicts (through the read cache); raises on failure."""
+    return _records_by_name(spreadsheet_name, sheet_name).records
+
+def read_sheet(sheet_id, sheet_name):
+    try:
+        return _records_by_key(sheet_id, sheet_name).frame().copy()
+    except Exception as e:
+        print(f"[GSheet] ❌ Read failed: {e}")
+        return pd.DataFrame()
+
+def read_sheet_index(sheet_id, sheet_name, key="Symbol"):
+    """
+    {KEY: row dict} for a sheet (keys upper-cased, first row wins), built
+    once per cached read so lookups are dict hits. Empty on failure.
+    """
+    try:
+        return _records_by_key(sheet_id, sheet_name).index(key)
+    except Exception as e:
+        print(f"[GSheet] ❌ Read failed: {e}")
+        return {}
+
+def append_row(sheet_id, sheet_name, row_data):
+    try:
+        with timer("sheets_seconds", op="append_row", sheet=sheet_name):
+            SHEETS.call(sheet_name, lambda ws: ws.append_row(row_data, value_input_option=ValueInputOption.user_entered),
+                        key=sheet_id)
+        print(f"[GSheet] ✅ Appended to {sheet_name}: {row_data}")
+    except Exception as e:
+        print(f"[GSheet] ❌ Append failed: {e}")
+    finally:
+        invalidate_cache(sheet_name)
+
+def append_to_gsheet(rows, sheet_name="ic_trades"):
+    try:
+        n = _write(sheet_name, "Symbol", lambda writer: writer.append(rows))
+    finally:
+        invalidate_cache(sheet_name)
+    print(f"[GSheet] ✅ Appended {n} row(s) to {sheet_name}")
+
+def get_config_dict(sheet_name="IC_Config", spreadsheet_name="ArcReactorMaster"):
+    """
+    Reads config as key-value from sheet and returns as dictionary
+    """
+    try:
+        def build(rows):
+            config = {row["Key"]: str(row["Value"]).strip() for row in rows if row.get("Key")}
+            print(f"[GSheet] ✅ Loaded config from {sheet_name}: {config}")
+            return config
+        return dict(_records_by_name(spreadsheet_name, sheet_name).memo("config", build))
+    except Exception as e:
+        print(f"[GSheet] ❌ Config read failed: {e}")
+        return {}
@@ -0,0 +1,227 @@
+"""
+Shared gspread client: one authorized session, cached sheet handles and a
+quota-aware request layer.
+
+    ws = SHEETS.worksheet("trading_zones", spreadsheet_name="ArcReactorMaster")
+    rows = SHEETS.call("entry_log", lambda ws: ws.get_all_records(), key=sheet_id)
+
+Opening a spreadsheet by title costs a Drive search plus a metadata fetch,
+and worksheet() costs another fetch. SheetsClient resolves each spreadsheet
+once and caches handles for all of its tabs from that single fetch, so
+later operations go straight to the data. If a cached handle turns out to
+be gone (sheet deleted or renamed: 404 or "Unable to parse range"), call()
+drops it, resolves it again and retries once.
+
+Requests go through QuotaHTTPClient:
+- a pooled keep-alive requests session (POOL_SIZE connections)
+- one token bucket for reads and one for writes, sized under the
+  per-user Sheets quota (60/min each)
+- retries of 429 / 408 / 5xx / Drive usageLimits with exponential backoff
+  and jitter (a 429 also drains the bucket)
+- the OAuth token is refreshed once fewer than TOKEN_REFRESH_MARGIN seconds
+  remain, so calls never wait on a 401
+"""
+
+import datetime
+import json
+import os
+import random
+import threading
+import time
+
+import gspread
+from google.auth.transport.requests import AuthorizedSession, Request
+from google.oauth2.service_account import Credentials
+from gspread.exceptions import APIError, SpreadsheetNotFound, WorksheetNotFound
+from gspread.http_client import HTTPClient
+from requests.adapters import HTTPAdapter
+
+from utils.metrics import inc, observe, timer
+from utils.rate_limit import TokenBucket
+
+SCOPE = [
+    "https://spreadsheets.google.com/feeds",
+    "https://www.googleapis.com/auth/drive"
+]
+
+POOL_SIZE = 16
+# Sheets API: 60 read and 60 write requests per minute per user
+READ_RATE, READ_BURST = 1.0, 10
+WRITE_RATE, WRITE_BURST = 1.0, 10
+MAX_RETRIES = 6
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 64.0
+RETRY_CODES = {408, 429, 500, 502, 503, 504}
+TOKEN_REFRESH_MARGIN = 300
+
+
+def is_not_found(error):
+    """True if `error` means the spreadsheet / worksheet behind a handle is gone."""
+    if isinstance(error, (SpreadsheetNotFound, WorksheetNotFound)):
+        return True
+    if isinstance(error, APIError):
+        return error.code == 404 or (error.code == 400 and "Unable to parse range" in str(error))
+    return False
+
+
+def _retryable(error):
+    if error.code in RETRY_CODES:
+        return True
+    # Drive reports quota exhaustion as 403 with an errors list
+    errors = error.error.get("errors") if isinstance(error.error, dict) else None
+    return error.code == 403 and bool(errors) and errors[0].get("domain") == "usageLimits"
+
+
+class QuotaLimiter:
+    """Read / write token buckets shared by every request of the process."""
+
+    def __init__(self):
+        self.buckets = {
+            "read": TokenBucket(READ_RATE, READ_BURST),
+            "write": TokenBucket(WRITE_RATE, WRITE_BURST),
+        }
+
+    def wait(self, kind):
+        waited = self.buckets[kind].wait()
+        if waited:
+            observe("sheets_quota_wait_seconds", waited, kind=kind)
+
+    def exhausted(self, kind):
+        self.buckets[kind].drain()
+
+
+LIMITER = QuotaLimiter()
+
+
+class QuotaHTTPClient(HTTPClient):
+    """gspread HTTP client over a pooled session with rate limiting, retries and early token refresh."""
+
+    def __init__(self, auth, session=None):
+        super().__init__(auth, session or AuthorizedSession(auth))
+        self.auth = auth
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self._token_lock = threading.Lock()
+        self._refresh_request = Request(self.session)
+
+    def _ensure_token(self):
+        expiry = getattr(self.auth, "expiry", None)
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        if self.auth.token and expiry and (expiry - now).total_seconds() > TOKEN_REFRESH_MARGIN:
+            return
+        with self._token_lock:
+            expiry = getattr(self.auth, "expiry", None)
+            if self.auth.token and expiry and (expiry - now).total_seconds() > TOKEN_REFRESH_MARGIN:
+                return                                  # another thread refreshed it
+            with timer("sheets_seconds", op="token_refresh", sheet=""):
+                self.auth.refresh(self._refresh_request)
+
+    def request(self, method, endpoint, *args, **kwargs):
+        kind = "read" if method.upper() == "GET" else "write"
+        for attempt in range(MAX_RETRIES + 1):
+            LIMITER.wait(kind)
+            self._ensure_token()
+            try:
+                return super().request(method, endpoint, *args, **kwargs)
+            except APIError as e:
+                if e.code == 401 and attempt == 0:
+                    self.auth.expiry = None             # token revoked early: refresh and retry once
+                    continue
+                if not _retryable(e) or attempt == MAX_RETRIES:
+                    raise
+                if e.code == 429:
+                    LIMITER.exhausted(kind)
+                delay = min(BACKOFF_BASE * 2 ** attempt, BACKOFF_MAX) * (0.5 + random.random() / 2)
+                inc("sheets_retries_total", code=e.code)
+                print(f"[GSheet] ⚠️ API {e.code} on {method} ({kind}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+
+def _load_credentials():
+    creds_json = os.environ.get("GOOGLE_CREDENTIALS_JSON")
+    if not creds_json:
+        raise RuntimeError("[GSheet] ❌ GOOGLE_CREDENTIALS_JSON env var not set")
+    return Credentials.from_service_account_info(json.loads(creds_json), scopes=SCOPE)
+
+
+class SheetsClient:
+    def __init__(self, credentials_loader=_load_credentials):
+        self.credentials_loader = credentials_loader
+        self._client = None
+        self._spreadsheets = {}   # ("name", title) | ("key", id) -> Spreadsheet
+        self._worksheets = {}     # (spreadsheet ref, sheet name) -> Worksheet
+        self._lock = threading.RLock()
+
+    def client(self):
+        """The authorized gspread.Client (credentials are only loaded on first use)."""
+        with self._lock:
+            if self._client is None:
+                with timer("sheets_seconds", op="auth", sheet=""):
+                    self._client = gspread.Client(self.credentials_loader(), http_client=QuotaHTTPClient)
+            return self._client
+
+    @staticmethod
+    def _ref(spreadsheet_name=None, key=None):
+        if key:
+            return ("key", key)
+        if spreadsheet_name:
+            return ("name", spreadsheet_name)
+        raise ValueError("[GSheet] ❌ spreadsheet_name or key required")
+
+    def spreadsheet(self, spreadsheet_name=None, key=None):
+        ref = self._ref(spreadsheet_name, key)
+        with self._lock:
+            spreadsheet = self._spreadsheets.get(ref)
+            if spreadsheet is None:
+                inc("sheets_handles_total", result="miss", kind="spreadsheet")
+                with timer("sheets_seconds", op="open", sheet=""):
+                    client = self.client()
+                    spreadsheet = client.open_by_key(key) if key else client.open(spreadsheet_name)
+                self._spreadsheets[ref] = spreadsheet
+            return spreadsheet
+
+    def worksheet(self, sheet_name, spreadsheet_name=None, key=None):
+        """Cached Worksheet handle; a miss loads handles for every tab of the spreadsheet."""
+        ref = self._ref(spreadsheet_name, key)
+        with self._lock:
+            ws = self._worksheets.get((ref, sheet_name))
+            if ws is not None:
+                inc("sheets_handles_total", result="hit", kind="worksheet")
+                return ws
+            inc("sheets_handles_total", result="miss", kind="worksheet")
+            spreadsheet = self.spreadsheet(spreadsheet_name, key)
+            with timer("sheets_seconds", op="worksheets", sheet=sheet_name):
+                tabs = spreadsheet.worksheets()
+            for tab in tabs:
+                self._worksheets[(ref, tab.title)] = tab
+            ws = self._worksheets.get((ref, sheet_name))
+            if ws is None:
+                raise WorksheetNotFound(sheet_name)
+            return ws
+
+    def invalidate(self, sheet_name=None, spreadsheet_name=None, key=None):
+        """Forget handles: one worksheet, one spreadsheet (and its tabs), or everything."""
+        ref = self._ref(spreadsheet_name, key) if (spreadsheet_name or key) else None
+        with self._lock:
+            for k in list(self._worksheets):
+                if (ref is None or k[0] == ref) and (sheet_name is None or k[1] == sheet_name):
+                    del self._worksheets[k]
+            if ref is not None and sheet_name is None:
+                self._spreadsheets.pop(ref, None)
+            elif ref is None and sheet_name is None:
+                self._spreadsheets.clear()
+
+    def call(self, sheet_name, fn, spreadsheet_name=None, key=None):
+        """fn(worksheet), re-resolving the handle once if it no longer exists."""
+        try:
+            return fn(self.worksheet(sheet_name, spreadsheet_name, key))
+        except Exception as e:
+            if not is_not_found(e):
+                raise
+            print(f"[GSheet] ⚠️ {sheet_name} handle is stale ({e}); re-opening")
+            # the spreadsheet itself may have moved too
+            self.invalidate(spreadsheet_name=spreadsheet_name, key=key)
+            return fn(self.worksheet(sheet_name, spreadsheet_name, key))
+
+
+SHEETS = SheetsClient()
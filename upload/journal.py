@@ -0,0 +1,398 @@
+"""
+Local write-behind journal for the bot's sheets (trading_zones, entry_log,
+IC trades).
+
+    write_rows("trading_zones", df)                                  # upsert by Symbol
+    write_rows("IC_Trades", rows, key="Trade ID", append=True)
+    JOURNAL.get("trading_zones", "RELIANCE")                         # indexed local read
+
+SQLite (data/journal.db, WAL) is the source of truth: writes commit locally
+and return, reads are indexed queries. Every changed row also gets an outbox
+entry. A background SheetsMirror thread drains the outbox in batches per
+sheet through upload_to_gsheet(), which upserts on the row's key column.
+Re-sending a row is therefore idempotent. Failed batches stay queued with
+exponential backoff. The outbox survives restarts, so the mirror resumes
+where it stopped.
+
+Sheets that are also edited by hand or by other tools (PULL_INTERVALS) are
+pulled back into the journal periodically, keeping the first row per key;
+rows deleted from the sheet are deleted from the journal. Rows with unsent
+local changes are never overwritten or deleted by a pull.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from upload.gdrive_sync import _cell, read_sheet_records, upload_to_gsheet
+from utils.metrics import inc, timer
+
+JOURNAL_PATH = os.environ.get(
+    "ARC_JOURNAL_DB", os.path.join(os.path.dirname(__file__), '..', 'data', 'journal.db'))
+# column used for indexed lookups (e.g. /signal SYMBOL)
+LOOKUP_COLUMN = "Symbol"
+
+MIRROR_INTERVAL = 5          # seconds between outbox sweeps when not woken
+MIRROR_BATCH = 500           # rows per sheet per write
+MIRROR_BACKOFF_BASE = 10
+MIRROR_BACKOFF_MAX = 600
+# sheets read back from Google Sheets: name -> (key column, seconds between pulls)
+PULL_INTERVALS = {
+    "trading_zones": ("Symbol", 3600),
+    "entry_log": ("Symbol", 60),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rows (
+    sheet       TEXT NOT NULL,
+    row_key     TEXT NOT NULL,
+    key_column  TEXT NOT NULL,
+    lookup      TEXT NOT NULL,
+    data        TEXT NOT NULL,
+    updated_at  REAL NOT NULL,
+    PRIMARY KEY (sheet, row_key)
+);
+CREATE INDEX IF NOT EXISTS rows_lookup ON rows (sheet, lookup);
+CREATE TABLE IF NOT EXISTS outbox (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    sheet       TEXT NOT NULL,
+    row_key     TEXT NOT NULL,
+    created_at  REAL NOT NULL,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    next_try    REAL NOT NULL DEFAULT 0,
+    last_error  TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (next_try, id);
+CREATE TABLE IF NOT EXISTS meta (
+    name        TEXT PRIMARY KEY,
+    value       TEXT
+);
+"""
+
+
+def _json_row(record):
+    return json.dumps({str(k): _cell(v) for k, v in record.items()}, default=str)
+
+
+def _records(rows):
+    if isinstance(rows, pd.DataFrame):
+        return rows.to_dict("records")
+    return list(rows)
+
+
+class Journal:
+    def __init__(self, path=JOURNAL_PATH):
+        self.path = path
+        self._conn = None
+        self._lock = threading.RLock()
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # --- writes ---
+    def _keyed(self, records, key):
+        out = []
+        for record in records:
+            row_key = str(_cell(record.get(key, ""))).strip()
+            if not row_key:
+                raise ValueError(f"[Journal] ❌ '{key}' missing in row: {record}")
+            lookup = str(_cell(record.get(LOOKUP_COLUMN, row_key))).strip().upper()
+            out.append((row_key, lookup, _json_row(record)))
+        return out
+
+    def upsert(self, sheet, rows, key="Symbol"):
+        """Insert or update rows by `key`; only changed rows are queued for Sheets."""
+        keyed = self._keyed(_records(rows), key)
+        now = time.time()
+        stats = {"updated": 0, "appended": 0, "unchanged": 0}
+        with self._lock, self._db() as db:
+            for row_key, lookup, data in keyed:
+                old = db.execute("SELECT data FROM rows WHERE sheet = ? AND row_key = ?",
+                                 (sheet, row_key)).fetchone()
+                if old is not None and old[0] == data:
+                    stats["unchanged"] += 1
+                    continue
+                stats["updated" if old is not None else "appended"] += 1
+                db.execute(
+                    "INSERT INTO rows (sheet, row_key, key_column, lookup, data, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT (sheet, row_key) DO UPDATE SET"
+                    " key_column = excluded.key_column, lookup = excluded.lookup,"
+                    " data = excluded.data, updated_at = excluded.updated_at",
+                    (sheet, row_key, key, lookup, data, now))
+                db.execute("INSERT INTO outbox (sheet, row_key, created_at) VALUES (?, ?, ?)",
+                           (sheet, row_key, now))
+        inc("journal_rows_total", stats["updated"] + stats["appended"], sheet=sheet, op="upsert")
+        return stats
+
+    def append(self, sheet, rows, key):
+        """Insert rows whose `key` is new (repeats are ignored); returns the number added."""
+        keyed = self._keyed(_records(rows), key)
+        now = time.time()
+        added = 0
+        with self._lock, self._db() as db:
+            for row_key, lookup, data in keyed:
+                cur = db.execute(
+                    "INSERT OR IGNORE INTO rows (sheet, row_key, key_column, lookup, data, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)", (sheet, row_key, key, lookup, data, now))
+                if cur.rowcount:
+                    added += 1
+                    db.execute("INSERT INTO outbox (sheet, row_key, created_at) VALUES (?, ?, ?)",
+                               (sheet, row_key, now))
+        inc("journal_rows_total", added, sheet=sheet, op="append")
+        return added
+
+    def import_rows(self, sheet, records, key="Symbol"):
+        """
+        Take rows read from the sheet itself (no outbox), first row per key,
+        and drop journal rows whose key is no longer in the sheet; rows with
+        unsent local changes are left alone. Returns rows changed or removed.
+        """
+        seen, keyed = set(), []
+        for record in records:
+            row_key = str(_cell(record.get(key, ""))).strip()
+            if row_key and row_key not in seen:
+                seen.add(row_key)
+                lookup = str(_cell(record.get(LOOKUP_COLUMN, row_key))).strip().upper()
+                keyed.append((row_key, lookup, _json_row(record)))
+        now = time.time()
+        changed = 0
+        with self._lock, self._db() as db:
+            pending = {r[0] for r in db.execute("SELECT DISTINCT row_key FROM outbox WHERE sheet = ?", (sheet,))}
+            for row_key, lookup, data in keyed:
+                if row_key in pending:
+                    continue
+                cur = db.execute(
+                    "INSERT INTO rows (sheet, row_key, key_column, lookup, data, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT (sheet, row_key) DO UPDATE SET"
+                    " lookup = excluded.lookup, data = excluded.data, updated_at = excluded.updated_at"
+                    " WHERE rows.data != excluded.data",
+                    (sheet, row_key, key, lookup, data, now))
+                changed += cur.rowcount
+            # rows deleted from the sheet by hand
+            stored = {r[0] for r in db.execute(
+                "SELECT row_key FROM rows WHERE sheet = ? AND key_column = ?", (sheet, key))}
+            gone = stored - seen - pending
+            for row_key in gone:
+                db.execute("DELETE FROM rows WHERE sheet = ? AND row_key = ?", (sheet, row_key))
+            changed += len(gone)
+        return changed
+
+    # --- reads ---
+    def get(self, sheet, lookup):
+        """First row (in insertion order) whose LOOKUP_COLUMN equals `lookup` (case-insensitive)."""
+        with self._lock:
+            row = self._db().execute(
+                "SELECT data FROM rows WHERE sheet = ? AND lookup = ? ORDER BY rowid LIMIT 1",
+                (sheet, str(lookup).strip().upper())).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def records(self, sheet):
+        with self._lock:
+            rows = self._db().execute("SELECT data FROM rows WHERE sheet = ? ORDER BY rowid", (sheet,)).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def count(self, sheet):
+        with self._lock:
+            return self._db().execute("SELECT COUNT(*) FROM rows WHERE sheet = ?", (sheet,)).fetchone()[0]
+
+    def backlog(self):
+        """{sheet: rows waiting to be mirrored}."""
+        with self._lock:
+            return dict(self._db().execute(
+                "SELECT sheet, COUNT(DISTINCT row_key) FROM outbox GROUP BY sheet").fetchall())
+
+    def get_meta(self, name, default=None):
+        with self._lock:
+            row = self._db().execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, name, value):
+        with self._lock, self._db() as db:
+            db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, str(value)))
+
+    # --- outbox ---
+    def due(self, limit=MIRROR_BATCH, now=None):
+        """
+        [(sheet, key_column, [(row_key, row)], max outbox id)] ready to send,
+        oldest first, one batch of up to `limit` distinct rows per sheet.
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            db = self._db()
+            sheets = [r[0] for r in db.execute(
+                "SELECT sheet FROM outbox WHERE next_try <= ? GROUP BY sheet ORDER BY MIN(id)", (now,))]
+            batches = []
+            for sheet in sheets:
+                pending = db.execute(
+                    "SELECT o.row_key, MAX(o.id), r.key_column, r.data FROM outbox o"
+                    " JOIN rows r ON r.sheet = o.sheet AND r.row_key = o.row_key"
+                    " WHERE o.sheet = ? AND o.next_try <= ?"
+                    " GROUP BY o.row_key ORDER BY MIN(o.id) LIMIT ?", (sheet, now, limit)).fetchall()
+                if not pending:
+                    continue
+                # one key column per write; other keys go in a later batch
+                key_column = pending[0][2]
+                rows = [(k, json.loads(data)) for k, _, col, data in pending if col == key_column]
+                max_id = max(i for _, i, col, _ in pending if col == key_column)
+                batches.append((sheet, key_column, rows, max_id))
+        return batches
+
+    def done(self, sheet, row_keys, max_id):
+        with self._lock, self._db() as db:
+            db.executemany("DELETE FROM outbox WHERE sheet = ? AND row_key = ? AND id <= ?",
+                           [(sheet, k, max_id) for k in row_keys])
+
+    def failed(self, sheet, row_keys, error):
+        """Back the rows off exponentially; returns the delay applied."""
+        with self._lock, self._db() as db:
+            attempts = db.execute(
+                "SELECT MAX(attempts) FROM outbox WHERE sheet = ? AND row_key IN (%s)" % ",".join("?" * len(row_keys)),
+                (sheet, *row_keys)).fetchone()[0] or 0
+            delay = min(MIRROR_BACKOFF_BASE * 2 ** attempts, MIRROR_BACKOFF_MAX)
+            db.executemany(
+                "UPDATE outbox SET attempts = attempts + 1, next_try = ?, last_error = ?"
+                " WHERE sheet = ? AND row_key = ?",
+                [(time.time() + delay, str(error)[:500], sheet, k) for k in row_keys])
+        return delay
+
+    def retry_now(self):
+        """Make every queued row due (e.g. on startup)."""
+        with self._lock, self._db() as db:
+            db.execute("UPDATE outbox SET next_try = 0")
+
+
+class SheetsMirror:
+    """Background thread copying journal changes to Google Sheets and pulling shared sheets back."""
+
+    def __init__(self, journal, write=upload_to_gsheet, read=read_sheet_records,
+                 interval=MIRROR_INTERVAL, pulls=None):
+        self.journal = journal
+        self.write = write
+        self.read = read
+        self.interval = interval
+        self.pulls = dict(PULL_INTERVALS if pulls is None else pulls)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._run_lock = threading.Lock()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self.journal.retry_now()
+        self._thread = threading.Thread(target=self._loop, name="journal-mirror", daemon=True)
+        self._thread.start()
+        print(f"[Journal] 🔁 Mirroring {self.journal.path} to Sheets (backlog {self.journal.backlog()})")
+
+    def stop(self, flush=True):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+            self._thread = None
+        if flush:
+            self.flush()
+
+    def notify(self):
+        """Wake the mirror now (after a write)."""
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.pull_due()
+                self.flush()
+            except Exception as e:
+                print(f"[Journal] ⚠️ Mirror pass failed: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def flush(self):
+        """Send every due outbox batch now; returns rows mirrored."""
+        sent = 0
+        with self._run_lock:
+            while True:
+                batches = self.journal.due()
+                if not batches:
+                    return sent
+                for sheet, key_column, rows, max_id in batches:
+                    keys = [k for k, _ in rows]
+                    try:
+                        with timer("journal_mirror_seconds", sheet=sheet):
+                            self.write(pd.DataFrame([row for _, row in rows]), sheet_name=sheet, key=key_column)
+                    except Exception as e:
+                        delay = self.journal.failed(sheet, keys, e)
+                        inc("journal_mirror_failures_total", sheet=sheet)
+                        print(f"[Journal] ⚠️ Mirror of {len(keys)} {sheet} row(s) failed: {e}; retry in {delay:.0f}s")
+                        continue
+                    self.journal.done(sheet, keys, max_id)
+                    inc("journal_mirrored_total", len(keys), sheet=sheet)
+                    sent += len(keys)
+
+    def pull(self, sheet):
+        key, _ = self.pulls.get(sheet, (LOOKUP_COLUMN, 0))
+        # under the flush lock: a snapshot read while a flush is in flight would
+        # miss the rows it is sending and delete them once they are marked done
+        with self._run_lock:
+            records = self.read(sheet)
+            changed = self.journal.import_rows(sheet, records, key=key)
+            self.journal.set_meta(f"pulled:{sheet}", time.time())
+        if changed:
+            print(f"[Journal] ⬇️ Pulled {changed} changed row(s) of {sheet}")
+        return changed
+
+    def pull_due(self):
+        now = time.time()
+        for sheet, (_, every) in self.pulls.items():
+            last = float(self.journal.get_meta(f"pulled:{sheet}", 0))
+            if now - last >= every:
+                try:
+                    self.pull(sheet)
+                except Exception as e:
+                    print(f"[Journal] ⚠️ Pull of {sheet} failed: {e}")
+
+    def ensure_pulled(self, *sheets):
+        """Pull sheets that were never read into this journal (first run)."""
+        for sheet in sheets:
+            if self.journal.get_meta(f"pulled:{sheet}") is None:
+                self.pull(sheet)
+
+
+JOURNAL = Journal()
+MIRROR = SheetsMirror(JOURNAL)
+
+
+def write_rows(sheet_name, rows, key="Symbol", append=False):
+    """Journal rows (DataFrame or dicts) and wake the mirror; upsert by `key`, or append new keys only."""
+    if not len(rows):
+        raise ValueError(f"[Journal] ❌ No rows for {sheet_name}")
+    if append:
+        n = JOURNAL.append(sheet_name, rows, key)
+        print(f"[Journal] ✅ Logged {n} row(s) to {sheet_name}")
+        result = n
+    else:
+        result = JOURNAL.upsert(sheet_name, rows, key=key)
+        print(f"[Journal] ✅ {sheet_name}: {result['updated']} changed, {result['appended']} new, "
+              f"{result['unchanged']} unchanged")
+    MIRROR.notify()
+    return result
@@ -1,18 +1,246 @@
 # utils/alerts.py
+"""
+Outbound Telegram alerts.
+
+    await send_telegram_alert("🟢 ...")     # queued, returns at once
+    await DISPATCHER.flush()                # wait until the queue is delivered
+
+A single AlertDispatcher per process sends everything through one Bot. That
+is the running application's bot (commands/telegram_bot.py attaches app.bot,
+so alerts share its connection pool), or one Bot per event loop created on
+first use. A worker task drains an asyncio queue. Messages for the same chat
+that arrive within COALESCE_SECONDS are joined into one, up to Telegram's
+4096-character limit, e.g. the IC scan summary plus its candidate list. Each
+send waits on two token buckets, one per chat and one global. On a 429
+(RetryAfter) the worker waits as long as Telegram asks. Timeouts and 5xx
+errors (NetworkError) are retried with exponential backoff. Any other error
+is logged and the message is dropped.
+
+Scripts that call asyncio.run() must `await DISPATCHER.flush()` before their
+loop ends. Pass a FakeTransport (utils/fake_telegram.py) to attach() to run
+offline.
+"""
+
+import asyncio
 
 from telegram import Bot
+from telegram.error import BadRequest, ChatMigrated, NetworkError, RetryAfter
+
 from config.config_loader import CONFIG
+from utils.metrics import inc, timer
+from utils.rate_limit import TokenBucket
+
+MAX_MESSAGE_CHARS = 4096
+COALESCE_SECONDS = 0.5
+# Telegram: ~30 messages/s overall, ~1/s per chat, 20/min per group
+GLOBAL_RATE, GLOBAL_BURST = 30.0, 30
+CHAT_RATE, CHAT_BURST = 1.0, 3
+GROUP_RATE, GROUP_BURST = 20 / 60, 3
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+
+class Alert:
+    __slots__ = ("chat_id", "text", "parse_mode", "future")
+
+    def __init__(self, chat_id, text, parse_mode, future):
+        self.chat_id = chat_id
+        self.text = text
+        self.parse_mode = parse_mode
+        self.future = future
+
+
+def retry_delay(error, attempt):
+    """Seconds to wait before retrying after `error`, or None if it should not be retried."""
+    if isinstance(error, RetryAfter):
+        retry_after = error.retry_after
+        return retry_after.total_seconds() if hasattr(retry_after, "total_seconds") else float(retry_after)
+    if isinstance(error, BadRequest):
+        return None
+    if isinstance(error, NetworkError):          # includes TimedOut and 5xx responses
+        return min(BACKOFF_BASE * 2 ** attempt, BACKOFF_MAX)
+    return None
+
+
+def split_text(text, limit=MAX_MESSAGE_CHARS):
+    """Chunks of at most `limit` characters, cut at line breaks where possible."""
+    chunks = []
+    while len(text) > limit:
+        cut = text.rfind("\n", 0, limit)
+        cut = cut if cut > 0 else limit
+        chunks.append(text[:cut])
+        text = text[cut:].lstrip("\n")
+    chunks.append(text)
+    return chunks
 
-async def send_telegram_alert(message: str):
-    try:
-        token = CONFIG.get("TELEGRAM_TOKEN")
-        chat_id = CONFIG.get("TELEGRAM_CHAT_ID")
 
-        if not token or not chat_id:
-            raise ValueError("Missing token or TELEGRAM_CHAT_ID")
+def coalesce(alerts, limit=MAX_MESSAGE_CHARS):
+    """
+    [(chat_id, text, parse_mode, [alerts])] with consecutive alerts of the
+    same chat and parse mode joined by blank lines, keeping each message
+    within `limit` characters.
+    """
+    out = []
+    for alert in alerts:
+        for chunk in split_text(alert.text, limit):
+            last = out[-1] if out else None
+            if (last and last[0] == alert.chat_id and last[2] == alert.parse_mode
+                    and len(last[1]) + 2 + len(chunk) <= limit):
+                last[1] += "\n\n" + chunk
+                if alert not in last[3]:
+                    last[3].append(alert)
+            else:
+                out.append([alert.chat_id, chunk, alert.parse_mode, [alert]])
+    return [tuple(m) for m in out]
 
-        bot = Bot(token=token)
-        await bot.send_message(chat_id=chat_id, text=message)
 
+class AlertDispatcher:
+    def __init__(self, coalesce_seconds=COALESCE_SECONDS, max_retries=MAX_RETRIES):
+        self.coalesce_seconds = coalesce_seconds
+        self.max_retries = max_retries
+        self.global_bucket = TokenBucket(GLOBAL_RATE, GLOBAL_BURST)
+        self.chat_buckets = {}
+        self.migrated = {}             # old chat id -> supergroup id (ChatMigrated)
+        self.transport = None          # attached Bot / FakeTransport
+        self._transport_loop = None    # loop the attached bot belongs to (None: any)
+        self._loop = None
+        self._queue = None
+        self._worker = None
+        self._own_bot = None
+
+    # --- wiring ---
+    def attach(self, transport, loop=None):
+        """Send through `transport` (anything with Bot.send_message); a Bot only on `loop`."""
+        self.transport = transport
+        self._transport_loop = loop
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            if self._loop is not loop:
+                self._queue = asyncio.Queue()
+                self._own_bot = None
+                self._loop = loop
+            self._worker = loop.create_task(self._run())
+        return self._queue
+
+    async def _bot(self):
+        if self.transport is not None and self._transport_loop in (None, self._loop):
+            return self.transport
+        if self._own_bot is None:
+            token = CONFIG.get("TELEGRAM_TOKEN")
+            if not token:
+                raise ValueError("Missing TELEGRAM_TOKEN")
+            bot = Bot(token=token)
+            await bot.initialize()
+            self._own_bot = bot
+        return self._own_bot
+
+    def _bucket(self, chat_id):
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            group = str(chat_id).startswith("-")
+            bucket = self.chat_buckets[chat_id] = (
+                TokenBucket(GROUP_RATE, GROUP_BURST) if group else TokenBucket(CHAT_RATE, CHAT_BURST))
+        return bucket
+
+    # --- public ---
+    async def send(self, text, chat_id=None, parse_mode=None, wait=False):
+        """Queue a message; with wait=True return whether it was delivered."""
+        chat_id = chat_id or CONFIG.get("TELEGRAM_CHAT_ID")
+        if not chat_id:
+            raise ValueError("Missing TELEGRAM_CHAT_ID")
+        chat_id = self.migrated.get(chat_id, chat_id)
+        queue = self._ensure_worker()
+        future = self._loop.create_future()
+        await queue.put(Alert(chat_id, str(text), parse_mode, future))
+        inc("alerts_total", result="queued")
+        return await future if wait else True
+
+    async def flush(self):
+        """Wait until everything queued on this loop was sent (or given up)."""
+        if self._queue is not None and self._loop is asyncio.get_running_loop():
+            await self._queue.join()
+
+    async def close(self):
+        await self.flush()
+        if self._worker is not None and self._loop is asyncio.get_running_loop():
+            self._worker.cancel()
+        self._worker = None
+        if self._own_bot is not None:
+            bot, self._own_bot = self._own_bot, None
+            await bot.shutdown()
+
+    # --- worker ---
+    async def _run(self):
+        queue = self._queue
+        while True:
+            batch = [await queue.get()]
+            try:
+                if self.coalesce_seconds:
+                    await asyncio.sleep(self.coalesce_seconds)      # let the rest of a burst arrive
+                while not queue.empty():
+                    batch.append(queue.get_nowait())
+                messages = coalesce(batch)
+                if len(messages) < len(batch):
+                    inc("alerts_coalesced_total", len(batch) - len(messages))
+                delivered = {}       # an alert split over messages is delivered if every part was
+                for chat_id, text, parse_mode, alerts in messages:
+                    ok = await self._deliver(chat_id, text, parse_mode)
+                    for alert in alerts:
+                        delivered[id(alert)] = delivered.get(id(alert), True) and ok
+                for alert in batch:
+                    if not alert.future.done():
+                        alert.future.set_result(delivered.get(id(alert), False))
+            except asyncio.CancelledError:
+                for alert in batch:
+                    if not alert.future.done():
+                        alert.future.cancel()
+                raise
+            except Exception as e:
+                # keep the worker alive; nobody waits forever on a lost batch
+                print(f"[Alert] ❌ Alert batch dropped: {e}")
+                for alert in batch:
+                    if not alert.future.done():
+                        alert.future.set_result(False)
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    async def _deliver(self, chat_id, text, parse_mode):
+        for attempt in range(self.max_retries + 1):
+            await self._bucket(chat_id).acquire()
+            await self.global_bucket.acquire()
+            try:
+                bot = await self._bot()
+                with timer("telegram_send_seconds"):
+                    await bot.send_message(chat_id=chat_id, text=text, parse_mode=parse_mode)
+                inc("alerts_total", result="sent")
+                return True
+            except Exception as e:
+                if isinstance(e, ChatMigrated):
+                    self.migrated[chat_id] = e.new_chat_id
+                    chat_id, delay = e.new_chat_id, 0.0
+                else:
+                    delay = retry_delay(e, attempt)
+                if delay is None or attempt == self.max_retries:
+                    inc("alerts_total", result="failed")
+                    print(f"[Alert] ❌ Failed to send Telegram alert: {e}")
+                    return False
+                inc("alert_retries_total", error=type(e).__name__)
+                print(f"[Alert] ⚠️ {e}; retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+        return False
+
+
+DISPATCHER = AlertDispatcher()
+
+
+async def send_telegram_alert(message: str, chat_id=None, parse_mode=None, wait=False):
+    """Queue `message` for TELEGRAM_CHAT_ID (or chat_id); never raises."""
+    try:
+        return await DISPATCHER.send(message, chat_id=chat_id, parse_mode=parse_mode, wait=wait)
     except Exception as e:
         print(f"[Alert] ❌ Failed to send Telegram alert: {e}")
+        return False
@@ -0,0 +1,35 @@
+"""
+In-memory stand-in for telegram.Bot as an alert transport.
+
+It records what would have been sent and can replay scripted failures, so
+utils/alerts.py (coalescing, rate limits, retries) runs without a token or
+network:
+
+    fake = FakeTransport(failures=[RetryAfter(1), None])
+    DISPATCHER.attach(fake)
+    await send_telegram_alert("hello"); await DISPATCHER.flush()
+    fake.sent, fake.calls["send_message"]
+"""
+
+import time
+from collections import Counter
+
+
+class FakeTransport:
+    def __init__(self, failures=()):
+        self.sent = []                   # delivered messages, in order
+        self.failures = list(failures)   # raised by the next calls in turn (None = succeed)
+        self.calls = Counter()
+
+    async def send_message(self, chat_id, text, parse_mode=None, **kwargs):
+        self.calls["send_message"] += 1
+        if self.failures:
+            error = self.failures.pop(0)
+            if error is not None:
+                raise error
+        message = {"chat_id": chat_id, "text": text, "parse_mode": parse_mode, "at": time.monotonic()}
+        self.sent.append(message)
+        return message
+
+    def texts(self):
+        return [m["text"] for m in self.sent]
@@ -1,24 +1,16 @@
 import pandas as pd
 import yfinance as yf
 from tqdm import tqdm
-import os, time
+import os, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from utils.ohlc_store import OHLCStore, normalize_ohlc
 
 # Paths
 nifty_csv = os.path.join(os.path.dirname(__file__), '../data/nifty50_membership.csv')
-output_csv = os.path.join(os.path.dirname(__file__), '../data/ohlc.csv')
+store_root = os.path.join(os.path.dirname(__file__), '../data/ohlc_store')
 failed_csv = os.path.join(os.path.dirname(__file__), '../data/failed_symbols.csv')
 
-# Load Nifty membership
-df_nifty = pd.read_csv(nifty_csv)
-df_nifty.columns = df_nifty.columns.str.strip().str.lower()
-
-df_nifty['from_date'] = pd.to_datetime(df_nifty['from_date'], errors='coerce')
-df_nifty['to_date']   = pd.to_datetime(df_nifty['to_date'], errors='coerce')
-df_nifty['to_date']   = df_nifty['to_date'].fillna(pd.Timestamp.today())
-
-# ✅ Limit to 5 symbols for testing
-#df_nifty = df_nifty.head(5)
-
 # Mapping for Yahoo Finance quirks
 SYMBOL_MAP = {
     "M&M": "M&M",
@@ -27,14 +19,25 @@ SYMBOL_MAP = {
     "SBILIFE": "SBILIFE"
 }
 
-# Final schema
-FINAL_COLS = ['date', 'symbol', 'open', 'high', 'low', 'close', 'volume']
 
-all_ohlc = []
-failed_symbols = []
+def load_membership():
+    df_nifty = pd.read_csv(nifty_csv)
+    df_nifty.columns = df_nifty.columns.str.strip().str.lower()
 
-# ✅ Safe download with retries
+    df_nifty['from_date'] = pd.to_datetime(df_nifty['from_date'], errors='coerce')
+    df_nifty['to_date']   = pd.to_datetime(df_nifty['to_date'], errors='coerce')
+    df_nifty['to_date']   = df_nifty['to_date'].fillna(pd.Timestamp.today().normalize())
+    df_nifty['symbol']    = df_nifty['symbol'].astype(str).str.strip()
+    return df_nifty.dropna(subset=['from_date'])
+
+
+# ✅ Safe download with retries (backs off only when a call raises)
 def safe_download(symbol, start, end, retries=3, delay=5):
+    """
+    Bars for symbol in [start, end). An empty range (weekend, holiday, bar
+    not yet published) returns an empty frame at once; None only when every
+    attempt raised.
+    """
     for attempt in range(retries):
         try:
             df = yf.download(
@@ -44,35 +47,16 @@ def safe_download(symbol, start, end, retries=3, delay=5):
                 progress=False,
                 auto_adjust=False
             )
-            if isinstance(df, pd.DataFrame) and not df.empty:
-                return df
+            return df if isinstance(df, pd.DataFrame) else pd.DataFrame()
         except Exception as e:
             print(f"⚠️ Error fetching {symbol}, attempt {attempt+1}/{retries}: {e}")
-        time.sleep(delay)
+            if attempt + 1 < retries:
+                time.sleep(delay * 2 ** attempt)
     return None
 
-print("Fetching OHLC data for test symbols...")
-for _, row in tqdm(df_nifty.iterrows(), total=len(df_nifty)):
-    raw_symbol = str(row['symbol']).strip()
-
-    if isinstance(raw_symbol, tuple):
-        raw_symbol = raw_symbol[0]
-
-    yahoo_symbol = SYMBOL_MAP.get(raw_symbol, raw_symbol) + ".NS"
 
-    start_date = row['from_date']
-    end_date   = row['to_date'] + pd.Timedelta(days=1)  # inclusive
-
-    ohlc = safe_download(yahoo_symbol, start_date, end_date)
-
-    if ohlc is None or ohlc.empty:
-        print(f"❌ Failed after retries for {yahoo_symbol}")
-        failed_symbols.append(raw_symbol)
-        continue
-
-    # Reset index
-    ohlc.reset_index(inplace=True)
-    ohlc['symbol'] = raw_symbol
+def to_ohlc_frame(ohlc, raw_symbol):
+    ohlc = ohlc.reset_index()
 
     # ✅ flatten multi-index columns
     if isinstance(ohlc.columns, pd.MultiIndex):
@@ -80,40 +64,57 @@ for _, row in tqdm(df_nifty.iterrows(), total=len(df_nifty)):
     else:
         ohlc.columns = [str(c).lower() for c in ohlc.columns]
 
-    print(f"Columns for {raw_symbol}: {ohlc.columns.tolist()}")
-
-    expected = ['date', 'open', 'high', 'low', 'close', 'volume', 'symbol']
-    missing = [c for c in expected if c not in ohlc.columns]
+    missing = [c for c in ['date', 'open', 'high', 'low', 'close'] if c not in ohlc.columns]
     if missing:
         print(f"⚠️ Missing columns for {raw_symbol}: {missing}")
-        failed_symbols.append(raw_symbol)
-        continue
-
-    ohlc = ohlc[expected].copy()
+        return None
 
+    ohlc['symbol'] = raw_symbol
     # Drop rows with missing values in key columns
-    ohlc = ohlc.dropna(subset=['date','open','high','low','close'])
-
-    # Debug: print first 2 rows per symbol
-    print(f"\nSample for {raw_symbol}:")
-    print(ohlc.head(2))
-
-    all_ohlc.append(ohlc)
-
-    time.sleep(0.5)  # avoid rate limiting
-
-# Combine and save
-if all_ohlc:
-    final_df = pd.concat(all_ohlc, axis=0, ignore_index=True)  # vertical stacking
-    final_df = final_df[FINAL_COLS]  # enforce column order again
-    final_df.to_csv(output_csv, index=False)
-    print(f"\n✅ OHLC data saved to {output_csv}")
-    print(final_df.head(10))  # show preview
-else:
-    print("🚨 No OHLC data fetched!")
-
-# Report failed
-if failed_symbols:
-    print("⚠️ Failed symbols:", failed_symbols)
-    pd.Series(failed_symbols, name="failed_symbols").to_csv(failed_csv, index=False)
-    print(f"📄 Failed symbols list saved to {failed_csv}")
+    return normalize_ohlc(ohlc).dropna(subset=['date', 'open', 'high', 'low', 'close'])
+
+
+def update_store(store=None, df_nifty=None):
+    """
+    Bring the local store up to date with the membership file, fetching only
+    the date ranges each symbol is still missing.
+    """
+    store = store or OHLCStore(store_root)
+    df_nifty = load_membership() if df_nifty is None else df_nifty
+
+    # one wanted window per symbol: earliest from_date .. latest to_date
+    wanted = df_nifty.groupby('symbol', sort=False).agg(start=('from_date', 'min'), end=('to_date', 'max'))
+
+    failed_symbols = []
+    print("Updating local OHLC store...")
+    for raw_symbol, row in tqdm(wanted.iterrows(), total=len(wanted)):
+        yahoo_symbol = SYMBOL_MAP.get(raw_symbol, raw_symbol) + ".NS"
+
+        for start_date, end_date in store.missing_ranges(raw_symbol, row['start'], row['end']):
+            ohlc = safe_download(yahoo_symbol, start_date, end_date + pd.Timedelta(days=1))  # inclusive
+            if ohlc is None or ohlc.empty:
+                if ohlc is None or store.last_date(raw_symbol) is None:
+                    print(f"❌ No data for {yahoo_symbol} {start_date.date()}..{end_date.date()}")
+                if store.last_date(raw_symbol) is None:
+                    failed_symbols.append(raw_symbol)
+                continue
+
+            frame = to_ohlc_frame(ohlc, raw_symbol)
+            if frame is None or frame.empty:
+                failed_symbols.append(raw_symbol)
+                continue
+            store.write_symbol(raw_symbol, frame)
+
+    print(f"\n✅ OHLC store up to date at {store.root} (version {store.data_version})")
+
+    # Report failed
+    if failed_symbols:
+        failed_symbols = list(dict.fromkeys(failed_symbols))
+        print("⚠️ Failed symbols:", failed_symbols)
+        pd.Series(failed_symbols, name="failed_symbols").to_csv(failed_csv, index=False)
+        print(f"📄 Failed symbols list saved to {failed_csv}")
+    return failed_symbols
+
+
+if __name__ == "__main__":
+    update_store()
@@ -0,0 +1,230 @@
+# utils/metrics.py
+"""
+In-process metrics and an opt-in profiler.
+
+    with timer("sheets_seconds", op="read", sheet="entry_log"):
+        ...
+    inc("yfinance_failures_total", op="history")
+
+Timers keep count / sum / max and cumulative histogram buckets per
+(name, labels); counters are plain totals. METRICS.prometheus() renders the
+Prometheus text format and METRICS.snapshot() a JSON-friendly dict (both
+served on /metrics by main.py). Every timer also records failures: the
+exception type goes into an `{name}_errors_total` counter.
+
+PROFILER.arm("refresh_zone") makes the next run of that command execute
+under cProfile; the stats are dumped to data/profiles/<command>-<time>.prof
+with a cumulative-time text summary next to it.
+"""
+
+import contextlib
+import cProfile
+import datetime
+import functools
+import inspect
+import io
+import os
+import pstats
+import threading
+import time
+
+BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PROFILE_DIR = os.path.join(os.path.dirname(__file__), '..', 'data', 'profiles')
+PROFILE_TOP = 40
+
+
+def _labels_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _fmt_labels(key, extra=()):
+    items = list(key) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+
+class _Timing:
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(BUCKETS)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}       # name -> {labels key: value}
+        self._timings = {}        # name -> {labels key: _Timing}
+        self.started = time.time()
+
+    # --- recording ---
+    def inc(self, name, value=1, **labels):
+        key = _labels_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = _labels_key(labels)
+        with self._lock:
+            series = self._timings.setdefault(name, {})
+            timing = series.get(key)
+            if timing is None:
+                timing = series[key] = _Timing()
+            timing.add(seconds)
+
+    @contextlib.contextmanager
+    def timer(self, name, **labels):
+        """Time the block; failures also count in `{name}_errors_total`."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            self.inc(f"{name}_errors_total", error=type(e).__name__, **labels)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    def timed(self, name, **labels):
+        """Decorator form of timer(), for plain and async functions."""
+        def decorate(fn):
+            if inspect.iscoroutinefunction(fn):
+                @functools.wraps(fn)
+                async def async_wrapper(*args, **kwargs):
+                    with self.timer(name, **labels):
+                        return await fn(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._timings.clear()
+
+    # --- export ---
+    def snapshot(self):
+        """{'uptime_seconds', 'counters': {name: [...]}, 'timers': {name: [...]}}."""
+        with self._lock:
+            counters = {name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                        for name, series in self._counters.items()}
+            timers = {name: [{"labels": dict(key), "count": t.count, "sum": round(t.total, 6),
+                              "max": round(t.max, 6), "mean": round(t.total / t.count, 6) if t.count else 0.0}
+                             for key, t in series.items()]
+                      for name, series in self._timings.items()}
+        return {"uptime_seconds": round(time.time() - self.started, 1), "counters": counters, "timers": timers}
+
+    def prometheus(self, prefix="arc_"):
+        """Prometheus text exposition format (counters and histograms)."""
+        lines = [f"# TYPE {prefix}uptime_seconds gauge",
+                 f"{prefix}uptime_seconds {time.time() - self.started:.1f}"]
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {prefix}{name} counter")
+                for key, value in series.items():
+                    lines.append(f"{prefix}{name}{_fmt_labels(key)} {value}")
+            for name, series in sorted(self._timings.items()):
+                lines.append(f"# TYPE {prefix}{name} histogram")
+                for key, t in series.items():
+                    for bound, n in zip(BUCKETS, t.buckets):
+                        lines.append(f"{prefix}{name}_bucket{_fmt_labels(key, [('le', bound)])} {n}")
+                    lines.append(f"{prefix}{name}_bucket{_fmt_labels(key, [('le', '+Inf')])} {t.count}")
+                    lines.append(f"{prefix}{name}_sum{_fmt_labels(key)} {t.total:.6f}")
+                    lines.append(f"{prefix}{name}_count{_fmt_labels(key)} {t.count}")
+        return "\n".join(lines) + "\n"
+
+
+@contextlib.contextmanager
+def profiling(command, out_dir=PROFILE_DIR):
+    """Run the block under cProfile (calling thread only) and dump the stats."""
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        yield
+    finally:
+        prof.disable()
+        _dump_profile(command, prof, out_dir)
+
+
+def profile_call(command, fn, *args, **kwargs):
+    """fn(*args, **kwargs) under profiling(); picklable, so it can run in a worker process."""
+    with profiling(command):
+        return fn(*args, **kwargs)
+
+
+def _dump_profile(command, prof, out_dir):
+    try:
+        os.makedirs(out_dir, exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        base = os.path.join(out_dir, f"{command}-{stamp}")
+        prof.dump_stats(base + ".prof")
+        text = io.StringIO()
+        pstats.Stats(prof, stream=text).sort_stats("cumulative").print_stats(PROFILE_TOP)
+        with open(base + ".txt", "w") as f:
+            f.write(text.getvalue())
+        print(f"[Metrics] 🔬 Profile of {command} -> {base}.prof")
+    except OSError as e:
+        print(f"[Metrics] ⚠️ Could not write profile for {command}: {e}")
+
+
+class Profiler:
+    """Commands armed for a one-shot profile (see /profile in the bot)."""
+
+    def __init__(self):
+        self._armed = set()
+        self._lock = threading.Lock()
+
+    def arm(self, command):
+        with self._lock:
+            self._armed.add(command)
+
+    def armed(self):
+        with self._lock:
+            return sorted(self._armed)
+
+    def take(self, command):
+        """True (once) if `command` is armed."""
+        with self._lock:
+            if command in self._armed:
+                self._armed.discard(command)
+                return True
+            return False
+
+    @contextlib.contextmanager
+    def profile(self, command):
+        """Profile the block if `command` is armed."""
+        if not self.take(command):
+            yield
+            return
+        with profiling(command):
+            yield
+
+
+METRICS = Metrics()
+PROFILER = Profiler()
+
+inc = METRICS.inc
+observe = METRICS.observe
+timer = METRICS.timer
+timed = METRICS.timed
@@ -3,8 +3,24 @@ Utility class to manage Nifty50 membership based on a CSV file.
 CSV MUST have columns: symbol, from_date, to_date
 """
 
+import numpy as np
 import pandas as pd
 
+ONE_DAY = np.int64(86_400 * 10**9)
+
+
+def _to_ns(dates):
+    """Dates (scalar or array-like) as int64 nanoseconds since epoch."""
+    if np.isscalar(dates) or isinstance(dates, (pd.Timestamp, np.datetime64)):
+        return np.int64(pd.Timestamp(dates).as_unit('ns').value)
+    arr = pd.to_datetime(np.asarray(dates).ravel())
+    return np.asarray(arr, dtype='datetime64[ns]').astype(np.int64).reshape(np.shape(dates))
+
+
+def _norm(symbol):
+    return str(symbol).upper().strip()
+
+
 class NiftyManager:
     def __init__(self, csv_path):
         """
@@ -27,34 +43,139 @@ class NiftyManager:
         df['to_date'] = df['to_date'].fillna(pd.Timestamp("2100-01-01"))
 
         self.df = df
+        self._build_index()
+
+    def _build_index(self):
+        """
+        Per-symbol interval arrays sorted by start date, a sorted table of
+        membership flips, and a segment table of the full constituent list
+        between consecutive membership boundaries.
+        """
+        df = self.df[self.df['from_date'].notna()]
+        syms = df['symbol'].map(_norm).to_numpy()
+        starts = _to_ns(df['from_date'])
+        ends = _to_ns(df['to_date'])
+
+        # sym -> (sorted starts, running max of ends); a date is inside some
+        # interval iff the latest-ending interval that started on/before it
+        # has not ended yet, so overlapping rows need no merging.
+        self._intervals = {}
+        for sym in pd.unique(syms):
+            m = syms == sym
+            order = np.argsort(starts[m], kind='stable')
+            self._intervals[sym] = (starts[m][order], np.maximum.accumulate(ends[m][order]))
+
+        # every daily membership change, sorted by (date, symbol): joins on a
+        # from_date, removals on the day after a to_date; adjacent or
+        # overlapping rows of one symbol cancel out
+        flips = []
+        for sym in self._intervals:
+            m = syms == sym
+            cand = np.unique(np.concatenate([starts[m], ends[m] + ONE_DAY]))
+            after = self._lookup(sym, cand)
+            changed = self._lookup(sym, cand - ONE_DAY) != after
+            flips.extend(zip(cand[changed], [sym] * int(changed.sum()), after[changed]))
+        flips.sort(key=lambda f: (f[0], f[1]))
+        self._flip_times = np.array([f[0] for f in flips], dtype=np.int64)
+        self._flips = [(pd.Timestamp(t), sym, bool(a)) for t, sym, a in flips]
+
+        # boundaries[k] .. boundaries[k+1] share one constituent list (df order)
+        self._boundaries = np.unique(np.concatenate([starts, ends + 1]))
+        active = (starts[None, :] <= self._boundaries[:, None]) & (ends[None, :] >= self._boundaries[:, None])
+        self._segments = [tuple(pd.unique(syms[row])) for row in active]
+
+        # optional (date x symbol) bitmap over a trading calendar, see build_bitmap
+        self._bitmap = None
+        self._bitmap_rows = {}
+        self._bitmap_cols = {}
+
+    def _lookup(self, sym, ts):
+        iv = self._intervals.get(sym)
+        if iv is None:
+            return np.zeros(np.shape(ts), dtype=bool)
+        starts, ends = iv
+        k = np.searchsorted(starts, ts, side='right') - 1
+        return (k >= 0) & (ends[np.maximum(k, 0)] >= ts)
 
     def is_active(self, symbol, date):
         """
         True if symbol was part of Nifty50 on that date.
         """
-        symbol = symbol.upper().strip()
-        dt = pd.to_datetime(date)
-        rows = self.df[self.df['symbol'].str.upper() == symbol]
+        symbol = _norm(symbol)
+        ts = _to_ns(date)
+
+        if self._bitmap is not None:
+            i = self._bitmap_rows.get(int(ts))
+            j = self._bitmap_cols.get(symbol)
+            if i is not None and j is not None:
+                return bool(self._bitmap[i, j])
 
-        for _, row in rows.iterrows():
-            frm = row['from_date']
-            to  = row['to_date']
-            if frm <= dt <= to:
-                return True
-        return False
+        return bool(self._lookup(symbol, ts))
 
     # alias for backward compatibility
     def is_member(self, symbol, date):
         return self.is_active(symbol, date)
 
+    def is_member_many(self, symbols, dates):
+        """
+        Vectorized is_member over aligned (broadcastable) arrays of symbols and
+        dates. Returns a bool array of the broadcast shape.
+        """
+        syms = np.asarray(symbols, dtype=object)
+        ts = np.asarray(_to_ns(dates))
+        syms, ts = np.broadcast_arrays(syms, ts)
+        out = np.zeros(syms.shape, dtype=bool)
+        if not out.size:
+            return out
+
+        flat_ts = ts.ravel()
+        codes, uniq = pd.factorize(pd.Series(syms.ravel()).map(_norm))
+        flat = out.ravel()
+        for c, sym in enumerate(uniq):
+            idx = np.flatnonzero(codes == c)
+            flat[idx] = self._lookup(sym, flat_ts[idx])
+        return flat.reshape(out.shape)
+
+    def membership_bitmap(self, dates, symbols):
+        """(len(dates) x len(symbols)) bool membership matrix."""
+        ts = np.asarray(_to_ns(dates)).ravel()
+        out = np.zeros((len(ts), len(symbols)), dtype=bool)
+        for j, sym in enumerate(symbols):
+            out[:, j] = self._lookup(_norm(sym), ts)
+        return out
+
+    def build_bitmap(self, calendar, symbols=None):
+        """
+        Precompute membership for every (calendar date, symbol) so is_member on
+        those dates becomes two dict lookups. Returns the bitmap.
+        """
+        if symbols is None:
+            symbols = list(self._intervals)
+        ts = np.asarray(_to_ns(calendar)).ravel()
+        self._bitmap = self.membership_bitmap(ts, symbols)
+        self._bitmap_rows = {int(t): i for i, t in enumerate(ts)}
+        self._bitmap_cols = {_norm(s): j for j, s in enumerate(symbols)}
+        return self._bitmap
+
     def get_active_symbols(self, on_date):
         """
         Returns list of all Nifty50 constituents on a given date.
         """
-        dt = pd.to_datetime(on_date)
-        mask = (self.df['from_date'] <= dt) & (self.df['to_date'] >= dt)
-        return self.df.loc[mask,'symbol'].str.upper().unique().tolist()
+        k = int(np.searchsorted(self._boundaries, _to_ns(on_date), side='right')) - 1
+        if k < 0:
+            return []
+        return list(self._segments[k])
 
     # alias for backward compatibility with exit_signals.py
     def get_symbols_on_date(self, on_date):
         return self.get_active_symbols(on_date)
+
+    def membership_flips(self, d1, d2):
+        """
+        Membership changes in the window (d1, d2], at daily granularity.
+        Returns [(date, symbol, is_member_after)] sorted by date, then symbol;
+        a removal is dated on the first day the symbol is no longer a member.
+        """
+        lo = np.searchsorted(self._flip_times, _to_ns(d1), side='right')
+        hi = np.searchsorted(self._flip_times, _to_ns(d2), side='right')
+        return self._flips[lo:hi]
@@ -0,0 +1,268 @@
+"""
+Partitioned local OHLC store replacing the monolithic data/ohlc.csv.
+
+Layout (one directory per symbol, one memory-mappable .npy file per column):
+    data/ohlc_store/
+        manifest.json          symbols -> {rows, first_date, last_date}, data_version,
+                               sources -> {size, mtime} of imported CSVs
+        LUPIN/date.npy         int64 nanoseconds, sorted ascending, unique
+        LUPIN/open.npy ...     float64, aligned with date.npy
+
+Loaders memory-map only the requested symbols and slice the requested date
+window, so a run never parses or materializes history it does not use.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_ROOT = os.path.join(os.path.dirname(__file__), '../data/ohlc_store')
+COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+FRAME_COLUMNS = ['symbol', 'date'] + COLUMNS
+ONE_DAY = pd.Timedelta(days=1)
+
+
+def _frame(parts):
+    """Long frame (FRAME_COLUMNS) of [(symbol, column arrays)], symbols in the given order."""
+    if not parts:
+        return pd.DataFrame(columns=FRAME_COLUMNS)
+    lengths = [len(cols['date']) for _, cols in parts]
+    data = {'symbol': np.repeat(np.array([s for s, _ in parts], dtype=object), lengths),
+            'date': np.concatenate([cols['date'] for _, cols in parts]).astype('datetime64[ns]')}
+    data.update({col: np.concatenate([cols[col] for _, cols in parts]) for col in COLUMNS})
+    return pd.DataFrame(data, columns=FRAME_COLUMNS)
+
+
+def parse_dates(values, dayfirst=True):
+    """
+    Datetimes of a CSV date column: ISO 8601 if every value is, else the
+    inferred format (day-first for NSE-style 19-08-2025 when `dayfirst`).
+    Raises on values that do not parse.
+    """
+    try:
+        return pd.to_datetime(values, format='ISO8601')
+    except (TypeError, ValueError):
+        return pd.to_datetime(values, dayfirst=dayfirst)
+
+
+def normalize_ohlc(df):
+    """Lower-case the columns of a raw OHLC frame and keep FRAME_COLUMNS (missing ones as NaN)."""
+    df = df.rename(columns={c: str(c).strip().lower() for c in df.columns})
+    for col in COLUMNS:
+        if col not in df.columns:
+            df[col] = np.nan
+    return df[[c for c in FRAME_COLUMNS if c in df.columns]]
+
+
+class OHLCStore:
+    def __init__(self, root=DEFAULT_ROOT):
+        self.root = os.path.abspath(root)
+        self._manifest_path = os.path.join(self.root, 'manifest.json')
+        self.manifest = self._read_manifest()
+
+    # --- manifest ---
+    def _read_manifest(self):
+        try:
+            with open(self._manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'symbols': {}, 'data_version': None}
+
+    def _write_manifest(self):
+        entries = self.manifest['symbols']
+        digest = hashlib.sha1(json.dumps(entries, sort_keys=True).encode()).hexdigest()[:16]
+        self.manifest['data_version'] = digest
+        os.makedirs(self.root, exist_ok=True)
+        tmp = self._manifest_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(tmp, self._manifest_path)
+
+    @property
+    def data_version(self):
+        """Short hash that changes whenever any partition changes."""
+        return self.manifest.get('data_version')
+
+    def symbols(self):
+        return list(self.manifest['symbols'])
+
+    def last_date(self, symbol):
+        entry = self.manifest['symbols'].get(symbol)
+        return pd.Timestamp(entry['last_date']) if entry else None
+
+    def first_date(self, symbol):
+        entry = self.manifest['symbols'].get(symbol)
+        return pd.Timestamp(entry['first_date']) if entry else None
+
+    def missing_ranges(self, symbol, start, end):
+        """
+        [(start, end)] date ranges (inclusive) of the window that lie outside
+        what is already stored for `symbol`.
+        """
+        start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+        first, last = self.first_date(symbol), self.last_date(symbol)
+        if first is None:
+            return [(start, end)] if start <= end else []
+        ranges = []
+        if start < first:
+            ranges.append((start, min(end, first - ONE_DAY)))
+        if end > last:
+            ranges.append((max(start, last + ONE_DAY), end))
+        return [(a, b) for a, b in ranges if a <= b]
+
+    # --- partitions ---
+    def _dir(self, symbol):
+        return os.path.join(self.root, symbol)
+
+    def _read_symbol(self, symbol, mmap=True):
+        d = self._dir(symbol)
+        mode = 'r' if mmap else None
+        return {col: np.load(os.path.join(d, f'{col}.npy'), mmap_mode=mode) for col in ['date'] + COLUMNS}
+
+    def write_symbol(self, symbol, df, save_manifest=True):
+        """
+        Merge rows for one symbol into its partition (new rows win on equal
+        dates) and rewrite it atomically.
+        """
+        df = normalize_ohlc(df)
+        new_dates = pd.to_datetime(df['date']).to_numpy(dtype='datetime64[ns]').astype(np.int64)
+        cols = {'date': new_dates}
+        for col in COLUMNS:
+            cols[col] = pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64)
+
+        if symbol in self.manifest['symbols']:
+            old = self._read_symbol(symbol, mmap=False)
+            cols = {k: np.concatenate([cols[k], old[k]]) for k in cols}
+
+        # keep the first occurrence per date (the new rows), sorted by date
+        _, keep = np.unique(cols['date'], return_index=True)
+        cols = {k: np.ascontiguousarray(v[keep]) for k, v in cols.items()}
+        if not len(cols['date']):
+            return
+
+        d = self._dir(symbol)
+        os.makedirs(d, exist_ok=True)
+        for col, arr in cols.items():
+            tmp = os.path.join(d, f'{col}.tmp.npy')
+            np.save(tmp, arr)
+            os.replace(tmp, os.path.join(d, f'{col}.npy'))
+
+        dates = cols['date']
+        self.manifest['symbols'][symbol] = {
+            'rows': int(len(dates)),
+            'first_date': str(pd.Timestamp(dates[0]).date()),
+            'last_date': str(pd.Timestamp(dates[-1]).date()),
+        }
+        if save_manifest:
+            self._write_manifest()
+
+    def import_frame(self, df):
+        """Import a long OHLC frame (symbol, date, ...); symbols keep their order of first appearance."""
+        df = normalize_ohlc(df)
+        for symbol, rows in df.groupby('symbol', sort=False):
+            self.write_symbol(symbol, rows, save_manifest=False)
+        self._write_manifest()
+
+    def _source_stat(self, csv_path):
+        st = os.stat(csv_path)
+        return {'size': st.st_size, 'mtime': st.st_mtime}
+
+    def source_changed(self, csv_path):
+        """True if `csv_path` changed since it was imported, None if it never was."""
+        seen = self.manifest.get('sources', {}).get(os.path.abspath(csv_path))
+        return None if seen is None else seen != self._source_stat(csv_path)
+
+    def import_csv(self, csv_path, dayfirst=True):
+        self.manifest.setdefault('sources', {})[os.path.abspath(csv_path)] = self._source_stat(csv_path)
+        df = pd.read_csv(csv_path)
+        df.columns = [str(c).strip().lower() for c in df.columns]
+        df['date'] = parse_dates(df['date'], dayfirst=dayfirst)
+        self.import_frame(df)
+
+    # --- loaders ---
+    def load_symbol(self, symbol, start=None, end=None):
+        """
+        Column arrays for one symbol restricted to [start, end]; slices of
+        read-only memory maps, so only the touched pages are read.
+        """
+        cols = self._read_symbol(symbol)
+        dates = cols['date']
+        lo = 0 if start is None else np.searchsorted(dates, pd.Timestamp(start).value, side='left')
+        hi = len(dates) if end is None else np.searchsorted(dates, pd.Timestamp(end).value, side='right')
+        return {k: v[lo:hi] for k, v in cols.items()}
+
+    def load(self, symbols=None, start=None, end=None):
+        """Long OHLC frame (FRAME_COLUMNS) for `symbols` (default: all) within [start, end]."""
+        if symbols is None:
+            symbols = self.symbols()
+        parts = []
+        for symbol in symbols:
+            if symbol not in self.manifest['symbols']:
+                continue
+            cols = self.load_symbol(symbol, start, end)
+            if len(cols['date']):
+                parts.append((symbol, cols))
+        df = _frame(parts)
+        # lets consumers key caches (e.g. indicators) on the store contents
+        df.attrs['data_version'] = self.data_version
+        return df
+
+    def windows(self, symbols=None, start=None, end=None, days=366):
+        """
+        load() in consecutive windows of `days` calendar days, for streaming a
+        long history. Each symbol's memory maps are opened once and read
+        forward from a cursor.
+        """
+        if symbols is None:
+            symbols = self.symbols()
+        maps = {s: self._read_symbol(s) for s in symbols if s in self.manifest['symbols']}
+        if not maps:
+            return
+        lo = min(self.first_date(s) for s in maps)
+        hi = max(self.last_date(s) for s in maps)
+        if start is not None:
+            lo = max(lo, pd.Timestamp(start).normalize())
+        if end is not None:
+            hi = min(hi, pd.Timestamp(end))
+        cursor = {s: int(np.searchsorted(cols['date'], lo.value, side='left')) for s, cols in maps.items()}
+        while lo <= hi:
+            stop = min(lo + pd.Timedelta(days=days) - ONE_DAY, hi)
+            parts = []
+            for symbol, cols in maps.items():
+                a = cursor[symbol]
+                b = cursor[symbol] = int(np.searchsorted(cols['date'], stop.value, side='right'))
+                if b > a:
+                    parts.append((symbol, {k: v[a:b] for k, v in cols.items()}))
+            if parts:
+                df = _frame(parts)
+                df.attrs['data_version'] = self.data_version
+                yield df
+            lo = stop + ONE_DAY
+
+
+def open_store(csv_path, store_root=DEFAULT_ROOT):
+    """
+    The local store, with `csv_path` imported into it first if it is still
+    empty, or imported again (its rows win) if the CSV changed since.
+    """
+    store = OHLCStore(store_root)
+    if not csv_path or not os.path.exists(csv_path):
+        return store
+    if not store.symbols():
+        print(f"[OHLCStore] 📦 Importing {csv_path} into {store.root}")
+        store.import_csv(csv_path)
+    elif store.source_changed(csv_path):
+        print(f"[OHLCStore] ⚠️ {csv_path} changed since it was imported; re-importing into {store.root}")
+        store.import_csv(csv_path)
+    return store
+
+
+def load_ohlc(csv_path, store_root=DEFAULT_ROOT, symbols=None, start=None, end=None):
+    """
+    Load OHLC from the local store, importing `csv_path` into it first if the
+    store is still empty or the CSV changed (see open_store).
+    """
+    return open_store(csv_path, store_root).load(symbols, start, end)
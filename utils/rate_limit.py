@@ -0,0 +1,56 @@
+# utils/rate_limit.py
+"""
+Token buckets for outbound API quotas (Telegram alerts, Google Sheets).
+
+    bucket = TokenBucket(rate=1.0, capacity=10)
+    bucket.wait()              # blocking callers (Sheets, in worker threads)
+    await bucket.acquire()     # coroutines (alert dispatcher)
+
+`rate` tokens per second accrue up to `capacity`; each call takes one.
+Thread-safe; drain() empties the bucket when the server reports the quota
+is used up anyway (HTTP 429).
+"""
+
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `capacity`."""
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.clock = clock
+        self.stamp = clock()
+        self._lock = threading.Lock()
+
+    def take(self):
+        """Take a token: 0 if one was available, else the seconds until one is."""
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def drain(self):
+        with self._lock:
+            self.tokens = 0.0
+            self.stamp = self.clock()
+
+    def wait(self):
+        """Block until a token is taken; returns the seconds waited."""
+        waited = 0.0
+        while (delay := self.take()) > 0:
+            time.sleep(delay)
+            waited += delay
+        return waited
+
+    async def acquire(self):
+        while (delay := self.take()) > 0:
+            await asyncio.sleep(delay)
@@ -5,110 +5,329 @@ import yfinance as yf
 import pandas as pd
 import datetime
 import os
+import time
 import requests
 import io
 import json
-from upload.gdrive_sync import upload_to_gsheet
+from concurrent.futures import ThreadPoolExecutor
+from engine.pivots import fib_levels
+from upload.journal import MIRROR, write_rows
+from utils.metrics import inc, timer
+from utils.ohlc_store import OHLCStore, parse_dates
+
+# Yearly High/Low/Close cache: one JSON file per closed year
+HLC_CACHE_DIR = os.path.join("data", "cache", "yearly_hlc")
+# Network-free mode (tests / no internet): OHLC from the local store (or a fixture CSV)
+# instead of yfinance, the symbol list from the fallback JSON, and no Sheets mirroring
+OFFLINE = os.environ.get("ARC_OFFLINE", "N").upper() == "Y"
+LOCAL_OHLC_CSV = os.environ.get("ARC_OHLC_FIXTURE")
+FALLBACK_SYMBOLS_JSON = os.path.join("config", "nifty50_fallback.json")
+NSE_TIMEOUT = 10
+
+BATCH_SIZE = 25        # tickers per multi-ticker yf.download
+MAX_WORKERS = 4        # bounded pool for straggler retries
+MAX_RETRIES = 3
+BACKOFF_SECONDS = 2.0
+
+
+def _fallback_symbols():
+    try:
+        with open(FALLBACK_SYMBOLS_JSON, "r") as f:
+            data = json.load(f)
+            return data["symbols"]
+    except Exception as e:
+        print(f"[ZoneGen] ❌ Fallback JSON failed: {e}")
+        return []
+
+
+def get_nifty50_symbols(offline=None, year=None, refresh=False):
+    """
+    Nifty50 symbols from NSE; offline, the fixture's symbols (or the fallback
+    JSON). For a closed `year` the list is kept next to the year's HLC cache,
+    so re-runs do not call NSE again (unless `refresh`).
+    """
+    if OFFLINE if offline is None else offline:
+        if LOCAL_OHLC_CSV:
+            return list(_read_fixture(LOCAL_OHLC_CSV)['symbol'].unique())
+        return _fallback_symbols()
+
+    closed = year is not None and int(year) < datetime.datetime.now().year
+    if closed and not refresh:
+        cached = _read_json(_symbols_path(year))
+        if cached:
+            inc("zone_symbols_total", source="cache")
+            return cached
 
-def get_nifty50_symbols():
     url = "https://archives.nseindia.com/content/indices/ind_nifty50list.csv"
     headers = {"User-Agent": "Mozilla/5.0"}
 
     try:
-        r = requests.get(url, headers=headers)
+        r = requests.get(url, headers=headers, timeout=NSE_TIMEOUT)
         r.raise_for_status()
         df = pd.read_csv(io.StringIO(r.text))
-        return df["Symbol"].tolist()
+        symbols = df["Symbol"].tolist()
+        inc("zone_symbols_total", source="remote")
+        if closed:
+            _write_json(_symbols_path(year), symbols)
+        return symbols
     except Exception as e:
         print(f"[ZoneGen] ⚠️ NSE fetch failed: {e}")
+        return _fallback_symbols()
+
+
+def pivots_from_hlc(symbol, year, high, low, close):
+    """Fibonacci pivot row for `year + 1` from the year's High/Low/Close."""
+    levels = fib_levels(high, low, close)
+
+    return dict({
+        'Symbol': symbol,
+        'Year': int(year + 1),
+        'High': round(high, 2),
+        'Low': round(low, 2),
+        'Close': round(close, 2),
+        **{level: round(levels[level], 2) for level in ['PP', 'S1', 'S2', 'S3', 'R1', 'R2', 'R3']}
+    })
+
+
+# --- Yearly High/Low/Close sources ---
+
+def _hlc_from_frame(df):
+    """(high, low, close) from one ticker's daily frame, or None if unusable."""
+    if df is None or df.empty or 'Close' not in df.columns:
+        return None
+    df = df.dropna()
+    if df.empty:
+        return None
+    return {
+        'High': float(df['High'].max().item()),
+        'Low': float(df['Low'].min().item()),
+        'Close': float(df['Close'].iloc[-1].item()),
+    }
+
+
+def _download_batch(symbols, year):
+    """One multi-ticker request for `symbols`; returns {symbol: hlc} for the ones that came back."""
+    tickers = [sym + ".NS" for sym in symbols]
+    with timer("yfinance_seconds", op="download_batch"):
+        df = yf.download(
+            tickers, start=f"{year}-01-01", end=f"{year}-12-31", interval='1d',
+            group_by='ticker', progress=False, auto_adjust=False, threads=MAX_WORKERS
+        )
+    out = {}
+    if df is None or df.empty:
+        return out
+    for sym, ticker in zip(symbols, tickers):
+        if isinstance(df.columns, pd.MultiIndex):
+            if ticker not in df.columns.get_level_values(0):
+                continue
+            sub = df[ticker]
+        else:
+            sub = df
+        hlc = _hlc_from_frame(sub)
+        if hlc:
+            out[sym] = hlc
+    return out
+
+
+def _download_single(symbol, year):
+    """Retry one straggler with exponential backoff."""
+    for attempt in range(MAX_RETRIES):
         try:
-            with open("config/nifty50_fallback.json", "r") as f:
-                data = json.load(f)
-                return data["symbols"]
+            with timer("yfinance_seconds", op="history"):
+                df = yf.Ticker(symbol + ".NS").history(
+                    start=f"{year}-01-01", end=f"{year}-12-31", interval='1d', auto_adjust=False
+                )
+            hlc = _hlc_from_frame(df)
+            if hlc:
+                return hlc
         except Exception as e:
-            print(f"[ZoneGen] ❌ Fallback JSON failed: {e}")
-            return []
+            print(f"[ZoneGen] ⚠️ {symbol} attempt {attempt + 1}/{MAX_RETRIES} failed: {e}")
+        if attempt + 1 < MAX_RETRIES:
+            time.sleep(BACKOFF_SECONDS * 2 ** attempt)
+    return None
 
-def calculate_fib_pivots(symbol, year):
+
+def _fetch_remote_hlc(symbols, year, job=None):
+    """
+    `job` (optional, see commands/jobs.py) gets progress reports and is
+    checked for cancellation between batches.
+    """
+    result = {}
+    for i in range(0, len(symbols), BATCH_SIZE):
+        if job:
+            job.check()
+            job.report(f"downloading {year} HLC {i}/{len(symbols)}")
+        batch = symbols[i:i + BATCH_SIZE]
+        try:
+            result.update(_download_batch(batch, year))
+        except Exception as e:
+            print(f"[ZoneGen] ⚠️ Batch download failed ({batch[0]}..{batch[-1]}): {e}")
+
+    stragglers = [sym for sym in symbols if sym not in result]
+    if stragglers:
+        if job:
+            job.check()
+            job.report(f"retrying {len(stragglers)} straggler(s)")
+        print(f"[ZoneGen] 🔁 Retrying {len(stragglers)} straggler(s)")
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            for sym, hlc in zip(stragglers, pool.map(lambda s: _download_single(s, year), stragglers)):
+                if hlc:
+                    result[sym] = hlc
+    return result
+
+
+def _read_fixture(csv_path):
+    df = pd.read_csv(csv_path)
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    df['date'] = parse_dates(df['date'])
+    return df
+
+
+def _local_hlc(symbols, year, csv_path=None):
+    """
+    Yearly High/Low/Close from local daily OHLC: a fixture CSV (symbol, date,
+    high, low, close) if given, else the OHLC store.
+    """
+    csv_path = csv_path or LOCAL_OHLC_CSV
+    if csv_path:
+        df = _read_fixture(csv_path)
+        df = df[(df['date'] >= f"{year}-01-01") & (df['date'] < f"{year}-12-31")]
+    else:
+        df = OHLCStore().load(symbols, f"{year}-01-01", f"{year}-12-30")
+    df = df[df['symbol'].isin(symbols)].dropna(subset=['high', 'low', 'close']).sort_values('date', kind='stable')
+
+    g = df.groupby('symbol')
+    agg = pd.DataFrame({'High': g['high'].max(), 'Low': g['low'].min(), 'Close': g['close'].last()})
+    return {sym: {k: float(v) for k, v in row.items()} for sym, row in agg.iterrows()}
+
+
+def _cache_path(year):
+    return os.path.join(HLC_CACHE_DIR, f"{year}.json")
+
+
+def _symbols_path(year):
+    return os.path.join(HLC_CACHE_DIR, f"{year}.symbols.json")
+
+
+def _read_json(path):
     try:
-        yf_symbol = symbol + ".NS"
-        start = f"{year}-01-01"
-        end = f"{year}-12-31"
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
 
-        df = yf.download(yf_symbol, start=start, end=end, interval='1d', progress=False, auto_adjust=False)
 
-        if df.empty or 'Close' not in df.columns:
-            raise ValueError("No valid data")
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def _load_cache(year):
+    return _read_json(_cache_path(year)) or {}
+
+
+def _save_cache(year, data):
+    _write_json(_cache_path(year), data)
+
+
+def fetch_yearly_hlc(symbols, year, refresh=False, offline=None, job=None):
+    """
+    {symbol: {'High','Low','Close'}} for `year`.
+    Closed years are served from the on-disk cache and only missing symbols
+    hit the network (batched, with straggler retries). `offline` reads the
+    local OHLC store (or fixture CSV) instead and never touches the network
+    or the cache.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    if OFFLINE if offline is None else offline:
+        return _local_hlc(symbols, year)
+
+    closed = int(year) < datetime.datetime.now().year
+    cached = _load_cache(year) if closed and not refresh else {}
+    missing = [sym for sym in symbols if sym not in cached]
 
-        df.dropna(inplace=True)
-
-        high = float(df['High'].max().item())
-        low = float(df['Low'].min().item())
-        close = float(df['Close'].iloc[-1].item())
-
-        pp = (high + low + close) / 3
-        r = high - low
-
-        return dict({
-            'Symbol': symbol,
-            'Year': int(year + 1),
-            'High': round(high, 2),
-            'Low': round(low, 2),
-            'Close': round(close, 2),
-            'PP': round(pp, 2),
-            'S1': round(pp - 0.382 * r, 2),
-            'S2': round(pp - 0.618 * r, 2),
-            'S3': round(pp - 1.000 * r, 2),
-            'R1': round(pp + 0.382 * r, 2),
-            'R2': round(pp + 0.618 * r, 2),
-            'R3': round(pp + 1.000 * r, 2)
-        })
+    inc("zone_hlc_total", len(symbols) - len(missing), source="cache")
+    inc("zone_hlc_total", len(missing), source="remote")
+    fetched = _fetch_remote_hlc(missing, year, job=job) if missing else {}
+    if closed and fetched:
+        _save_cache(year, {**_load_cache(year), **fetched})
+
+    merged = {**cached, **fetched}
+    return {sym: merged[sym] for sym in symbols if sym in merged}
+
+
+def calculate_fib_pivots(symbol, year):
+    try:
+        hlc = fetch_yearly_hlc([symbol], year).get(symbol)
+        if not hlc:
+            raise ValueError("No valid data")
+        return pivots_from_hlc(symbol, year, hlc['High'], hlc['Low'], hlc['Close'])
 
     except Exception as e:
         print(f"[ZoneGen] ⚠️ Skipping {symbol}: {e}")
         return None
 
-def generate_zone_file(year=None, force=False):
+
+def _zone_rows(symbols, year, refresh=False, job=None):
+    hlc = fetch_yearly_hlc(symbols, year, refresh=refresh, job=job)
+    rows = []
+    for sym in symbols:
+        if sym in hlc:
+            rows.append(pivots_from_hlc(sym, year, hlc[sym]['High'], hlc[sym]['Low'], hlc[sym]['Close']))
+        else:
+            print(f"[ZoneGen] ⚠️ Skipping {sym}: No valid data")
+    return rows
+
+
+def generate_zone_file(year=None, force=False, refresh=False, job=None):
     if not year:
         year = datetime.datetime.now().year - 1
 
-    symbols = get_nifty50_symbols()
-    result = []
-
-    for sym in symbols:
-        row = calculate_fib_pivots(sym, year)
-        if row:
-            result.append(row)
+    if job:
+        job.report("fetching Nifty50 list")
+    with timer("zone_gen_seconds", phase="symbols"):
+        symbols = get_nifty50_symbols(year=year, refresh=refresh)
+    with timer("zone_gen_seconds", phase="pivots"):
+        result = _zone_rows(symbols, year, refresh=refresh, job=job)
 
     if not result:
         print("[ZoneGen] ❌ No zone data generated. Check API/data source.")
         return None
 
     df = pd.DataFrame(result)
-    upload_to_gsheet(df, sheet_name="trading_zones")
+    if job:
+        job.check()
+        job.report(f"saving {len(df)} rows")
+    with timer("zone_gen_seconds", phase="upload"):
+        write_rows("trading_zones", df, key="Symbol")
     return df
 
-def generate_zone_file_for_symbols(symbols, year=None):
+
+def generate_zone_file_for_symbols(symbols, year=None, refresh=False, job=None):
     if not year:
         year = datetime.datetime.now().year - 1
 
-    result = []
-    for sym in symbols:
-        row = calculate_fib_pivots(sym, year)
-        if row:
-            result.append(row)
-        else:
-            print(f"[ZoneGen] ❌ No zone data for {sym}")
+    with timer("zone_gen_seconds", phase="pivots"):
+        result = _zone_rows(symbols, year, refresh=refresh, job=job)
 
     if not result:
         print("[ZoneGen] ❌ No custom zone data generated.")
         return None
 
     df = pd.DataFrame(result)
-    upload_to_gsheet(df, sheet_name="trading_zones")
+    if job:
+        job.check()
+        job.report(f"saving {len(df)} rows")
+    with timer("zone_gen_seconds", phase="upload"):
+        write_rows("trading_zones", df, key="Symbol")
     return df
 
-__all__ = ["generate_zone_file", "generate_zone_file_for_symbols"]
+__all__ = ["generate_zone_file", "generate_zone_file_for_symbols", "fetch_yearly_hlc"]
 
 if __name__ == "__main__":
     generate_zone_file(force=True)
+    if not OFFLINE:
+        MIRROR.flush()      # no bot running: push the journal to Sheets before exiting